@@ -1,4 +1,144 @@
-let filteredDramas = [...dramas];
+// 作品数据由 loadCollection 载入：回访的用户只下载 deltas/ 中的增量文件，不再下载整个 data.js
+let dramas = [];
+let authorLinks = {};
+let filteredDramas = [];
+
+// --- Collection Loading ---
+const DATA_CACHE_KEY = 'touhou-data-cache';
+const DELTA_BASE = 'deltas/';
+
+async function fetchJson(url, options) {
+    const response = await fetch(url, options);
+    if (!response.ok) {
+        throw new Error(`${url}: HTTP ${response.status}`);
+    }
+    return response.json();
+}
+
+// data.js 是脚本而不是 JSON，在函数作用域中执行后取出其中的常量
+async function fetchDataJs() {
+    const response = await fetch('data.js', { cache: 'no-cache' });
+    if (!response.ok) {
+        throw new Error(`data.js: HTTP ${response.status}`);
+    }
+    const read = new Function(
+        (await response.text()) +
+        '\nreturn {' +
+        'dramas: dramas,' +
+        'authorLinks: typeof authorLinks === "undefined" ? {} : authorLinks,' +
+        'version: typeof dataVersion === "undefined" ? 0 : dataVersion' +
+        '};'
+    );
+    return read();
+}
+
+function readDataCache() {
+    try {
+        const cached = JSON.parse(localStorage.getItem(DATA_CACHE_KEY));
+        return cached && cached.version && Array.isArray(cached.dramas) ? cached : null;
+    } catch (error) {
+        console.error('Error reading data cache from localStorage:', error);
+        return null;
+    }
+}
+
+function saveDataCache(collection) {
+    if (!collection.version) {
+        return;
+    }
+    try {
+        localStorage.setItem(DATA_CACHE_KEY, JSON.stringify(collection));
+    } catch (error) {
+        // 存储空间不足时只是下次重新下载 data.js
+        console.error('Error saving data cache to localStorage:', error);
+        try {
+            localStorage.removeItem(DATA_CACHE_KEY);
+        } catch (clearError) {
+            console.error('Error clearing data cache:', clearError);
+        }
+    }
+}
+
+// 与 data_manage_gui.py 中 ChangeFeed 的约定一致：先去掉 removed 中的 ID，
+// 再把 upserts 按 ID 升序插入到 ID 对应的位置，最后按顺序重新编号
+function applyDelta(collection, delta) {
+    if (delta.from !== collection.version) {
+        throw new Error(`增量 ${delta.from}→${delta.to} 与本地版本 ${collection.version} 不连续`);
+    }
+    const removed = new Set(delta.removed);
+    const records = collection.dramas.filter(drama => !removed.has(drama.id));
+    [...delta.upserts]
+        .sort((a, b) => a.id - b.id)
+        .forEach(drama => records.splice(drama.id - 1, 0, drama));
+    records.forEach((drama, index) => {
+        drama.id = index + 1;
+    });
+    return {
+        version: delta.to,
+        dramas: records,
+        authorLinks: delta.authorLinks || collection.authorLinks
+    };
+}
+
+// 从 collection 所在的版本追到 manifest 的最新版本；增量链接不上时返回 null
+async function catchUp(collection, manifest) {
+    const chain = manifest.deltas.filter(entry => entry.to > collection.version);
+    if (!chain.length || chain[0].from !== collection.version) {
+        return null;
+    }
+    // 增量文件内容不变，可以走浏览器缓存，并行下载后按顺序应用
+    const deltas = await Promise.all(chain.map(entry => fetchJson(DELTA_BASE + entry.file)));
+    return deltas.reduce(applyDelta, collection);
+}
+
+async function syncCollection(cached) {
+    const manifest = await fetchJson(DELTA_BASE + 'manifest.json', { cache: 'no-cache' });
+    if (manifest.version === cached.version) {
+        return cached;
+    }
+    if (manifest.version > cached.version) {
+        const updated = await catchUp(cached, manifest);
+        if (updated) {
+            return updated;
+        }
+        // 本地版本早于增量链的起点：从最新快照出发
+        if (manifest.snapshot) {
+            const snapshot = await fetchJson(DELTA_BASE + manifest.snapshot.file);
+            const collection = {
+                version: snapshot.version,
+                dramas: snapshot.dramas,
+                authorLinks: snapshot.authorLinks || {}
+            };
+            const fromSnapshot = await catchUp(collection, manifest);
+            if (fromSnapshot || collection.version === manifest.version) {
+                return fromSnapshot || collection;
+            }
+        }
+    }
+    // 版本回退或增量文件不全：重新下载完整的 data.js
+    return null;
+}
+
+async function loadCollection() {
+    const cached = readDataCache();
+    let collection = null;
+    if (cached) {
+        try {
+            collection = await syncCollection(cached);
+        } catch (error) {
+            console.error('Error applying data updates, reloading data.js:', error);
+        }
+    }
+    if (!collection) {
+        collection = await fetchDataJs();
+    }
+    if (collection !== cached) {
+        saveDataCache(collection);
+    }
+    dramas = collection.dramas;
+    authorLinks = collection.authorLinks;
+    filteredDramas = [...dramas];
+}
 
 // --- Status Helper Functions ---
 function getDramaStatus(drama) {
@@ -2176,6 +2316,10 @@ function openDetail(drama) {
     // Fill data
     detailThumbnail.src = drama.thumbnail;
     detailThumbnail.alt = drama.title;
+    // Paint the precomputed placeholder behind the image while it downloads
+    detailThumbnail.style.background = drama.thumbnailMeta
+        ? `${drama.thumbnailMeta.color} url(${drama.thumbnailMeta.placeholder}) center/cover`
+        : '';
     
     detailStatus.className = `px-2 py-0.5 rounded text-[10px] font-medium shadow-sm ${getDramaStatus(drama).class}`;
     detailStatus.textContent = getDramaStatus(drama).text;
@@ -2373,10 +2517,13 @@ function renderDramas() {
                  onclick="openDetailFromData(this)">
                 <!-- Thumbnail Container -->
                 <div class="relative aspect-video overflow-hidden bg-gray-100 dark:bg-zinc-800 lazy-image-container">
-                    <!-- Loading skeleton -->
-                    <div class="absolute inset-0 image-skeleton"></div>
+                    <!-- Loading skeleton (blurred placeholder when thumbnailMeta is available) -->
+                    ${drama.thumbnailMeta
+                        ? `<div class="absolute inset-0 scale-110 blur-md" style="background: ${drama.thumbnailMeta.color} url(${drama.thumbnailMeta.placeholder}) center/cover"></div>`
+                        : '<div class="absolute inset-0 image-skeleton"></div>'}
                     <img src="" alt="${drama.title}" 
                          class="lazy-image w-full h-full object-cover transition-transform duration-500 group-hover:scale-105" 
+                         ${drama.thumbnailMeta ? `width="${drama.thumbnailMeta.width}" height="${drama.thumbnailMeta.height}"` : ''}
                          data-src="${drama.thumbnail}"
                          loading="lazy"
                          onload="this.classList.add('loaded'); this.previousElementSibling.style.display='none';">
@@ -3417,7 +3564,11 @@ function generateNewcomerList() {
 }
 
 document.addEventListener('DOMContentLoaded', () => {
-    init();
+    loadCollection()
+        .then(init)
+        .catch(error => {
+            console.error('Error loading collection data:', error);
+        });
     initBackToTop();
     initTouchGestures();
 });
@@ -9,26 +9,5212 @@
 4. 增强 load_data 兼容性，处理 JS 文件中的逗号和格式问题。
 """
 
+import argparse
+import asyncio
+import base64
+import bisect
+import csv
+import difflib
+import hashlib
+import heapq
+import html
+import io
+import itertools
 import json
+import mimetypes
+import multiprocessing
 import os
+import queue
 import re
+import shutil
+import socket
+import sqlite3
+import ssl
+import struct
+import sys
+import threading
+import time
 import tkinter as tk
+import unicodedata
+from collections import Counter, OrderedDict, namedtuple
+from contextlib import closing, contextmanager
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
 from datetime import datetime
-from tkinter import messagebox, ttk
+from functools import lru_cache, partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from tkinter import filedialog, messagebox, ttk
+from urllib.parse import (
+    parse_qs,
+    parse_qsl,
+    quote,
+    unquote,
+    urlencode,
+    urljoin,
+    urlsplit,
+)
+from xml.sax.saxutils import escape as xml_escape
+
+# 增量变更文件目录（与 data.js 同级）：每次保存生成 delta-<版本>.json，定期生成完整快照
+DELTA_DIR = "deltas"
+DELTA_CHAIN_LIMIT = 30  # 最多保留的增量文件数量
+SNAPSHOT_INTERVAL = 10  # 每隔多少个版本写一次完整快照
+# 增量链的内部状态（上一版本的记录哈希）放在 data.js 旁边而不是 deltas/ 中，不随站点发布
+DELTA_STATE = ".delta-state.json"
+
+
+def beside_data_file(name, data_path="data.js"):
+    """与 data.js 同级的文件路径；状态文件跟随数据文件，而不是进程的工作目录"""
+    return os.path.join(os.path.dirname(os.path.abspath(data_path)), name)
+
+
+def delta_dir(data_dir):
+    """data.js 所在目录对应的增量文件目录"""
+    return os.path.join(data_dir, DELTA_DIR) if data_dir else DELTA_DIR
+
+
+DATA_VERSION_PATTERN = re.compile(r"const\s+dataVersion\s*=\s*(\d+);")
+
+
+def read_data_version(path, tail=256):
+    """data.js 末尾的 dataVersion，没有时为 0。只读取文件末尾，保存时调用也不必读完整个文件"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(max(0, f.seek(0, os.SEEK_END) - tail))
+            match = DATA_VERSION_PATTERN.search(f.read().decode("utf-8", "ignore"))
+    except OSError:
+        return 0
+    return int(match.group(1)) if match else 0
+
+
+def record_hash(item):
+    """计算单条记录的内容哈希（按键排序的紧凑 JSON）"""
+    payload = json.dumps(
+        item, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def record_body(item):
+    """记录去掉 id 后的 JSON 文本。内容哈希与 JSON/NDJSON 导出共用这一次序列化，
+    记录只因前面的条目增删而重新编号时哈希不变。"""
+    return json.dumps({k: v for k, v in item.items() if k != "id"}, ensure_ascii=False)
+
+
+def with_id(item, body):
+    """把 id 拼回 record_body 的结果，得到完整记录的 JSON（id 在最前）"""
+    head = '{"id": ' + json.dumps(item.get("id"))
+    return head + "}" if body == "{}" else head + ", " + body[1:]
+
+
+def increasing_subsequence(values):
+    """最长递增子序列的下标集合"""
+    tails, tail_index, parent = [], [], [None] * len(values)
+    for i, value in enumerate(values):
+        k = bisect.bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_index.append(i)
+        else:
+            tails[k] = value
+            tail_index[k] = i
+        parent[i] = tail_index[k - 1] if k else None
+    kept = set()
+    i = tail_index[-1] if tail_index else None
+    while i is not None:
+        kept.add(i)
+        i = parent[i]
+    return kept
+
+
+class ChangeFeed:
+    """维护集合版本号、增量文件链与快照。
+
+    deltas/manifest.json  对外公开：当前版本、最新快照、可用的增量链
+    .delta-state.json     内部使用（与 deltas/ 同级）：上一版本每条记录的内容哈希与 ID
+    持有版本 N 的客户端只需按顺序下载 to > N 的增量文件即可追上最新版本，
+    若 N 早于增量链的起点，则改为下载最新快照。
+
+    记录以不含 id 的内容哈希跨版本对应（完全相同的记录再按出现次序区分），
+    删除或拖动一条记录不会让后面重新编号的记录进入增量。
+    增量中的 removed 是上一版本里要去掉的 ID（已删除、内容已修改或相对位置变了）；
+    客户端去掉这些记录后，把 upserts 按 id 升序插入到 id 对应的位置，再按顺序重新编号即可。
+
+    finish 只写临时文件，commit 时才替换正式文件，abort 则丢弃。
+    """
+
+    def __init__(self, base_dir=DELTA_DIR):
+        self.base_dir = base_dir
+        self.manifest_path = os.path.join(base_dir, "manifest.json")
+        self.state_path = os.path.join(
+            os.path.dirname(os.path.normpath(base_dir)), DELTA_STATE
+        )
+        self._staged, self._obsolete = [], []
+
+    def _read_json(self, path, default):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def _stage_json(self, path, obj):
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+        self._staged.append(path)
+
+    def current_version(self):
+        return self._read_json(self.manifest_path, {}).get("version", 0)
+
+    def begin(self, floor=0):
+        """开始一次发布：读取上一版本的记录表。
+
+        floor 为 data.js 中现有的 dataVersion：合并两个分支后它高于增量链的版本，
+        此时下一个版本直接跳到 floor，增量的 from/to 不再连续编号但仍首尾相接。
+        """
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._floor = floor
+        self._state = self._read_json(self.state_path, {"version": 0})
+        self._old = self._state.get("records", {})
+        self._new = {}
+        self._items = {}
+        self._seen = Counter()
+        self._staged, self._obsolete = [], []
+
+    def add(self, item, body=None):
+        """记录一条记录的内容哈希。body 为 record_body(item)，可由调用方复用"""
+        if body is None:
+            body = record_body(item)
+        key = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        duplicates = self._seen[key]
+        self._seen[key] += 1
+        if duplicates:
+            key = f"{key}~{duplicates}"
+        self._new[key] = item.get("id")
+        self._items[key] = item
+
+    def finish(self, author_links=None, snapshot_records=None):
+        """把增量文件写成临时文件；无变化时不升级版本。返回当前版本号。
+
+        snapshot_records 为需要写快照时获取完整记录列表的回调。
+        """
+        self._staged, self._obsolete = [], []
+        version = self._state.get("version", 0)
+        # 新增或修改过的记录哈希对不上；内容未变但相对顺序变了（被拖动）的同样要重新给出
+        survivors = [key for key in self._new if key in self._old]
+        kept = increasing_subsequence([self._old[key] for key in survivors])
+        changed = {key for key in self._new if key not in self._old}
+        changed.update(key for i, key in enumerate(survivors) if i not in kept)
+        upserts = [self._items[key] for key in self._new if key in changed]
+        removed = sorted(
+            old_id
+            for key, old_id in self._old.items()
+            if key not in self._new or key in changed
+        )
+        links_hash = record_hash(author_links or {})
+        links_changed = links_hash != self._state.get("authorLinksHash")
+
+        if version and not upserts and not removed and not links_changed:
+            return version
+
+        manifest = self._read_json(
+            self.manifest_path, {"version": 0, "snapshot": None, "deltas": []}
+        )
+        previous, version = version, max(version + 1, self._floor)
+        delta = {
+            "from": previous,
+            "to": version,
+            "upserts": upserts,
+            "removed": removed,
+        }
+        if links_changed:
+            delta["authorLinks"] = author_links or {}
+        delta_name = f"delta-{version}.json"
+        self._stage_json(os.path.join(self.base_dir, delta_name), delta)
+
+        deltas = manifest.get("deltas", [])
+        deltas.append({"from": previous, "to": version, "file": delta_name})
+
+        snapshot = manifest.get("snapshot")
+        interval_passed = version // SNAPSHOT_INTERVAL > previous // SNAPSHOT_INTERVAL
+        if snapshot_records and (snapshot is None or interval_passed):
+            snapshot_name = f"snapshot-{version}.json"
+            self._stage_json(
+                os.path.join(self.base_dir, snapshot_name),
+                {
+                    "version": version,
+                    "dramas": list(snapshot_records()),
+                    "authorLinks": author_links or {},
+                },
+            )
+            if snapshot and snapshot["file"] != snapshot_name:
+                self._obsolete.append(snapshot["file"])
+            snapshot = {"version": version, "file": snapshot_name}
+
+        # 只保留最近的增量链，更早的客户端回退到快照
+        while len(deltas) > DELTA_CHAIN_LIMIT:
+            self._obsolete.append(deltas.pop(0)["file"])
+
+        self._stage_json(
+            self.manifest_path,
+            {"version": version, "snapshot": snapshot, "deltas": deltas},
+        )
+        self._stage_json(
+            self.state_path,
+            {"version": version, "records": self._new, "authorLinksHash": links_hash},
+        )
+        return version
+
+    def commit(self):
+        """替换正式文件（增量与快照先于 manifest），再删除过期文件"""
+        for path in self._staged:
+            os.replace(path + ".tmp", path)
+        for name in self._obsolete:
+            self._remove(name)
+        self._staged, self._obsolete = [], []
+
+    def abort(self):
+        for path in self._staged:
+            try:
+                os.remove(path + ".tmp")
+            except OSError:
+                pass
+        self._staged, self._obsolete = [], []
+
+    def publish(self, records, author_links=None):
+        """一次性发布整个集合，返回当前版本号"""
+        self.begin()
+        for item in records:
+            self.add(item)
+        try:
+            version = self.finish(author_links, lambda: records)
+        except Exception:
+            self.abort()
+            raise
+        self.commit()
+        return version
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(self.base_dir, name))
+        except OSError:
+            pass
+
+
+# --- 导出管线 ---
+# 一次遍历内存中的集合，同时喂给多个导出目标；每个目标都边遍历边写临时文件，
+# 所有目标都写完后才依次替换正式文件，任何一个出错则全部丢弃。
+
+SITE_URL = "https://fairy-oracle-sanctuary.github.io/Touhou-Chabangeki-Collect/"
+FEED_ENTRY_LIMIT = 50  # Atom 订阅中保留的最近条目数
+
+CSV_FIELDS = [
+    "id",
+    "title",
+    "author",
+    "translator",
+    "tags",
+    "isTranslated",
+    "isDomestic",
+    "originalUrl",
+    "translatedUrl",
+    "description",
+    "thumbnail",
+    "dateAdded",
+]
+
+
+def format_drama_js(item):
+    """生成 data.js 中单条记录的文本块（与手写格式保持一致）"""
+    meta = ""
+    if item.get("thumbnailMeta"):
+        meta = f"""
+        thumbnailMeta: {json.dumps(item["thumbnailMeta"], ensure_ascii=False)},"""
+    # 使用 json.dumps 确保所有字段中的特殊字符（引号、换行）被正确转义
+    return f"""
+    {{
+        id: {item["id"]},
+        title: {json.dumps(item["title"], ensure_ascii=False)},
+        author: {json.dumps(item["author"], ensure_ascii=False)},
+        translator: {json.dumps(item["translator"], ensure_ascii=False)},
+        tags: {json.dumps(item["tags"], ensure_ascii=False)},
+        isTranslated: {str(item["isTranslated"]).lower()},
+        isDomestic: {str(item.get("isDomestic", False)).lower()},
+        originalUrl: {json.dumps(item["originalUrl"], ensure_ascii=False)},
+        translatedUrl: {json.dumps(item["translatedUrl"], ensure_ascii=False)},
+        description: {json.dumps(item["description"], ensure_ascii=False)},
+        thumbnail: {json.dumps(item["thumbnail"], ensure_ascii=False)},{meta}
+        dateAdded: {json.dumps(item["dateAdded"], ensure_ascii=False)}
+    }}"""
+
+
+def format_author_links_js(author_links):
+    return (
+        "const authorLinks = "
+        + json.dumps(author_links, ensure_ascii=False, indent=4)
+        + ";"
+    )
+
+
+class ExportSink:
+    """导出目标基类：open → write（逐条）→ close 写完临时文件 → commit 替换正式文件，
+    出错时 abort。write 时 context["body"] 为当前记录的 record_body，可直接复用。"""
+
+    encoding = "utf-8"
+    newline = None
+
+    def __init__(self, path):
+        self.path = path
+        self.f = None
+
+    def open(self, context):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.f = open(
+            self.path + ".tmp", "w", encoding=self.encoding, newline=self.newline
+        )
+
+    def write(self, item, index, context):
+        raise NotImplementedError
+
+    def close(self, context):
+        self.f.close()
+
+    def commit(self):
+        os.replace(self.path + ".tmp", self.path)
+
+    def abort(self):
+        if self.f:
+            self.f.close()
+            try:
+                os.remove(self.path + ".tmp")
+            except OSError:
+                pass
+
+
+class ChangeFeedSink(ExportSink):
+    """在同一次遍历中计算记录哈希并写出增量文件，版本号写入 context"""
+
+    def __init__(self, base_dir=DELTA_DIR, data_path=None):
+        super().__init__(None)
+        self.feed = ChangeFeed(base_dir)
+        self.data_path = data_path
+
+    def open(self, context):
+        self.feed.begin(read_data_version(self.data_path) if self.data_path else 0)
+
+    def write(self, item, index, context):
+        self.feed.add(item, context["body"])
+
+    def close(self, context):
+        context["version"] = self.feed.finish(
+            context.get("authorLinks"),
+            lambda: [public_record(i) for i in context["records"]],
+        )
+
+    def commit(self):
+        self.feed.commit()
+
+    def abort(self):
+        self.feed.abort()
+
+
+class DataJsSink(ExportSink):
+    """规范格式的 data.js"""
+
+    def open(self, context):
+        super().open(context)
+        self.f.write("const dramas = [")
+
+    def write(self, item, index, context):
+        if index > 0:
+            self.f.write(",")
+        self.f.write(format_drama_js(item))
+
+    def close(self, context):
+        self.f.write("\n];\n\n")
+        if context.get("authorLinks"):
+            self.f.write(format_author_links_js(context["authorLinks"]) + "\n")
+        if context.get("version"):
+            self.f.write(f"\nconst dataVersion = {context['version']};\n")
+        super().close(context)
+
+
+class JsonSink(ExportSink):
+    """纯 JSON：{"dramas": [...], "authorLinks": {...}, "version": N}"""
+
+    def open(self, context):
+        super().open(context)
+        self.f.write('{"dramas":[')
+
+    def write(self, item, index, context):
+        if index > 0:
+            self.f.write(",\n")
+        self.f.write(with_id(item, context["body"]))
+
+    def close(self, context):
+        self.f.write('],"authorLinks":')
+        self.f.write(json.dumps(context.get("authorLinks") or {}, ensure_ascii=False))
+        self.f.write(f',"version":{json.dumps(context.get("version"))}}}\n')
+        super().close(context)
+
+
+class NdjsonSink(ExportSink):
+    """每行一条记录的 NDJSON"""
+
+    def write(self, item, index, context):
+        self.f.write(with_id(item, context["body"]) + "\n")
+
+
+class CsvSink(ExportSink):
+    """CSV，标签以"，"连接；带 BOM 方便 Excel 直接打开"""
+
+    encoding = "utf-8-sig"
+    newline = ""
+
+    def open(self, context):
+        super().open(context)
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(CSV_FIELDS)
+
+    def write(self, item, index, context):
+        row = []
+        for key in CSV_FIELDS:
+            value = item.get(key)
+            if key == "tags":
+                value = "，".join(value or [])
+            elif isinstance(value, bool):
+                value = str(value).lower()
+            elif value is None:
+                value = ""
+            row.append(value)
+        self.writer.writerow(row)
+
+
+class AtomFeedSink(ExportSink):
+    """最近添加条目的 Atom 订阅，只在堆中保留最近 N 条"""
+
+    def __init__(self, path, limit=FEED_ENTRY_LIMIT):
+        super().__init__(path)
+        self.limit = limit
+
+    def open(self, context):
+        super().open(context)
+        self.heap = []
+
+    def write(self, item, index, context):
+        entry = (item.get("dateAdded") or "", index, item)
+        if len(self.heap) < self.limit:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def close(self, context):
+        entries = sorted(self.heap, key=lambda e: e[:2], reverse=True)
+        updated = entries[0][0] if entries else datetime.now().strftime("%Y-%m-%d")
+        self.f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        self.f.write('<feed xmlns="http://www.w3.org/2005/Atom">\n')
+        self.f.write("  <title>东方 Project 茶番剧收藏</title>\n")
+        self.f.write(f'  <link href="{xml_escape(SITE_URL)}"/>\n')
+        self.f.write(f"  <id>{xml_escape(SITE_URL)}</id>\n")
+        self.f.write(f"  <updated>{updated}T00:00:00Z</updated>\n")
+        for date_added, _, item in entries:
+            link = item.get("translatedUrl") or item.get("originalUrl") or SITE_URL
+            self.f.write("  <entry>\n")
+            self.f.write(f"    <title>{xml_escape(item.get('title') or '')}</title>\n")
+            self.f.write(f'    <link href="{xml_escape(link)}"/>\n')
+            # 以原版链接作为稳定标识，重新编号或修改字段都不会改变条目 ID
+            key = item.get("originalUrl") or item.get("title") or ""
+            entry_id = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+            self.f.write(f"    <id>{xml_escape(SITE_URL)}#drama-{entry_id}</id>\n")
+            self.f.write(f"    <updated>{date_added}T00:00:00Z</updated>\n")
+            self.f.write(
+                f"    <author><name>{xml_escape(item.get('author') or '')}</name></author>\n"
+            )
+            self.f.write(
+                f"    <summary>{xml_escape(item.get('description') or '')}</summary>\n"
+            )
+            self.f.write("  </entry>\n")
+        self.f.write("</feed>\n")
+        super().close(context)
+
+
+class SitemapSink(ExportSink):
+    """站点地图；record_url 不为空时为每条记录输出一个地址"""
+
+    def __init__(self, path, record_url=None):
+        super().__init__(path)
+        self.record_url = record_url
+
+    def open(self, context):
+        super().open(context)
+        self.latest = ""
+        self.f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.f.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+
+    def write(self, item, index, context):
+        date_added = item.get("dateAdded") or ""
+        self.latest = max(self.latest, date_added)
+        if self.record_url:
+            self.f.write(
+                f"  <url><loc>{xml_escape(self.record_url(item))}</loc>"
+                f"<lastmod>{date_added}</lastmod></url>\n"
+            )
+
+    def close(self, context):
+        lastmod = f"<lastmod>{self.latest}</lastmod>" if self.latest else ""
+        self.f.write(f"  <url><loc>{xml_escape(SITE_URL)}</loc>{lastmod}</url>\n")
+        self.f.write("</urlset>\n")
+        super().close(context)
+
+
+class ExportPipeline:
+    """单次遍历集合，依次调用所有导出目标；全部写完临时文件后才提交"""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def run(self, records, author_links=None, version=None, check=None):
+        """check（如 Task.check）在每条记录前调用，抛出异常时放弃所有导出目标"""
+        context = {"records": records, "authorLinks": author_links, "version": version}
+        opened = []
+        try:
+            for sink in self.sinks:
+                sink.open(context)
+                opened.append(sink)
+            for index, item in enumerate(records):
+                if check:
+                    check()
+                item = public_record(item)
+                context["body"] = record_body(item)
+                for sink in self.sinks:
+                    sink.write(item, index, context)
+            for sink in self.sinks:
+                sink.close(context)
+        except Exception:
+            for sink in opened:
+                sink.abort()
+            raise
+        # 倒序提交：增量文件（ChangeFeedSink 排在最前）在 data.js 替换成功后才发布
+        for sink in reversed(self.sinks):
+            sink.commit()
+        return context
+
+
+def data_js_sinks(path):
+    """保存 data.js 时的导出目标：同级 deltas/ 下的增量文件与 data.js 本身"""
+    return [ChangeFeedSink(delta_dir(os.path.dirname(path)), path), DataJsSink(path)]
+
+
+def export_sinks(directory, change_feed=False):
+    """“导出全部格式”使用的导出目标。
+
+    change_feed 只应在导出目标就是工作中的 data.js（并已持有 DataFileLock）时打开，
+    此时同时升级集合版本、写出增量文件；导出到其他目录不影响线上的增量链。
+    """
+    data_path = os.path.join(directory, "data.js")
+    sinks = [ChangeFeedSink(delta_dir(directory), data_path)] if change_feed else []
+    return sinks + [
+        DataJsSink(data_path),
+        JsonSink(os.path.join(directory, "dramas.json")),
+        CsvSink(os.path.join(directory, "dramas.csv")),
+        NdjsonSink(os.path.join(directory, "dramas.ndjson")),
+        AtomFeedSink(os.path.join(directory, "feed.xml")),
+        SitemapSink(
+            os.path.join(directory, "sitemap.xml"),
+            record_url=lambda item: f"{SITE_URL}{PAGES_DIR}/{item['id']}.html",
+        ),
+    ]
+
+
+# --- 静态页面预渲染 ---
+# 为每部作品生成 dramas/<id>.html，并把默认排序下的第一页卡片写进 index.html，
+# 首屏无需等待 app.js 渲染，也方便搜索引擎抓取。app.js 初始化后会照常接管卡片区域。
+
+PAGES_DIR = "dramas"
+PAGE_CACHE_FILE = ".render-cache.json"
+FIRST_PAGE_SIZE = 12  # 与 app.js 中 userSettings.itemsPerPage 的默认值一致
+PRERENDER_START = "<!-- prerender:start -->"
+PRERENDER_END = "<!-- prerender:end -->"
+PARALLEL_THRESHOLD = 16  # 需要渲染的页面少于该数量时直接在当前进程渲染
+
+STATUS_CLASSES = {
+    "国产": "bg-blue-100 text-blue-700 dark:bg-blue-900/50 dark:text-blue-400 border-blue-200 dark:border-blue-800",
+    "已汉化": "bg-emerald-100 text-emerald-700 dark:bg-emerald-900/50 dark:text-emerald-400 border-emerald-200 dark:border-emerald-800",
+    "未汉化": "bg-amber-100 text-amber-700 dark:bg-amber-900/50 dark:text-amber-400 border-amber-200 dark:border-amber-800",
+}
+
+DETAIL_PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$title - 东方 Project 茶番剧收藏</title>
+    <meta name="description" content="$description">
+    <meta property="og:title" content="$title">
+    <meta property="og:description" content="$description">
+    <meta property="og:image" content="$thumbnail">
+    <link rel="canonical" href="$canonical">
+    <script src="https://cdn.tailwindcss.com"></script>
+</head>
+<body class="bg-gray-50 text-zinc-900 min-h-screen">
+    <main class="max-w-3xl mx-auto px-4 py-8">
+        <a href="../index.html" class="text-sm text-zinc-500 hover:text-red-600">&larr; 返回收藏列表</a>
+        <article class="mt-4 bg-white rounded-lg border border-gray-200 overflow-hidden">
+            <img src="$thumbnail" alt="$title" class="w-full aspect-video object-cover bg-gray-100">
+            <div class="p-6">
+                <span class="px-2 py-0.5 rounded text-[10px] font-medium shadow-sm $status_class">$status</span>
+                <h1 class="text-2xl font-bold mt-3 mb-2">$title</h1>
+                <p class="text-sm text-zinc-500 mb-4">作者：$author &bull; 译者：$translators &bull; $date_added</p>
+                <p class="text-sm text-zinc-600 leading-relaxed mb-4">$description</p>
+                <div class="flex flex-wrap gap-1.5 mb-6">$tags</div>
+                <div class="flex gap-2">$links</div>
+            </div>
+        </article>
+    </main>
+</body>
+</html>
+""")
+
+CARD_TEMPLATE = Template("""
+                <a href="dramas/$id.html" class="drama-card group bg-white dark:bg-zinc-900 rounded-lg border border-gray-200 dark:border-zinc-800 flex flex-col overflow-hidden">
+                    <div class="relative aspect-video overflow-hidden bg-gray-100 dark:bg-zinc-800"$placeholder_style>
+                        <img src="$thumbnail" alt="$title" class="w-full h-full object-cover" loading="lazy"$dimensions>
+                        <div class="absolute top-2 right-2">
+                            <span class="px-2 py-0.5 rounded text-[10px] font-medium shadow-sm $status_class">$status</span>
+                        </div>
+                    </div>
+                    <div class="p-4 flex-1 flex flex-col">
+                        <h3 class="text-base font-bold text-zinc-900 dark:text-white mb-1 line-clamp-1">$title</h3>
+                        <div class="text-xs text-zinc-500 mb-2">$byline</div>
+                        <p class="text-xs text-zinc-600 dark:text-zinc-400 line-clamp-2 leading-relaxed">$description</p>
+                    </div>
+                </a>""")
+
+
+def status_text(item):
+    if item.get("isDomestic", False):
+        return "国产"
+    elif item.get("isTranslated", False):
+        return "已汉化"
+    else:
+        return "未汉化"
+
+
+def split_translators(text):
+    """拆分多译者字符串，与 app.js 中 getTranslators 的分隔符一致"""
+    if not text:
+        return []
+    return [t.strip() for t in re.split(r"[,、&和]\s*", text) if t.strip()]
+
+
+def template_hash():
+    return record_hash([DETAIL_PAGE_TEMPLATE.template, CARD_TEMPLATE.template])
+
+
+def render_detail_page(item, author_links):
+    """渲染单部作品的静态详情页"""
+
+    def person(name):
+        link = author_links.get(name)
+        if link:
+            return f'<a href="{html.escape(link)}" class="hover:text-red-600 hover:underline" target="_blank" rel="noopener noreferrer">{html.escape(name)}</a>'
+        return html.escape(name)
+
+    translators = split_translators(item.get("translator"))
+    links = []
+    if item.get("isTranslated") and item.get("translatedUrl"):
+        links.append(
+            f'<a href="{html.escape(item["translatedUrl"])}" class="py-2 px-4 rounded bg-red-600 hover:bg-red-700 text-white text-sm" target="_blank" rel="noopener noreferrer">观看汉化</a>'
+        )
+    if item.get("originalUrl"):
+        links.append(
+            f'<a href="{html.escape(item["originalUrl"])}" class="py-2 px-4 rounded border border-gray-200 hover:bg-gray-50 text-sm" target="_blank" rel="noopener noreferrer">查看原版</a>'
+        )
+    status = status_text(item)
+    return DETAIL_PAGE_TEMPLATE.substitute(
+        title=html.escape(item.get("title") or ""),
+        description=html.escape(item.get("description") or ""),
+        thumbnail=html.escape(item.get("thumbnail") or ""),
+        canonical=html.escape(f"{SITE_URL}{PAGES_DIR}/{item['id']}.html"),
+        status=status,
+        status_class=STATUS_CLASSES[status],
+        author=person(item.get("author") or ""),
+        translators="、".join(person(t) for t in translators) or "无",
+        date_added=html.escape(item.get("dateAdded") or ""),
+        tags="".join(
+            f'<span class="px-2 py-0.5 text-xs rounded bg-gray-100 text-zinc-600 border border-gray-200">#{html.escape(tag)}</span>'
+            for tag in item.get("tags") or []
+        ),
+        links="".join(links),
+    )
+
+
+def render_card(item):
+    """渲染首屏卡片，样式与 app.js 的 renderDramas 保持一致"""
+    byline = [item.get("author") or "", item.get("dateAdded") or ""]
+    translators = split_translators(item.get("translator"))
+    if translators:
+        byline.append("、".join(translators))
+    status = status_text(item)
+    placeholder_style = dimensions = ""
+    meta = item.get("thumbnailMeta")
+    if meta:
+        placeholder_style = html.escape(
+            f"background: {meta['color']} url({meta['placeholder']}) center/cover",
+            quote=False,
+        )
+        placeholder_style = f' style="{placeholder_style}"'
+        dimensions = f' width="{meta["width"]}" height="{meta["height"]}"'
+    return CARD_TEMPLATE.substitute(
+        id=item["id"],
+        placeholder_style=placeholder_style,
+        dimensions=dimensions,
+        title=html.escape(item.get("title") or ""),
+        thumbnail=html.escape(item.get("thumbnail") or ""),
+        status=status,
+        status_class=STATUS_CLASSES[status],
+        byline=" &bull; ".join(html.escape(part) for part in byline),
+        description=html.escape(item.get("description") or ""),
+    )
+
+
+def _write_detail_page(job):
+    """进程池任务：渲染并写出一页，返回记录 ID"""
+    item, author_links, path = job
+    content = render_detail_page(item, author_links)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return item["id"]
+
+
+def run_jobs(func, jobs, threshold=PARALLEL_THRESHOLD, check=None):
+    """任务较多时分发到进程池，否则在当前进程中顺序执行。
+
+    check（如 Task.check）在每个任务完成后调用；它抛出异常时尚未开始的任务不再执行。
+    """
+    results = []
+    if len(jobs) < threshold:
+        for job in jobs:
+            if check:
+                check()
+            results.append(func(job))
+        return results
+    # 使用 spawn 避免在 Tk 主循环所在进程中 fork
+    context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(mp_context=context)
+    try:
+        chunksize = max(1, len(jobs) // (os.cpu_count() or 1) // 4)
+        for result in executor.map(func, jobs, chunksize=chunksize):
+            results.append(result)
+            if check:
+                check()
+        return results
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def prerender_pages(
+    records, author_links, base_dir=".", index_path="index.html", check=None
+):
+    """增量渲染所有详情页与首屏卡片，返回 (重写页数, 跳过页数, 首页是否更新)。
+
+    check 抛出异常（取消）时不写缓存，已写出的页面下次会重新渲染一遍。
+    """
+    pages_dir = os.path.join(base_dir, PAGES_DIR)
+    os.makedirs(pages_dir, exist_ok=True)
+    cache_path = os.path.join(pages_dir, PAGE_CACHE_FILE)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    tpl_hash = template_hash()
+    old_pages = cache.get("pages", {}) if cache.get("template") == tpl_hash else {}
+
+    pages = {}
+    jobs = []
+    for item in records:
+        # 页面只依赖记录本身与其作者/译者的主页链接
+        names = [item.get("author")] + split_translators(item.get("translator"))
+        links = {n: author_links[n] for n in names if n and author_links.get(n)}
+        key = str(item["id"])
+        pages[key] = record_hash([public_record(item), links])
+        path = os.path.join(pages_dir, f"{key}.html")
+        if old_pages.get(key) != pages[key] or not os.path.exists(path):
+            jobs.append((public_record(item), links, path))
+
+    run_jobs(_write_detail_page, jobs, check=check)
+
+    # 删除已不存在的记录对应的页面
+    for key in set(cache.get("pages", {})) - set(pages):
+        try:
+            os.remove(os.path.join(pages_dir, f"{key}.html"))
+        except OSError:
+            pass
+
+    # 首屏：与 app.js 默认排序（date-desc，稳定排序）一致
+    first_page = sorted(records, key=lambda i: i.get("dateAdded") or "", reverse=True)
+    first_page = first_page[:FIRST_PAGE_SIZE]
+    index_hash = record_hash([first_page, tpl_hash])
+    index_updated = False
+    full_index_path = os.path.join(base_dir, index_path)
+    if cache.get("index") != index_hash and os.path.exists(full_index_path):
+        with open(full_index_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        start = content.find(PRERENDER_START)
+        end = content.find(PRERENDER_END)
+        if start != -1 and end > start:
+            cards = "".join(render_card(item) for item in first_page)
+            content = (
+                content[: start + len(PRERENDER_START)]
+                + cards
+                + "\n                "
+                + content[end:]
+            )
+            with open(full_index_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            index_updated = True
+
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "template": tpl_hash,
+                "pages": pages,
+                "index": index_hash if index_updated else cache.get("index"),
+            },
+            f,
+            ensure_ascii=False,
+        )
+    return len(jobs), len(records) - len(jobs), index_updated
+
+
+# --- 本地缩略图处理 ---
+# 源图片按 <id>.<扩展名> 放在本地文件夹中，生成卡片尺寸与详情尺寸两种 WebP 变体。
+# 输出目录下的 .thumbnails.json 记录每张源图的大小、修改时间与内容哈希，未变化的源图直接跳过。
+
+THUMBNAIL_OUTPUT_DIR = "images"
+THUMBNAIL_MANIFEST = ".thumbnails.json"
+THUMBNAIL_FORMAT = "webp"
+THUMBNAIL_SOURCE_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif")
+# 变体名 -> (子目录, 尺寸)；卡片变体放在输出目录根部，对应 {id}.webp 的 URL 模板
+THUMBNAIL_VARIANTS = {
+    "card": ("", (480, 270)),
+    "detail": ("detail", (1280, 720)),
+}
+
+
+def file_hash(path):
+    """分块计算文件内容哈希"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def thumbnail_variant_path(output_dir, record_id, variant):
+    subdir, _ = THUMBNAIL_VARIANTS[variant]
+    return os.path.join(output_dir, subdir, f"{record_id}.{THUMBNAIL_FORMAT}")
+
+
+def scan_thumbnail_sources(source_dir):
+    """返回 {记录ID: 源图路径}，只识别以数字 ID 命名的图片"""
+    sources = {}
+    for entry in os.scandir(source_dir):
+        stem, ext = os.path.splitext(entry.name)
+        if entry.is_file() and stem.isdigit() and ext.lower() in THUMBNAIL_SOURCE_EXTS:
+            sources[int(stem)] = entry.path
+    return sources
+
+
+def _render_thumbnail(job):
+    """进程池任务：把一张源图缩放裁切为各尺寸变体"""
+    record_id, source_path, output_dir = job
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(source_path) as img:
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            for variant, (_, size) in THUMBNAIL_VARIANTS.items():
+                path = thumbnail_variant_path(output_dir, record_id, variant)
+                fitted = ImageOps.fit(img, size, Image.LANCZOS)
+                fitted.save(path + ".tmp", format="WEBP", quality=80, method=6)
+                os.replace(path + ".tmp", path)
+        return record_id, None
+    except Exception as e:
+        return record_id, str(e)
+
+
+def process_thumbnails(source_dir, output_dir=THUMBNAIL_OUTPUT_DIR, check=None):
+    """增量生成缩略图，返回 {"processed", "skipped", "failed", "available"}。
+
+    check 抛出异常（取消）时不更新清单，已生成的图片下次会重新生成。
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise RuntimeError("处理缩略图需要 Pillow，请先运行: pip install Pillow")
+
+    for subdir, _ in THUMBNAIL_VARIANTS.values():
+        os.makedirs(os.path.join(output_dir, subdir), exist_ok=True)
+    manifest_path = os.path.join(output_dir, THUMBNAIL_MANIFEST)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    spec = record_hash([THUMBNAIL_FORMAT, THUMBNAIL_VARIANTS])
+    new_manifest = {}
+    jobs = []
+    skipped = []
+    for record_id, source_path in sorted(scan_thumbnail_sources(source_dir).items()):
+        if check:
+            check()
+        st = os.stat(source_path)
+        key = str(record_id)
+        old = manifest.get(key, {})
+        # 大小和修改时间都没变时沿用旧哈希，避免每次都重新读取整张源图
+        if old.get("size") == st.st_size and old.get("mtime") == st.st_mtime:
+            source_hash = old.get("hash")
+        else:
+            source_hash = file_hash(source_path)
+        new_manifest[key] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "hash": source_hash,
+            "spec": spec,
+        }
+        outputs_exist = all(
+            os.path.exists(thumbnail_variant_path(output_dir, record_id, v))
+            for v in THUMBNAIL_VARIANTS
+        )
+        if old.get("hash") == source_hash and old.get("spec") == spec and outputs_exist:
+            skipped.append(record_id)
+        else:
+            jobs.append((record_id, source_path, output_dir))
+
+    processed = []
+    failed = {}
+    for record_id, error in run_jobs(_render_thumbnail, jobs, threshold=4, check=check):
+        if error:
+            failed[record_id] = error
+            new_manifest.pop(str(record_id), None)
+        else:
+            processed.append(record_id)
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(new_manifest, f, ensure_ascii=False, indent=2)
+    return {
+        "processed": processed,
+        "skipped": skipped,
+        "failed": failed,
+        "available": set(processed) | set(skipped),
+    }
+
+
+# --- 缩略图占位信息 ---
+# 为每条记录的本地缩略图计算尺寸、主色调和极小的模糊占位图，写入记录的 thumbnailMeta 字段，
+# 网站可据此提前预留布局并立即绘制占位背景。结果按图片内容哈希缓存，
+# 另按文件的大小和修改时间记住上次的哈希，未改动的图片不再重新读取。
+
+PLACEHOLDER_CACHE = ".placeholders.json"
+PLACEHOLDER_WIDTH = 16  # 占位图宽度（像素），高度按原图比例计算
+PLACEHOLDER_SAMPLE = 128  # 计算主色调前先把图片缩小到的最大边长
+
+
+def _compute_placeholder(job):
+    """进程池任务：返回 (图片哈希, 占位信息, None)，失败时返回 (图片哈希, None, 错误信息)"""
+    image_hash, path = job
+    import numpy as np
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            img.draft("RGB", (PLACEHOLDER_SAMPLE, PLACEHOLDER_SAMPLE))
+            img = img.convert("RGB")
+            img.thumbnail((PLACEHOLDER_SAMPLE, PLACEHOLDER_SAMPLE))
+            pixels = np.asarray(img, dtype=np.uint8)
+    except Exception as e:
+        return image_hash, None, f"读取图片失败: {e}"
+
+    # 主色调：每通道量化到 4 位后统计直方图，取最多的颜色桶内像素的平均值
+    flat = pixels.reshape(-1, 3)
+    bins = (
+        (flat[:, 0].astype(np.int32) >> 4) << 8
+        | (flat[:, 1].astype(np.int32) >> 4) << 4
+        | (flat[:, 2].astype(np.int32) >> 4)
+    )
+    dominant = flat[bins == np.bincount(bins, minlength=4096).argmax()].mean(axis=0)
+    color = "#{:02x}{:02x}{:02x}".format(*dominant.round().astype(int))
+
+    # 模糊占位图：按区域平均把图片缩小到 PLACEHOLDER_WIDTH 宽
+    h, w, _ = pixels.shape
+    ph = max(1, round(PLACEHOLDER_WIDTH * height / width))
+    pw = PLACEHOLDER_WIDTH
+    bh, bw = max(1, h // ph), max(1, w // pw)
+    ph, pw = min(ph, h // bh), min(pw, w // bw)
+    grid = (
+        pixels[: ph * bh, : pw * bw]
+        .reshape(ph, bh, pw, bw, 3)
+        .mean(axis=(1, 3))
+        .round()
+        .astype(np.uint8)
+    )
+    buf = io.BytesIO()
+    Image.fromarray(grid).save(buf, format="WEBP", quality=50)
+    placeholder = "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode()
+
+    return (
+        image_hash,
+        {
+            "width": width,
+            "height": height,
+            "color": color,
+            "placeholder": placeholder,
+        },
+        None,
+    )
+
+
+def compute_thumbnail_meta(records, image_dir=THUMBNAIL_OUTPUT_DIR, check=None):
+    """为有本地图片的记录计算 thumbnailMeta，不修改 records。
+
+    返回 ({记录在 records 中的下标: 新的 thumbnailMeta}, 新计算的图片数, {条目 ID: 错误信息})，
+    只包含 thumbnailMeta 有变化的记录。
+    """
+    try:
+        import numpy  # noqa: F401
+        import PIL  # noqa: F401
+    except ImportError:
+        raise RuntimeError(
+            "计算占位图需要 numpy 和 Pillow，请先运行: pip install numpy Pillow"
+        )
+
+    cache_path = os.path.join(image_dir, PLACEHOLDER_CACHE)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        # 旧版缓存只有 图片哈希 -> 占位信息，读不到 files 时当作空缓存重新计算一次
+        cache = saved["images"]
+        files = saved["files"]
+    except (OSError, ValueError, KeyError, TypeError):
+        cache, files = {}, {}
+
+    sources = scan_thumbnail_sources(image_dir)
+    hashes = {}
+    new_files = {}
+    jobs = {}
+    for item in records:
+        path = sources.get(item.get("id"))
+        if not path:
+            continue
+        if check:
+            check()
+        st = os.stat(path)
+        key = str(item["id"])
+        old = files.get(key, {})
+        # 大小和修改时间都没变时沿用旧哈希，避免每次都重新读取整张图片
+        if old.get("size") == st.st_size and old.get("mtime") == st.st_mtime:
+            image_hash = old.get("hash")
+        else:
+            image_hash = file_hash(path)
+        new_files[key] = {"size": st.st_size, "mtime": st.st_mtime, "hash": image_hash}
+        hashes[item["id"]] = image_hash
+        if image_hash not in cache:
+            jobs[image_hash] = (image_hash, path)
+
+    errors = {}
+    computed = run_jobs(_compute_placeholder, list(jobs.values()), check=check)
+    for image_hash, meta, error in computed:
+        if meta:
+            cache[image_hash] = meta
+        else:
+            errors[image_hash] = error
+    failed = {
+        record_id: errors[image_hash]
+        for record_id, image_hash in hashes.items()
+        if image_hash in errors
+    }
+    for record_id in failed:
+        new_files.pop(str(record_id), None)
+
+    updates = {}
+    for i, item in enumerate(records):
+        meta = cache.get(hashes.get(item.get("id")))
+        if meta and item.get("thumbnailMeta") != meta:
+            updates[i] = meta
+
+    # 只保留仍被引用的图片，避免缓存无限增长
+    used = set(hashes.values())
+    cache = {k: v for k, v in cache.items() if k in used}
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({"images": cache, "files": new_files}, f, ensure_ascii=False)
+    return updates, len(jobs), failed
+
+
+# --- 缩略图同步 ---
+# 目标端（CDN 或本地目录）保存一份 文件名 -> 内容哈希 的清单，同步时只上传哈希不同的文件、
+# 删除本地已不存在的文件。本地目录可以直接充当 CDN 进行测试；其他 CDN 只需实现同样的接口。
+
+SYNC_MANIFEST = ".sync-manifest.json"
+SYNCED_STATE = (
+    ".synced.json"  # 与 data.js 同级，记录上次同步后目标端的清单，供生成 URL 前检查
+)
+SYNC_WORKERS = 8
+
+
+class LocalDirectoryTarget:
+    """以本地目录模拟 CDN 存储的同步目标"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, name):
+        return os.path.join(self.root, *name.split("/"))
+
+    def read_manifest(self):
+        try:
+            with open(self._path(SYNC_MANIFEST), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(SYNC_MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+    def upload(self, name, source_path):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(source_path, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def delete(self, name):
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+
+def scan_sync_files(local_dir):
+    """返回 {相对路径: 绝对路径}，忽略以点开头的清单/缓存文件"""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(local_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            if filename.startswith(".") or filename.endswith(".tmp"):
+                continue
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, local_dir).replace(os.sep, "/")
+            files[name] = path
+    return files
+
+
+def plan_thumbnail_sync(local_dir, target, check=None):
+    """对比本地文件与目标清单，返回 (本地清单, 需上传的文件名, 需删除的文件名)"""
+    local = {}
+    for name, path in scan_sync_files(local_dir).items():
+        if check:
+            check()
+        local[name] = file_hash(path)
+    remote = target.read_manifest()
+    uploads = sorted(name for name, h in local.items() if remote.get(name) != h)
+    deletes = sorted(name for name in remote if name not in local)
+    return local, uploads, deletes
+
+
+def sync_thumbnails(
+    local_dir,
+    target,
+    workers=SYNC_WORKERS,
+    dry_run=False,
+    plan=None,
+    data_path="data.js",
+    check=None,
+):
+    """并发执行最小上传/删除集合，返回 {"uploaded", "deleted", "failed"}
+
+    plan 为 plan_thumbnail_sync 的结果（如界面确认前已算好），省去再次计算所有文件的哈希。
+    同步结果另存一份到 data_path 同级的 SYNCED_STATE，与选择的本地文件夹无关。
+    check 抛出异常（取消）时不再开始新的传输，已完成的部分照常写入清单。
+    """
+    local, uploads, deletes = plan or plan_thumbnail_sync(local_dir, target, check)
+    result = {"uploaded": [], "deleted": [], "failed": {}}
+    if dry_run:
+        result["uploaded"], result["deleted"] = uploads, deletes
+        return result
+
+    manifest = target.read_manifest()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {}
+        for name in uploads:
+            path = os.path.join(local_dir, *name.split("/"))
+            futures[executor.submit(target.upload, name, path)] = (
+                "upload",
+                name,
+            )
+        for name in deletes:
+            futures[executor.submit(target.delete, name)] = ("delete", name)
+        for future in as_completed(futures):
+            action, name = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                result["failed"][name] = str(e)
+                continue
+            # 只记录成功的操作，失败的文件下次同步时会再次尝试
+            if action == "upload":
+                manifest[name] = local[name]
+                result["uploaded"].append(name)
+            else:
+                manifest.pop(name, None)
+                result["deleted"].append(name)
+            if check:
+                check()
+    finally:
+        # 取消时丢弃排队的传输；清单中只有确认完成的操作，其余的下次同步时重做
+        executor.shutdown(cancel_futures=True)
+        target.write_manifest(manifest)
+        with open(
+            beside_data_file(SYNCED_STATE, data_path), "w", encoding="utf-8"
+        ) as f:
+            json.dump(manifest, f, ensure_ascii=False)
+    return result
+
+
+def missing_thumbnail_ids(records, extension=THUMBNAIL_FORMAT, data_path="data.js"):
+    """根据上次同步的目标清单，返回缩略图 <id>.<扩展名> 尚未上传的记录 ID；从未同步过时返回 None"""
+    try:
+        with open(
+            beside_data_file(SYNCED_STATE, data_path), "r", encoding="utf-8"
+        ) as f:
+            synced = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return [item["id"] for item in records if f"{item['id']}.{extension}" not in synced]
+
+
+# --- 链接解析 ---
+# 把各平台的链接解析为 (平台, 类型, ID, 所属用户, 规范化 URL)。解析结果按 URL 记忆化，
+# 并缓存在记录的 "_links" 字段中（该字段只存在于内存，不会被导出），
+# 去重、分组和链接检查可以直接比较这些字段，无需各自再写正则。
+
+LinkInfo = namedtuple("LinkInfo", "url platform kind id owner canonical")
+LINK_FIELDS = ("originalUrl", "translatedUrl", "thumbnail")
+
+TRACKING_PARAMS = {
+    "feature",
+    "from",
+    "from_spmid",
+    "pp",
+    "si",
+    "spm_id_from",
+    "share_from",
+    "share_medium",
+    "share_plat",
+    "share_session_id",
+    "share_source",
+    "share_tag",
+    "timestamp",
+    "unique_k",
+    "vd_source",
+}
+PROFILE_KINDS = {"space", "channel", "handle", "user"}  # 会被多部作品共用的主页链接
+IN_MEMORY_FIELDS = ("_links", "_uid")  # 只存在于内存、不会被导出的记录字段
+URL_CACHE_SIZE = 1 << 18  # 合并时三个版本的链接大多相同，缓存需能容纳一整份集合
+
+
+def _youtube_link(host, path, query):
+    if host not in ("youtube.com", "youtu.be", "music.youtube.com"):
+        return None
+    if host == "youtu.be":
+        return "video", path.strip("/"), "", f"youtube.com/watch?v={path.strip('/')}"
+    if query.get("list"):
+        # watch?v=…&list=… 指向播放列表中的某一集，按播放列表处理
+        return (
+            "playlist",
+            query["list"],
+            "",
+            f"youtube.com/playlist?list={query['list']}",
+        )
+    video = re.fullmatch(r"/(?:shorts|live|embed)/([\w-]+)", path)
+    if video or query.get("v"):
+        video_id = video.group(1) if video else query["v"]
+        return "video", video_id, "", f"youtube.com/watch?v={video_id}"
+    handle = re.match(r"/(@[^/]+)", path)
+    if handle:
+        return (
+            "handle",
+            handle.group(1),
+            handle.group(1),
+            f"youtube.com/{handle.group(1)}",
+        )
+    channel = re.match(r"/(channel|c|user)/([^/]+)", path)
+    if channel:
+        kind = "user" if channel.group(1) == "user" else "channel"
+        canonical = f"youtube.com/{channel.group(1)}/{channel.group(2)}"
+        return kind, channel.group(2), channel.group(2), canonical
+    return None
+
+
+def _bilibili_link(host, path, query):
+    if host == "space.bilibili.com":
+        space = re.match(r"/(\d+)", path)
+        if not space:
+            return None
+        mid = space.group(1)
+        # 新版 /lists/<sid> 与旧版 channel/collectiondetail?sid= 指向同一合集；
+        # 系列（series）与合集的 ID 相互独立，规范化 URL 中保留 type=series
+        lists = re.match(r"/\d+/lists/(\d+)", path)
+        sid = lists.group(1) if lists else None
+        series = query.get("type") == "series"
+        old_style = re.match(r"/\d+/channel/(collection|series)detail", path)
+        if old_style:
+            sid = query.get("sid")
+            series = old_style.group(1) == "series"
+        if sid:
+            canonical = f"space.bilibili.com/{mid}/lists/{sid}"
+            return "lists", sid, mid, canonical + ("?type=series" if series else "")
+        return "space", mid, mid, f"space.bilibili.com/{mid}"
+    if host == "bilibili.com":
+        video = re.match(r"/video/(BV[0-9A-Za-z]{10}|av\d+)", path, re.IGNORECASE)
+        if video:
+            return "video", video.group(1), "", f"bilibili.com/video/{video.group(1)}"
+        return None
+    if host == "b23.tv":
+        return "short", path.strip("/"), "", f"b23.tv{path}"
+    return None
+
+
+def _niconico_link(host, path, query):
+    if host == "nico.ms":
+        return "video", path.strip("/"), "", f"nicovideo.jp/watch/{path.strip('/')}"
+    if host != "nicovideo.jp":
+        return None
+    video = re.match(r"/watch/((?:sm|nm|so)?\d+)", path)
+    if video:
+        return "video", video.group(1), "", f"nicovideo.jp/watch/{video.group(1)}"
+    mylist = re.match(r"(?:/user/(\d+))?/mylist/(\d+)", path)
+    if mylist:
+        return (
+            "mylist",
+            mylist.group(2),
+            mylist.group(1) or "",
+            f"nicovideo.jp/mylist/{mylist.group(2)}",
+        )
+    user = re.match(r"/user/(\d+)", path)
+    if user:
+        return (
+            "user",
+            user.group(1),
+            user.group(1),
+            f"nicovideo.jp/user/{user.group(1)}",
+        )
+    return None
+
+
+def _thumbnail_cdn_link(host, path, query):
+    """缩略图 CDN 模板：文件名即记录 ID"""
+    if host == "res.cloudinary.com":
+        # 版本段 v<时间戳> 只用于刷新缓存，规范化时去掉
+        cdn = re.fullmatch(
+            r"/([^/]+)/image/upload/(?:v\d+/)?(.+/)?([^/.]+)\.(\w+)", path
+        )
+        if cdn:
+            cloud, folder, name, ext = cdn.groups()
+            canonical = (
+                f"res.cloudinary.com/{cloud}/image/upload/{folder or ''}{name}.{ext}"
+            )
+            return "thumbnail", name, cloud, canonical
+    if host == "cdn.jsdelivr.net":
+        cdn = re.fullmatch(r"/gh/([^/]+/[^/@]+)(?:@[^/]+)?/(.+/)?([^/.]+)\.(\w+)", path)
+        if cdn:
+            repo, folder, name, ext = cdn.groups()
+            canonical = f"cdn.jsdelivr.net/gh/{repo}/{folder or ''}{name}.{ext}"
+            return "thumbnail", name, repo, canonical
+    return None
+
+
+# 平台名 -> 解析函数；返回 (类型, ID, 所属用户, 规范化 URL) 或 None
+URL_EXTRACTORS = {
+    "youtube": _youtube_link,
+    "bilibili": _bilibili_link,
+    "niconico": _niconico_link,
+    "cdn": _thumbnail_cdn_link,
+}
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def parse_url(url):
+    """解析链接（按 URL 记忆化）；无法识别的平台返回 platform="web" 与通用规范化 URL"""
+    url = (url or "").strip()
+    if not url.startswith(("http://", "https://")):
+        return LinkInfo(url, "", "", "", "", "")
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix) :]
+    path = parts.path.rstrip("/")
+    params = [
+        (k, v)
+        for k, v in parse_qsl(parts.query)
+        if k not in TRACKING_PARAMS and not k.startswith("utm_")
+    ]
+    query = dict(params)
+    for platform, extractor in URL_EXTRACTORS.items():
+        result = extractor(host, path, query)
+        if result:
+            return LinkInfo(url, platform, *result)
+    params.sort()
+    canonical = f"{host}{path}" + (f"?{urlencode(params)}" if params else "")
+    return LinkInfo(url, "web", "", "", "", canonical)
+
+
+def canonical_url(url):
+    """去掉协议差异、www/m 前缀、跟踪参数等，得到可比较的 URL"""
+    return parse_url(url).canonical
+
+
+def record_links(item):
+    """返回记录各链接字段的解析结果，缓存在 item["_links"]；链接改动后自动重新解析"""
+    links = item.get("_links")
+    if links is None or any(
+        links[field].url != (item.get(field) or "").strip() for field in LINK_FIELDS
+    ):
+        links = item["_links"] = {
+            field: parse_url(item.get(field) or "") for field in LINK_FIELDS
+        }
+    return links
+
+
+def annotate_links(records):
+    """为一批记录计算链接解析结果（加载和导入后调用一次）"""
+    for item in records:
+        record_links(item)
+    return records
+
+
+def public_record(item):
+    """去掉只存在于内存中的字段（IN_MEMORY_FIELDS），用于导出和计算哈希"""
+    for key in IN_MEMORY_FIELDS:
+        if key in item:
+            return {k: v for k, v in item.items() if k not in IN_MEMORY_FIELDS}
+    return item
+
+
+# --- 链接健康检查 ---
+# 基于 asyncio 的轻量 HTTP/1.1 客户端：按主机复用 keep-alive 连接，限制每个主机的并发数和请求间隔，
+# 结果带 TTL 缓存到磁盘，报告写入 link_report.json 供界面筛选。
+
+LINK_CACHE = ".link-cache.json"
+LINK_REPORT = "link_report.json"
+LINK_CACHE_TTL = 7 * 24 * 3600  # 缓存有效期（秒）
+LINK_USER_AGENT = "Mozilla/5.0 (compatible; TouhouChabangekiLinkChecker/1.0)"
+
+
+def collect_links(records, author_links):
+    """返回 [(记录ID或None, 标题/人名, 字段, URL)]，覆盖所有 URL 字段与 authorLinks"""
+    links = []
+    for item in records:
+        for field in LINK_FIELDS:
+            url = item.get(field)
+            if url and url.startswith(("http://", "https://")):
+                links.append((item.get("id"), item.get("title"), field, url))
+    for name, url in author_links.items():
+        if url and url.startswith(("http://", "https://")):
+            links.append((None, name, "authorLinks", url))
+    return links
+
+
+class _HostState:
+    """单个主机的连接池、并发限制与请求节流"""
+
+    def __init__(self, concurrency, interval):
+        self.idle = []
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = interval
+        self.next_time = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait_turn(self):
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            now = loop.time()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class LinkChecker:
+    def __init__(
+        self,
+        per_host=4,
+        interval=0.2,
+        timeout=10,
+        cache_path=LINK_CACHE,
+        ttl=LINK_CACHE_TTL,
+        max_redirects=5,
+    ):
+        self.per_host = per_host
+        self.interval = interval
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_redirects = max_redirects
+        self.cancelled = False
+        self._loop = None
+        self._tasks = []
+        self._ssl = None
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self, cache):
+        with open(self.cache_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(self.cache_path + ".tmp", self.cache_path)
+
+    def run(self, urls, progress=None):
+        """检查所有 URL（同步入口），返回 {url: 结果}；被取消时只含已完成的部分"""
+        return asyncio.run(self.check_all(urls, progress))
+
+    def cancel(self):
+        """可在任意线程中调用：不再发出新请求，并中止正在进行的请求"""
+        self.cancelled = True
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._cancel_tasks)
+            except RuntimeError:
+                pass  # 事件循环刚好结束
+
+    def _cancel_tasks(self):
+        for task in self._tasks:
+            task.cancel()
+
+    async def check_all(self, urls, progress=None):
+        cache = self.load_cache()
+        now = time.time()
+        unique = list(dict.fromkeys(urls))
+        todo = [
+            u for u in unique if now - cache.get(u, {}).get("checked", 0) > self.ttl
+        ]
+        self._hosts = {}
+        done = len(unique) - len(todo)
+        if progress:
+            progress(done, len(unique))
+
+        async def worker(url):
+            nonlocal done
+            result = await self._check(url)
+            if result is None:
+                return
+            cache[url] = result
+            done += 1
+            if progress:
+                progress(done, len(unique))
+
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [asyncio.ensure_future(worker(u)) for u in todo]
+        if self.cancelled:
+            self._cancel_tasks()
+        try:
+            # 被取消的任务以 CancelledError 结束，不计入结果
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            self._loop, self._tasks = None, []
+            for state in self._hosts.values():
+                for _, writer in state.idle:
+                    writer.close()
+            self.save_cache(cache)
+        return {u: cache[u] for u in unique if u in cache}
+
+    async def _check(self, url):
+        """检查单个 URL，返回结果；已被取消时返回 None"""
+        result = {"status": None, "ok": False, "finalUrl": url, "error": None}
+        try:
+            current = url
+            for _ in range(self.max_redirects + 1):
+                # 每个请求（包括每一跳重定向）之前都检查是否已被取消
+                if self.cancelled:
+                    return None
+                status, headers = await self._request("HEAD", current)
+                # 部分站点不支持 HEAD，改用 GET 只读取响应头
+                if status in (403, 405, 501):
+                    if self.cancelled:
+                        return None
+                    status, headers = await self._request("GET", current)
+                if status in (301, 302, 303, 307, 308) and headers.get("location"):
+                    current = urljoin(current, headers["location"])
+                    continue
+                break
+            else:
+                result["error"] = "重定向次数过多"
+            result.update(status=status, finalUrl=current)
+            result["ok"] = result["error"] is None and 200 <= status < 400
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}".rstrip(": ")
+        result["checked"] = time.time()
+        return result
+
+    async def _request(self, method, url):
+        parts = urlsplit(url)
+        scheme = parts.scheme
+        host = parts.hostname.encode("idna").decode("ascii")
+        default_port = 443 if scheme == "https" else 80
+        port = parts.port or default_port
+        # Host 头需带上非默认端口，IPv6 地址加方括号
+        host_header = f"[{host}]" if ":" in host else host
+        if port != default_port:
+            host_header += f":{port}"
+        path = quote(parts.path or "/", safe="/%:@!$&'()*+,;=-._~")
+        if parts.query:
+            path += "?" + quote(parts.query, safe="=&%/:+,;@!$'()*-._~")
+
+        if scheme == "https" and self._ssl is None:
+            # 所有 https 连接共用一个 SSL 上下文，避免每次连接都重新加载证书
+            self._ssl = ssl.create_default_context()
+        key = (scheme, host, port)
+        state = self._hosts.get(key)
+        if state is None:
+            state = self._hosts[key] = _HostState(self.per_host, self.interval)
+
+        async with state.semaphore:
+            await state.wait_turn()
+            # 复用的空闲连接可能已被服务器关闭，失败时换新连接重试一次
+            for attempt in range(2):
+                reused = bool(state.idle) and method == "HEAD" and attempt == 0
+                if reused:
+                    reader, writer = state.idle.pop()
+                else:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(
+                            host,
+                            port,
+                            ssl=self._ssl if scheme == "https" else None,
+                        ),
+                        self.timeout,
+                    )
+                keep_alive = method == "HEAD"
+                request = (
+                    f"{method} {path} HTTP/1.1\r\n"
+                    f"Host: {host_header}\r\n"
+                    f"User-Agent: {LINK_USER_AGENT}\r\n"
+                    "Accept: */*\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                )
+                try:
+                    writer.write(request.encode("ascii"))
+                    await writer.drain()
+                    status, headers = await asyncio.wait_for(
+                        self._read_head(reader), self.timeout
+                    )
+                except Exception:
+                    writer.close()
+                    if reused:
+                        continue
+                    raise
+                break
+            # HEAD 响应没有正文，服务器未要求关闭时连接可以复用
+            if keep_alive and headers.get("connection", "").lower() != "close":
+                state.idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, headers
+
+    async def _read_head(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("连接被关闭")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+
+def check_links(
+    records, author_links, checker=None, progress=None, data_path="data.js"
+):
+    """检查所有链接并把报告写到 data_path 同级的 LINK_REPORT，返回报告行列表。
+
+    checker 被取消时抛出 TaskCancelled，已完成的结果仍写入缓存，但不写出不完整的报告。
+    """
+    checker = checker or LinkChecker()
+    links = collect_links(records, author_links)
+    results = checker.run([url for *_, url in links], progress)
+    if checker.cancelled:
+        raise TaskCancelled()
+    report = []
+    for record_id, label, field, url in links:
+        result = results.get(url, {})
+        report.append(
+            {
+                "id": record_id,
+                "label": label,
+                "field": field,
+                "url": url,
+                "status": result.get("status"),
+                "ok": result.get("ok", False),
+                "finalUrl": result.get("finalUrl"),
+                "error": result.get("error"),
+            }
+        )
+    with open(beside_data_file(LINK_REPORT, data_path), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+# --- 元数据批量抓取 ---
+# 根据原版/汉化链接，通过各平台适配器抓取标题、作者、简介等信息并生成草稿条目。
+# 适配器可插拔（追加到 METADATA_ADAPTERS 即可），请求在有界线程池中并发执行，
+# 原始响应按请求 URL 缓存到磁盘，重复抓取同一链接不会再次访问网络。
+
+METADATA_CACHE = ".metadata-cache.json"
+METADATA_CACHE_TTL = 30 * 24 * 3600  # 缓存有效期（秒）
+METADATA_WORKERS = 4
+
+
+class MetadataAdapter:
+    """平台适配器基类：matches 判断链接归属，request_url 给出要抓取的地址，parse 解析响应"""
+
+    platform = ""
+    hosts = ()
+
+    def __init__(self, api_base=None):
+        # api_base 可指向本地测试服务器
+        self.api_base = api_base
+
+    def matches(self, url):
+        host = (urlsplit(url).hostname or "").lower()
+        return any(host == h or host.endswith("." + h) for h in self.hosts)
+
+    def request_url(self, url):
+        return url
+
+    def parse(self, body, url):
+        """返回 {title, author, description, thumbnail} 中能取到的字段"""
+        raise NotImplementedError
+
+
+class YouTubeAdapter(MetadataAdapter):
+    """YouTube 视频与播放列表，使用 oEmbed 接口"""
+
+    platform = "youtube"
+    hosts = ("youtube.com", "youtu.be")
+
+    def request_url(self, url):
+        base = self.api_base or "https://www.youtube.com"
+        return f"{base}/oembed?format=json&url={quote(url, safe='')}"
+
+    def parse(self, body, url):
+        data = json.loads(body)
+        return {
+            "title": data.get("title", ""),
+            "author": data.get("author_name", ""),
+            "thumbnail": data.get("thumbnail_url", ""),
+        }
+
+
+class BilibiliAdapter(MetadataAdapter):
+    """哔哩哔哩视频（BV 号）与空间合集"""
+
+    platform = "bilibili"
+    hosts = ("bilibili.com", "b23.tv")
+
+    def request_url(self, url):
+        base = self.api_base or "https://api.bilibili.com"
+        link = parse_url(url)
+        if link.kind == "lists":
+            return (
+                f"{base}/x/polymer/web-space/seasons_archives_list"
+                f"?mid={link.owner}&season_id={link.id}&page_num=1&page_size=1"
+            )
+        if link.kind == "video" and link.id.upper().startswith("BV"):
+            return f"{base}/x/web-interface/view?bvid={link.id}"
+        if link.kind == "video":
+            return f"{base}/x/web-interface/view?aid={link.id[2:]}"
+        raise ValueError("无法识别的哔哩哔哩链接")
+
+    def parse(self, body, url):
+        data = json.loads(body)
+        if data.get("code"):
+            raise ValueError(data.get("message") or f"接口错误 {data['code']}")
+        data = data["data"]
+        if "meta" in data:
+            meta = data["meta"]
+            return {
+                "title": meta.get("name", ""),
+                "description": meta.get("description", ""),
+                "thumbnail": meta.get("cover", ""),
+            }
+        return {
+            "title": data.get("title", ""),
+            "author": data.get("owner", {}).get("name", ""),
+            "description": data.get("desc", ""),
+            "thumbnail": data.get("pic", ""),
+        }
+
+
+class NiconicoAdapter(MetadataAdapter):
+    """ニコニコ動画，使用 getthumbinfo 接口"""
+
+    platform = "niconico"
+    hosts = ("nicovideo.jp", "nico.ms")
+
+    def request_url(self, url):
+        link = parse_url(url)
+        if link.kind != "video":
+            raise ValueError("无法识别的ニコニコ動画链接")
+        base = self.api_base or "https://ext.nicovideo.jp"
+        return f"{base}/api/getthumbinfo/{link.id}"
+
+    def parse(self, body, url):
+        from xml.etree import ElementTree
+
+        root = ElementTree.fromstring(body)
+        thumb = root.find("thumb")
+        if thumb is None:
+            raise ValueError(root.findtext("error/description") or "视频不存在")
+        return {
+            "title": thumb.findtext("title", ""),
+            "author": thumb.findtext("user_nickname", ""),
+            "description": thumb.findtext("description", ""),
+            "thumbnail": thumb.findtext("thumbnail_url", ""),
+        }
+
+
+class OpenGraphAdapter(MetadataAdapter):
+    """兜底适配器：读取页面中的 Open Graph 标签"""
+
+    platform = "web"
+
+    def matches(self, url):
+        return url.startswith(("http://", "https://"))
+
+    def parse(self, body, url):
+        meta = {}
+        for tag in re.findall(r"<meta\s[^>]*>", body, re.IGNORECASE):
+            prop = re.search(r'(?:property|name)=["\']([^"\']+)["\']', tag)
+            content = re.search(r'content=["\']([^"\']*)["\']', tag)
+            if prop and content:
+                meta.setdefault(prop.group(1).lower(), html.unescape(content.group(1)))
+        return {
+            "title": meta.get("og:title", ""),
+            "author": meta.get("author", ""),
+            "description": meta.get("og:description", ""),
+            "thumbnail": meta.get("og:image", ""),
+        }
+
+
+METADATA_ADAPTERS = [
+    YouTubeAdapter(),
+    BilibiliAdapter(),
+    NiconicoAdapter(),
+    OpenGraphAdapter(),
+]
+
+
+class MetadataFetcher:
+    def __init__(
+        self,
+        adapters=None,
+        workers=METADATA_WORKERS,
+        timeout=10,
+        cache_path=METADATA_CACHE,
+        ttl=METADATA_CACHE_TTL,
+    ):
+        self.adapters = adapters if adapters is not None else METADATA_ADAPTERS
+        self.workers = workers
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.cancelled = False
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def adapter_for(self, url):
+        for adapter in self.adapters:
+            if adapter.matches(url):
+                return adapter
+        return None
+
+    def _download(self, request_url):
+        with self._lock:
+            cached = self._cache.get(request_url)
+        if cached and time.time() - cached["fetched"] <= self.ttl:
+            return cached["body"]
+        from urllib.request import Request, urlopen
+
+        request = Request(request_url, headers={"User-Agent": LINK_USER_AGENT})
+        with urlopen(request, timeout=self.timeout) as response:
+            charset = response.headers.get_content_charset() or "utf-8"
+            body = response.read().decode(charset, errors="replace")
+        with self._lock:
+            self._cache[request_url] = {"fetched": time.time(), "body": body}
+        return body
+
+    def fetch(self, url):
+        """抓取单个链接，返回 (平台, 字段字典)"""
+        adapter = self.adapter_for(url)
+        if adapter is None:
+            raise ValueError("没有可用的适配器")
+        body = self._download(adapter.request_url(url))
+        return adapter.platform, adapter.parse(body, url)
+
+    def fetch_all(self, urls, progress=None):
+        """并发抓取，返回 {url: (平台, 字段)} 与 {url: 错误信息}"""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                self._cache = json.load(f)
+        except (OSError, ValueError):
+            self._cache = {}
+        unique = list(dict.fromkeys(urls))
+        results, errors = {}, {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    pool.submit(self._fetch_unless_cancelled, u): u for u in unique
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    url = futures[future]
+                    try:
+                        result = future.result()
+                        if result is not None:
+                            results[url] = result
+                    except Exception as e:
+                        errors[url] = f"{type(e).__name__}: {e}"
+                    if progress:
+                        progress(done, len(unique))
+        finally:
+            with open(self.cache_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self._cache, f, ensure_ascii=False)
+            os.replace(self.cache_path + ".tmp", self.cache_path)
+        return results, errors
+
+    def _fetch_unless_cancelled(self, url):
+        if self.cancelled:
+            return None
+        return self.fetch(url)
+
+
+def parse_url_lines(text):
+    """每行一个条目：原版链接，可选地跟一个汉化链接（空白分隔）"""
+    pairs = []
+    for line in text.splitlines():
+        urls = [u.strip("`") for u in line.split()]
+        urls = [u for u in urls if u.startswith(("http://", "https://"))]
+        if urls:
+            pairs.append((urls[0], urls[1] if len(urls) > 1 else ""))
+    return pairs
+
+
+def _space_owner(url, author_links):
+    """合集接口不返回 UP 主名称，按 authorLinks 中的空间链接反查"""
+    link = parse_url(url)
+    if link.platform != "bilibili" or not link.owner:
+        return ""
+    for name, author_url in author_links.items():
+        author = parse_url(author_url)
+        if author.platform == "bilibili" and author.owner == link.owner:
+            return name
+    return ""
+
+
+def build_drafts(pairs, fetcher=None, existing=(), author_links=None, progress=None):
+    """抓取元数据并生成草稿条目。返回 (草稿列表, {url: 错误}, 已存在而跳过的链接)
+
+    原版链接抓取失败的条目不生成草稿；只有汉化链接失败时仍生成草稿（汉化信息留空），
+    错误同样列在返回的错误中。dateAdded 为收录当天的日期，而不是视频的发布日期。
+    """
+    fetcher = fetcher or MetadataFetcher()
+    author_links = author_links or {}
+    known = {item.get("originalUrl") for item in existing}
+    known |= {item.get("translatedUrl") for item in existing}
+    known.discard("")
+    skipped = [orig for orig, _ in pairs if orig in known]
+    pairs = [(orig, trans) for orig, trans in pairs if orig not in known]
+    results, errors = fetcher.fetch_all(
+        [u for pair in pairs for u in pair if u], progress
+    )
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    drafts = []
+    for orig, trans in pairs:
+        if orig not in results:
+            continue
+        platform, source = results[orig]
+        translated = results[trans][1] if trans in results else {}
+        drafts.append(
+            {
+                "id": 0,
+                "title": translated.get("title") or source.get("title", ""),
+                "author": source.get("author") or _space_owner(orig, author_links),
+                "translator": translated.get("author")
+                or _space_owner(trans, author_links),
+                "tags": [],
+                "isTranslated": bool(trans),
+                "isDomestic": platform == "bilibili" and not trans,
+                "originalUrl": orig,
+                "translatedUrl": trans,
+                "description": (
+                    translated.get("description") or source.get("description", "")
+                ).strip(),
+                "thumbnail": translated.get("thumbnail") or source.get("thumbnail", ""),
+                "dateAdded": today,
+            }
+        )
+    return drafts, errors, skipped
+
+
+# --- 批量导入 ---
+# 流式读取 JSON 数组、NDJSON 和 CSV，逐行清理与校验，整批只重新编号和保存一次。
+
+IMPORT_CHUNK_SIZE = 64 * 1024
+IMPORT_MAX_RECORD = 1024 * 1024  # JSON 中单个元素的最大长度（字符）
+JSON_WHITESPACE = " \t\r\n\ufeff"
+IMPORT_FORMATS = {
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+}
+TRUE_VALUES = {"true", "1", "yes", "是"}
+FALSE_VALUES = {"false", "0", "no", "否", ""}
+
+
+def _iter_json_values(f):
+    """逐个解析 JSON 数组中的元素，不整体读入内存。
+
+    也接受单个对象、连续的多个对象，以及“导出全部格式”生成的 {"dramas": [...]}。
+    外层数组之外出现的 [ 或 ]，以及超过 IMPORT_MAX_RECORD 仍无法解析的元素都视为格式错误，
+    不会为了等一个解析不了的元素而把整个文件读进内存。
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(IMPORT_CHUNK_SIZE)
+        eof = not chunk
+        # 只在读入新块时丢掉已解析的部分，避免每解析一项就复制一遍剩余的缓冲区
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def peek(skipped):
+        """跳过 skipped 中的字符，返回下一个字符；到达文件末尾时返回空串"""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in skipped:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos : pos + 1]
+            fill()
+
+    def decode(index):
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # 恰好解析到缓冲区末尾时可能是被截断的数字等，读入下一块再确认
+                if end < len(buffer) or eof:
+                    return value, end
+            except json.JSONDecodeError as e:
+                if eof or len(buffer) - pos > IMPORT_MAX_RECORD:
+                    raise ValueError(f"第 {index} 项 JSON 格式错误: {e}")
+            fill()
+
+    # 读够开头一段再判断是否为导出格式的外层对象
+    while len(buffer) < 64 and not eof:
+        fill()
+    wrapped = re.match(r'[\s\ufeff]*\{\s*"dramas"\s*:\s*\[', buffer)
+    if wrapped:
+        pos = wrapped.end()
+    in_array = bool(wrapped) or peek(JSON_WHITESPACE) == "["
+    if in_array and not wrapped:
+        pos += 1
+    index = 0
+    while True:
+        char = peek(JSON_WHITESPACE + ",")
+        if not char:
+            if in_array:
+                raise ValueError("JSON 数组缺少结尾的 ]")
+            return
+        if char == "]" and in_array:
+            pos += 1
+            # 导出格式的外层对象在数组之后结束，其余内容无需再读
+            if not wrapped and peek(JSON_WHITESPACE):
+                raise ValueError("JSON 数组结束之后还有多余的内容")
+            return
+        if char in "[]" and not in_array:
+            raise ValueError(f"第 {index + 1} 项之前有多余的 {char}")
+        value, pos = decode(index + 1)
+        index += 1
+        yield index, value
+
+
+def iter_import_rows(f, fmt):
+    """按格式逐行产出 (行号, 原始值)；单行解析失败时产出 (行号, 异常)"""
+    if fmt == "json":
+        yield from _iter_json_values(f)
+    elif fmt == "ndjson":
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, ValueError(f"JSON 格式错误: {e}")
+    elif fmt == "csv":
+        reader = csv.DictReader(f)
+        for line_no, row in enumerate(reader, 2):
+            yield line_no, row
+    else:
+        raise ValueError(f"不支持的导入格式: {fmt}")
+
+
+def _parse_bool(value, field):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"{field} 应为 true/false，实际为 {value!r}")
+
+
+def normalize_import_item(raw):
+    """清理单条导入数据（去反引号、按"，"拆分标签）并校验，返回规范化的记录"""
+    if not isinstance(raw, dict):
+        raise ValueError("每一项都应是对象")
+    item = {}
+    for key, value in raw.items():
+        if isinstance(value, str):
+            value = value.replace("`", "").strip()
+        elif isinstance(value, list):
+            value = [v.replace("`", "") if isinstance(v, str) else v for v in value]
+        item[(key or "").strip()] = value
+
+    tags = item.get("tags") or []
+    if isinstance(tags, str):
+        tags = [tags]
+    if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+        raise ValueError("tags 应为字符串列表")
+    # 标签字符串中可能用"，"连接了多个标签
+    tags = [t.strip() for tag_str in tags for t in tag_str.split("，") if t.strip()]
+
+    record = {"id": 0, "title": item.get("title") or ""}
+    for field in ("author", "translator", "originalUrl", "translatedUrl"):
+        record[field] = str(item.get(field) or "")
+    record["tags"] = tags
+    record["isTranslated"] = _parse_bool(
+        item.get("isTranslated", False), "isTranslated"
+    )
+    record["isDomestic"] = _parse_bool(item.get("isDomestic", False), "isDomestic")
+    record["description"] = str(item.get("description") or "")
+    record["thumbnail"] = str(item.get("thumbnail") or "")
+    if isinstance(item.get("thumbnailMeta"), dict):
+        record["thumbnailMeta"] = item["thumbnailMeta"]
+    record["dateAdded"] = str(
+        item.get("dateAdded") or datetime.now().strftime("%Y-%m-%d")
+    )
+    errors = RECORD_VALIDATOR.validate_one(record)
+    if errors:
+        raise ValueError("；".join(f"{field} {message}" for field, message in errors))
+    # 保持与 data.js 相同的字段顺序
+    order = CSV_FIELDS + ["thumbnailMeta"]
+    record = {k: record[k] for k in sorted(record, key=order.index)}
+    record_links(record)
+    return record
+
+
+def import_records(f, fmt, check=None):
+    """读取整批导入数据，返回 (记录列表, [(行号, 错误信息)])；check 在每行之前调用"""
+    records, errors = [], []
+    try:
+        for line_no, raw in iter_import_rows(f, fmt):
+            if check:
+                check()
+            try:
+                if isinstance(raw, Exception):
+                    raise raw
+                records.append(normalize_import_item(raw))
+            except ValueError as e:
+                errors.append((line_no, str(e)))
+    except ValueError as e:
+        # JSON 数组中途损坏时无法继续定位后续元素
+        errors.append((None, str(e)))
+    return records, errors
+
+
+def import_file(path, fmt=None, check=None):
+    """按扩展名判断格式并导入文件"""
+    fmt = fmt or IMPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"无法根据扩展名判断格式: {path}")
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+    with open(path, "r", encoding=encoding, newline="" if fmt == "csv" else None) as f:
+        return import_records(f, fmt, check)
+
+
+# --- 重复检测 ---
+# 规范化 URL 做哈希精确匹配，标题按字符二元组建立倒排索引做模糊匹配；
+# 每次查询只访问共享二元组的少数候选，集合很大时也能近似常数时间完成。
+
+TITLE_SIMILARITY = 0.75  # 标题二元组 Dice 系数阈值
+GRAM_POSTING_LIMIT = 1000  # 出现在过多标题中的二元组区分度低，查询时跳过
+
+
+def normalize_title(title):
+    """全角转半角、小写化并去掉标点和空白"""
+    text = unicodedata.normalize("NFKC", title or "").lower()
+    return "".join(ch for ch in text if ch.isalnum())
+
+
+def title_grams(normalized):
+    if len(normalized) < 2:
+        return frozenset([normalized]) if normalized else frozenset()
+    return frozenset(normalized[i : i + 2] for i in range(len(normalized) - 1))
+
+
+class RecordIndex:
+    """以记录对象本身为单位增删、随 RecordCollection 的变更事件更新的派生索引。
+
+    倒排表中存放加入时分配的序号，keys 把 id(记录) 映射到序号，entries 为 序号 -> [记录, ...]：
+    重新编号换成新的记录对象时只需改 keys（rekey），不必重建倒排表。
+    子类实现 _index（计算索引项并登记到倒排表）与 _unindex（按加入时的索引项撤销登记）。
+    """
+
+    def __init__(self, records=()):
+        self.keys = {}
+        self.entries = {}
+        self._serial = itertools.count()
+        for item in records:
+            self.add(item)
+
+    def _index(self, key, item):
+        """登记 item，返回索引项（首个元素为记录本身）"""
+        raise NotImplementedError
+
+    def _unindex(self, key, entry):
+        raise NotImplementedError
+
+    def add(self, item):
+        if id(item) in self.keys:
+            self.remove(item)
+        key = self.keys[id(item)] = next(self._serial)
+        self.entries[key] = self._index(key, item)
+
+    def remove(self, item):
+        key = self.keys.pop(id(item), None)
+        if key is not None:
+            self._unindex(key, self.entries.pop(key))
+
+    def rekey(self, changes):
+        """changes 为 RecordsRenumbered.changes：新记录只改了 ID，沿用旧记录的索引项"""
+        keys, entries = self.keys, self.entries
+        for _, old, item in changes:
+            key = keys.pop(id(old), None)
+            if key is None:
+                self.add(item)
+                continue
+            keys[id(item)] = key
+            entries[key][0] = item
+
+    def apply(self, event):
+        """按 RecordCollection 的变更事件更新索引"""
+        if isinstance(event, RecordInserted):
+            self.add(event.item)
+        elif isinstance(event, RecordRemoved):
+            self.remove(event.item)
+        elif isinstance(event, RecordUpdated):
+            self.remove(event.old)
+            self.add(event.item)
+        elif isinstance(event, RecordsRenumbered):
+            self.rekey(event.changes)
+        elif isinstance(event, CollectionReset):
+            # 沿用的记录对象已在索引中，只增删变化的部分
+            keep = {id(item) for item in event.records}
+            for item, *_ in list(self.entries.values()):
+                if id(item) not in keep:
+                    self.remove(item)
+            for item in event.records:
+                if id(item) not in self.keys:
+                    self.add(item)
+
+
+class DuplicateIndex(RecordIndex):
+    """重复检测索引；find 返回疑似重复的记录"""
+
+    def __init__(self, records=(), threshold=TITLE_SIMILARITY):
+        self.threshold = threshold
+        # 索引项为 [记录, URL 键, 规范化标题, 二元组]；删除时使用加入时的值
+        self.urls = {}
+        self.titles = {}
+        self.grams = {}
+        super().__init__(records)
+
+    def _url_keys(self, item):
+        keys = set()
+        links = record_links(item)
+        for field in ("originalUrl", "translatedUrl"):
+            link = links[field]
+            if link.canonical and link.kind not in PROFILE_KINDS:
+                keys.add((field, link.canonical))
+        return keys
+
+    def _index(self, key, item):
+        url_keys = self._url_keys(item)
+        normalized = normalize_title(item.get("title"))
+        grams = title_grams(normalized)
+        for url in url_keys:
+            self.urls.setdefault(url, set()).add(key)
+        if normalized:
+            self.titles.setdefault(normalized, set()).add(key)
+        for gram in grams:
+            self.grams.setdefault(gram, set()).add(key)
+        return [item, url_keys, normalized, grams]
+
+    def _unindex(self, key, entry):
+        _, url_keys, normalized, grams = entry
+        for url in url_keys:
+            self.urls[url].discard(key)
+        if normalized:
+            self.titles[normalized].discard(key)
+        for gram in grams:
+            self.grams[gram].discard(key)
+
+    def find(self, item, exclude=None):
+        """返回 [(记录, 原因, 相似度)]，按相似度从高到低排列"""
+        matches = {}
+        translated = bool(item.get("translatedUrl"))
+        for field, url in self._url_keys(item):
+            for key in self.urls.get((field, url), ()):
+                other = self.entries[key][0]
+                # 同一个原版播放列表可能对应多部不同的汉化作品，双方都有汉化链接时不算重复
+                if field == "originalUrl" and translated and other.get("translatedUrl"):
+                    continue
+                reason = "汉化链接相同" if field == "translatedUrl" else "原版链接相同"
+                matches[key] = (reason, 1.0)
+        normalized = normalize_title(item.get("title"))
+        for key in self.titles.get(normalized, ()) if normalized else ():
+            matches.setdefault(key, ("标题相同", 1.0))
+
+        grams = title_grams(normalized)
+        if len(grams) > 1:
+            # 只对共享二元组的候选计算相似度，跳过过于常见的二元组
+            candidates = set()
+            for gram in grams:
+                posting = self.grams.get(gram, ())
+                if len(posting) <= GRAM_POSTING_LIMIT:
+                    candidates.update(posting)
+            for key in candidates:
+                if key in matches:
+                    continue
+                other = self.entries[key][3]
+                score = 2 * len(grams & other) / (len(grams) + len(other))
+                if score >= self.threshold:
+                    matches[key] = ("标题相似", round(score, 2))
+
+        matches.pop(self.keys.get(id(exclude)), None)
+        matches.pop(self.keys.get(id(item)), None)
+        return sorted(
+            (
+                (self.entries[key][0], reason, score)
+                for key, (reason, score) in matches.items()
+            ),
+            key=lambda m: -m[2],
+        )
+
+
+def find_duplicate_pairs(records, threshold=TITLE_SIMILARITY):
+    """找出集合中所有疑似重复的记录对，返回 [(记录, 记录, 原因, 相似度)]"""
+    index = DuplicateIndex(threshold=threshold)
+    pairs = []
+    for item in records:
+        for other, reason, score in index.find(item):
+            pairs.append((other, item, reason, score))
+        index.add(item)
+    return pairs
+
+
+def describe_duplicates(matches, limit=3):
+    """把 find 的结果格式化为提示文本"""
+    lines = []
+    for other, reason, score in matches[:limit]:
+        label = f"[{other['id']}] " if other.get("id") else ""
+        if reason == "标题相似":
+            reason += f" {score:.0%}"
+        lines.append(f"- {label}{other.get('title')}（{reason}）")
+    if len(matches) > limit:
+        lines.append(f"- ……另有 {len(matches) - limit} 条")
+    return "\n".join(lines)
+
+
+# --- 全文搜索 ---
+# 复用重复检测的规范化与字符二元组（另加单字，供单字查询使用）：每个词的倒排表求交
+# 得到候选，再用子串匹配确认并按命中的字段打分，不必在每次按键时扫描所有记录的全文。
+
+# 参与搜索的字段及权重；词出现在字段开头时得分加倍
+SEARCH_FIELDS = (("title", 4), ("author", 2), ("translator", 2), ("description", 1))
+
+
+class SearchIndex(RecordIndex):
+    """搜索用的二元组倒排索引"""
+
+    def __init__(self, records=()):
+        # 索引项为 [记录, ((规范化文本, 权重), ...), 二元组与单字]
+        self.grams = {}
+        super().__init__(records)
+
+    def _index(self, key, item):
+        texts = tuple(
+            (normalize_title(item.get(field)), weight)
+            for field, weight in SEARCH_FIELDS
+        )
+        grams = frozenset().union(*(title_grams(text) | set(text) for text, _ in texts))
+        for gram in grams:
+            self.grams.setdefault(gram, set()).add(key)
+        return [item, texts, grams]
+
+    def _unindex(self, key, entry):
+        for gram in entry[2]:
+            posting = self.grams[gram]
+            posting.discard(key)
+            if not posting:
+                del self.grams[gram]
+
+    def search(self, text):
+        """返回 [(得分, 记录)]，不保证顺序；空格分隔的每个词都必须出现在某个字段中"""
+        terms = [term for term in map(normalize_title, text.split()) if term]
+        if not terms:
+            return []
+        postings = sorted(
+            (
+                self.grams.get(gram, set())
+                for term in terms
+                for gram in title_grams(term)
+            ),
+            key=len,
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                return []
+            candidates &= posting
+        results = []
+        entries = self.entries
+        for key in candidates:
+            item, texts, _ = entries[key]
+            score = 0
+            for term in terms:
+                hit = 0
+                for text, weight in texts:
+                    if term in text:
+                        hit += weight * 2 if text.startswith(term) else weight
+                if not hit:
+                    break
+                score += hit
+            else:
+                results.append((score, item))
+        return results
+
+
+# --- 表格排序 ---
+# 排序键只在记录第一次参与排序时计算并缓存，随集合的变更事件失效；
+# 点击列头时只比较缓存的键，不必为每一行重新做拼音/假名的归一化。
+
+SORT_COLUMNS = ("id", "title", "author", "translator", "status", "date")
+
+
+@lru_cache(maxsize=None)
+def _pinyin():
+    """可选依赖 pinyin 库，未安装时返回 None"""
+    try:
+        import pinyin
+    except ImportError:
+        return None
+    return pinyin
+
+
+@lru_cache(maxsize=65536)
+def collation_key(text):
+    """中日文混排文本的排序键：数字与拉丁字母在前，其次假名（片假名按平假名排），
+    最后汉字；安装了 pinyin 库时汉字按拼音排序，否则按码位。"""
+    pinyin = _pinyin()
+    parts = []
+    for ch in unicodedata.normalize("NFKC", text or "").casefold():
+        if ch.isascii():
+            if ch.isalnum():
+                parts.append("0" + ch)
+        elif "ァ" <= ch <= "ヶ":
+            parts.append("1" + chr(ord(ch) - 0x60))
+        elif "ぁ" <= ch <= "ゖ" or ch == "ー":
+            parts.append("1" + ch)
+        elif "一" <= ch <= "鿿":
+            # 空格使 "li" 排在 "lin" 之前
+            parts.append("2" + (pinyin.get(ch, format="strip") if pinyin else ch) + " ")
+        elif ch.isalnum():
+            parts.append("3" + ch)
+    return "".join(parts)
+
+
+def date_ordinal(value):
+    """YYYY-MM-DD 转为序数，缺失或无法解析的日期排在最前"""
+    try:
+        return datetime.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+class SortKeys:
+    """按列缓存每条记录的排序键，以记录对象本身为单位随集合的变更事件失效。
+
+    传入 records 时预先计算它们各列的键（在后台加载时调用），之后只有新增或修改的记录
+    在第一次排序时计算。
+    """
+
+    def __init__(self, records=()):
+        # id(记录) -> {列: 排序键}；ID 列不缓存
+        self.cache = {}
+        for item in records:
+            self.cache[id(item)] = {
+                column: self.compute(column, item)
+                for column in SORT_COLUMNS
+                if column != "id"
+            }
+
+    @staticmethod
+    def compute(column, item):
+        if column == "id":
+            return item["id"]
+        if column == "status":
+            return STATUS_KEYS.index(status_key(item))
+        if column == "date":
+            return date_ordinal(item.get("dateAdded"))
+        return collation_key(item.get(column) or "")
+
+    def key(self, column, item):
+        if column == "id":
+            return item["id"]
+        keys = self.cache.get(id(item))
+        if keys is None:
+            keys = self.cache[id(item)] = {}
+        key = keys.get(column)
+        if key is None:
+            key = keys[column] = self.compute(column, item)
+        return key
+
+    def forget(self, item):
+        self.cache.pop(id(item), None)
+
+    def apply(self, event):
+        if isinstance(event, RecordRemoved):
+            self.forget(event.item)
+        elif isinstance(event, RecordUpdated):
+            self.forget(event.old)
+        elif isinstance(event, RecordsRenumbered):
+            # 只有 ID 变了，其余各列的键转到新对象上
+            cache = self.cache
+            for _, old, item in event.changes:
+                keys = cache.pop(id(old), None)
+                if keys is not None:
+                    cache[id(item)] = keys
+        elif isinstance(event, CollectionReset):
+            keep = {id(item) for item in event.records}
+            for key in [key for key in self.cache if key not in keep]:
+                del self.cache[key]
+
+
+# --- 数据校验 ---
+# 记录结构用 RECORD_SCHEMA 声明，启动时编译成每个字段的检查函数；批量校验按字段逐列
+# 扫描整批记录，返回结构化的错误列表 [{"index", "id", "field", "message"}]。
+
+URL_PATTERN = re.compile(r"^https?://[^\s/?#]+\.[^\s/?#]+(?:[/?#]\S*)?$")
+# 缩略图也允许使用站内相对路径，如 images/1.webp
+THUMBNAIL_PATTERN = re.compile(
+    r"^(?:https?://[^\s/?#]+\.[^\s/?#]+(?:[/?#]\S*)?|[\w./-]+)$"
+)
+DATE_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])$")
+
+RECORD_SCHEMA = {
+    "id": {"type": int},
+    "title": {"type": str, "required": True, "nonempty": True},
+    "author": {"type": str, "required": True},
+    "translator": {"type": str, "required": True},
+    "tags": {"type": list, "required": True, "items": str},
+    "isTranslated": {"type": bool, "required": True},
+    "isDomestic": {"type": bool, "required": True},
+    "originalUrl": {"type": str, "required": True, "pattern": URL_PATTERN},
+    "translatedUrl": {"type": str, "required": True, "pattern": URL_PATTERN},
+    "description": {"type": str, "required": True},
+    "thumbnail": {"type": str, "required": True, "pattern": THUMBNAIL_PATTERN},
+    "thumbnailMeta": {"type": dict},
+    "dateAdded": {
+        "type": str,
+        "required": True,
+        "nonempty": True,
+        "pattern": DATE_PATTERN,
+        "hint": "YYYY-MM-DD 格式的日期",
+    },
+}
+
+TYPE_NAMES = {int: "整数", str: "字符串", list: "列表", bool: "布尔值", dict: "对象"}
+
+
+class ValidationError(RuntimeError):
+    """保存前校验失败；errors 为结构化错误列表"""
+
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)
+
+
+def _compile_field(field, rule):
+    """把单个字段的规则编译为 check(value) -> 错误信息或 None"""
+    expected = rule["type"]
+    type_name = TYPE_NAMES[expected]
+    nonempty = rule.get("nonempty", False)
+    pattern = rule.get("pattern")
+    hint = rule.get("hint", "http(s) 链接")
+    items = rule.get("items")
+
+    def check(value):
+        # bool 是 int 的子类，需要单独排除
+        if type(value) is not expected:
+            return f"应为{type_name}，实际为 {type(value).__name__}"
+        if nonempty and not value:
+            return "不能为空"
+        if pattern is not None and value and not pattern.match(value):
+            return f"格式不正确，应为 {hint}: {value!r}"
+        if items is not None and not all(type(v) is items and v for v in value):
+            return f"应为非空{TYPE_NAMES[items]}的列表"
+        return None
+
+    return check
+
+
+_MISSING = object()
+
+
+class RecordValidator:
+    def __init__(self, schema=RECORD_SCHEMA):
+        self.checks = [
+            (field, rule.get("required", False), _compile_field(field, rule))
+            for field, rule in schema.items()
+        ]
+
+    def validate_one(self, item):
+        """校验单条记录，返回 [(字段, 错误信息)]"""
+        errors = []
+        for field, required, check in self.checks:
+            if field not in item:
+                if required:
+                    errors.append((field, "缺少必填字段"))
+                continue
+            message = check(item[field])
+            if message:
+                errors.append((field, message))
+        if item.get("isTranslated") is True and item.get("isDomestic") is True:
+            errors.append(("isDomestic", "国产作品不能同时标记为已汉化"))
+        return errors
+
+    def validate(self, records):
+        """按字段逐列校验整批记录，并检查 ID 是否为唯一的正整数"""
+        errors = []
+
+        def report(index, field, message):
+            item = records[index]
+            record_id = item.get("id") if isinstance(item, dict) else None
+            errors.append(
+                {"index": index, "id": record_id, "field": field, "message": message}
+            )
+
+        valid = []
+        for index, item in enumerate(records):
+            if isinstance(item, dict):
+                valid.append(index)
+            else:
+                report(index, None, "记录应为对象")
+        for field, required, check in self.checks:
+            for index in valid:
+                value = records[index].get(field, _MISSING)
+                if value is _MISSING:
+                    if required:
+                        report(index, field, "缺少必填字段")
+                    continue
+                message = check(value)
+                if message:
+                    report(index, field, message)
+        seen = set()
+        for index in valid:
+            item = records[index]
+            if item.get("isTranslated") is True and item.get("isDomestic") is True:
+                report(index, "isDomestic", "国产作品不能同时标记为已汉化")
+            record_id = item.get("id")
+            if type(record_id) is int and (record_id < 1 or record_id in seen):
+                report(index, "id", f"ID 应为唯一的正整数: {record_id}")
+            seen.add(record_id)
+        errors.sort(key=lambda e: e["index"])
+        return errors
+
+
+RECORD_VALIDATOR = RecordValidator()
+
+
+def format_validation_errors(errors, limit=10):
+    """把结构化错误列表格式化为提示文本"""
+    lines = []
+    for error in errors[:limit]:
+        where = (
+            f"ID {error['id']}" if error.get("id") else f"第 {error['index'] + 1} 条"
+        )
+        field = f" {error['field']}" if error.get("field") else ""
+        lines.append(f"- {where}{field}: {error['message']}")
+    if len(errors) > limit:
+        lines.append(f"- ……另有 {len(errors) - limit} 个错误")
+    return "\n".join(lines)
+
+
+# --- data.js 读写 ---
+
+
+JS_KEY_PATTERN = re.compile(r"(^|\s+)(\w+):", re.MULTILINE)
+DRAMAS_PATTERN = re.compile(r"const\s+dramas\s*=\s*\[(.*?)\];", re.DOTALL)
+
+
+class DataFileError(RuntimeError):
+    """data.js 存在但无法解析"""
+
+
+def parse_js_value(js_str):
+    """把 data.js 中的 JS 字面量（对象或数组）转换为 JSON 后解析"""
+    # 简单处理 JS 对象的 trailing comma
+    js_str = re.sub(r",\s*\]", "]", js_str)
+    js_str = re.sub(r",\s*\}", "}", js_str)
+    # 补齐引号使之符合 JSON 格式（用函数替换比模板替换快，大文件时差别明显）
+    json_str = JS_KEY_PATTERN.sub(lambda m: f'{m[1]}"{m[2]}":', js_str)
+    return json.loads(json_str)
+
+
+def load_dramas(path="data.js"):
+    """从 data.js 中解析 dramas 数组；文件不存在时返回空列表，无法解析时抛出 DataFileError"""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        match = DRAMAS_PATTERN.search(content)
+        if not match:
+            raise ValueError("找不到 dramas 数组")
+        return annotate_links(parse_js_value("[" + match.group(1).strip() + "]"))
+    except Exception as e:
+        raise DataFileError(f"{path} 解析失败: {e}") from e
+
+
+def read_author_links(path="data.js"):
+    """从 data.js 中读取现有的 authorLinks"""
+    existing_links = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            existing_content = f.read()
+            # 查找authorLinks部分
+            match = re.search(
+                r"const authorLinks = ({.*?});", existing_content, re.DOTALL
+            )
+            if match:
+                links_str = match.group(1)
+
+                # 最简单的方法：按行处理
+                lines = links_str.split("\n")
+                existing_links = {}
+
+                for line in lines:
+                    line = line.strip()
+                    # 跳过空行和注释行
+                    if not line or line.startswith("//") or not line.startswith('"'):
+                        continue
+
+                    # 处理键值对
+                    if ":" in line and line.endswith(","):
+                        line = line.rstrip(",")  # 移除末尾逗号
+
+                    if ":" in line:
+                        try:
+                            # 直接用JSON解析这一行
+                            line_json = "{" + line + "}"
+                            parsed = json.loads(line_json)
+                            for key, value in parsed.items():
+                                existing_links[key] = value
+                        except:
+                            # 手动解析
+                            parts = line.split(":", 1)
+                            if len(parts) == 2:
+                                key = parts[0].strip().strip('"')
+                                value = parts[1].strip().strip('"')
+                                if key:
+                                    existing_links[key] = value
+    except Exception as e:
+        print(f"读取现有authorLinks时出错: {e}")
+    return existing_links
+
+
+LOCK_TIMEOUT = 10
+LOCK_STALE_SECONDS = 120
+
+
+class LockTimeout(RuntimeError):
+    """等待 data.js 写锁超时"""
+
+
+class StaleDataError(RuntimeError):
+    """data.js 在加载之后已被其他程序修改"""
+
+    def __init__(self, message, current_version):
+        super().__init__(message)
+        self.current_version = current_version
+
+
+def file_version(path="data.js"):
+    """文件内容的哈希，作为乐观并发的版本戳；文件不存在时为 None"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_records(records):
+    """复制一份记录作为变基的基准，之后原地修改记录不会影响快照"""
+    return [dict(public_record(item), tags=list(item["tags"])) for item in records]
+
+
+class DataFileLock:
+    """基于 <path>.lock 的跨进程建议锁（O_EXCL 创建），用于串行化所有写 data.js 的操作。
+
+    锁文件记录持有者的 PID、主机名和每次加锁唯一的令牌；持有者进程已退出或锁超过
+    LOCK_STALE_SECONDS 未释放时视为遗留锁，由等待者接管（见 _break_stale）。
+    """
+
+    def __init__(self, path="data.js", timeout=LOCK_TIMEOUT):
+        self.path = path + ".lock"
+        self.timeout = timeout
+        self.owner = {"pid": os.getpid(), "host": socket.gethostname()}
+        self.token = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                holder = self._read_holder()
+                if self._is_stale(holder):
+                    self._break_stale(holder)
+                    continue
+                if time.monotonic() >= deadline:
+                    raise LockTimeout(
+                        f"data.js 正被其他程序写入（PID {holder.get('pid', '?')}），"
+                        f"请稍后重试；若确认没有程序在写入，可删除 {self.path}"
+                    )
+                time.sleep(0.1)
+                continue
+            self.token = os.urandom(8).hex()
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(dict(self.owner, time=time.time(), token=self.token), f)
+            return
+
+    def release(self):
+        # 按令牌判断，同一进程内其他线程持有的锁不会被误删
+        if self.token and self._read_holder().get("token") == self.token:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        self.token = None
+
+    def _break_stale(self, holder):
+        """接管遗留锁：先原子地把锁文件改名移开，再确认移开的正是判定为遗留的那一把。
+
+        两个等待者可能同时判定同一把锁遗留；先接管的一方随即创建了新锁时，
+        另一方移开的会是这把新锁，此时令牌对不上，用 os.link（目标已存在时失败，
+        不会覆盖）把它放回原处。
+        """
+        moved = f"{self.path}.{os.getpid()}.{os.urandom(4).hex()}.stale"
+        try:
+            os.rename(self.path, moved)
+        except FileNotFoundError:
+            return  # 已被其他等待者移走
+        if self._read_holder(moved).get("token") != holder.get("token"):
+            try:
+                os.link(moved, self.path)
+            except FileExistsError:
+                pass  # 原处又有了新锁，被移开的锁的持有者释放时会发现令牌不符
+            except OSError:
+                # 文件系统不支持硬链接时退回到改名
+                if not os.path.exists(self.path):
+                    os.rename(moved, self.path)
+                    return
+        try:
+            os.remove(moved)
+        except OSError:
+            pass
+
+    def _read_holder(self, path=None):
+        try:
+            with open(path or self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # 对方刚创建还没写完内容，按刚加锁处理
+            return {}
+
+    def _is_stale(self, holder):
+        try:
+            age = time.time() - os.path.getmtime(self.path)
+        except OSError:
+            return True
+        if age > LOCK_STALE_SECONDS:
+            return True
+        if not holder or holder.get("host") != self.owner["host"] or os.name != "posix":
+            return False
+        try:
+            os.kill(holder["pid"], 0)
+        except ProcessLookupError:
+            return True
+        except (OSError, TypeError, KeyError):
+            pass
+        return False
+
+
+def check_version(path, expected_version):
+    """在写锁内确认文件仍是加载时的版本，否则抛出 StaleDataError"""
+    current = file_version(path)
+    if expected_version is not None and current != expected_version:
+        raise StaleDataError(f"{path} 在加载之后已被其他程序修改", current)
+
+
+def update_author_links(links, path="data.js", expected_version=None, base_links=None):
+    """只替换 data.js 中的 authorLinks 部分。
+
+    base_links 为编辑开始时读到的 authorLinks：给出时在写锁内与文件中现有的 authorLinks
+    三路合并，他人在此期间对其他名字的修改不会丢失；双方改了同一个名字时保留 links 中的值。
+    返回 (新版本, 写入前是否仍为 expected_version, 冲突的名字列表)；记录部分由本次写入原样保留，
+    因此他人并发修改了记录时不拒绝写入，只通过返回值告知调用方。
+    """
+    with DataFileLock(path):
+        current = file_version(path)
+        conflicts = []
+        if base_links is not None:
+            links, conflicts = merge_author_links(
+                base_links, links, read_author_links(path)
+            )
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        new_links_str = format_author_links_js(links)
+        pattern = r"const authorLinks = {.*?};"
+        if re.search(pattern, content, re.DOTALL):
+            content = re.sub(
+                pattern, lambda m: new_links_str, content, count=1, flags=re.DOTALL
+            )
+        else:
+            # 如果没有找到，在文件开头添加
+            content = new_links_str + "\n\n" + content
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(path + ".tmp", path)
+        return file_version(path), current == expected_version, conflicts
+
+
+def check_collection(records, existing_count, allow_empty=False):
+    """保存前的安全检查：记录必须通过校验，且不能用空集合覆盖已有数据。
+
+    existing_count 为现有的条目数，由调用方在加载时得到（配合 expected_version 确认文件未变），
+    这里不再解析文件；为 None 表示现有文件无法解析，此时拒绝保存，以免覆盖尚可手动修复的原文件。
+    """
+    errors = RECORD_VALIDATOR.validate(records)
+    if errors:
+        raise ValidationError(
+            f"{len(errors)} 处数据不合法，未保存:\n{format_validation_errors(errors)}",
+            errors,
+        )
+    if existing_count is None:
+        raise DataFileError("现有数据文件无法解析，修复前不会覆盖")
+    if not records and existing_count and not allow_empty:
+        raise ValidationError(f"拒绝用空集合覆盖已有的 {existing_count} 个条目")
+
+
+def save_collection(
+    records,
+    path="data.js",
+    allow_empty=False,
+    expected_version=None,
+    author_links=None,
+    *,
+    existing_count,
+):
+    """保存集合到 data.js，保留并补全 authorLinks。返回 (新作者数, 新译者数, 新版本)
+
+    整个检查与写入过程持有 DataFileLock；给出 expected_version 时，
+    文件已不是该版本则抛出 StaleDataError 而不覆盖。
+    给出 author_links 时用它替换文件中的 authorLinks，与记录在同一次写入中完成。
+    existing_count 为加载 expected_version 时得到的条目数，见 check_collection。
+    """
+    with DataFileLock(path):
+        check_version(path, expected_version)
+        return _save_collection(
+            records, path, allow_empty, author_links, existing_count
+        )
+
+
+def _save_collection(records, path, allow_empty, author_links, existing_count):
+    check_collection(records, existing_count, allow_empty)
+    # 先读取现有的data.js文件，保留authorLinks部分
+    if author_links is None:
+        author_links = read_author_links(path)
+    updated_links, new_authors, new_translators = detect_new_people(
+        records, author_links
+    )
+    # 单次遍历：同时计算增量文件并写出 data.js
+    ExportPipeline(data_js_sinks(path)).run(records, updated_links)
+    return new_authors, new_translators, file_version(path)
+
+
+def detect_new_people(records, existing_links):
+    """把记录中新出现的作者/译者以空链接补进 authorLinks。返回 (新 authorLinks, 新作者数, 新译者数)"""
+    # 自动检测新的作者和译者
+    detected_authors = set()
+    detected_translators = set()
+
+    for item in records:
+        if item.get("author"):
+            detected_authors.add(item["author"])
+        if item.get("translator"):
+            # 处理多译者：使用正则表达式分割
+            drama_translators = re.split(r"[,、&和]\s*", item["translator"])
+            for translator in drama_translators:
+                translator = translator.strip()
+                if translator:
+                    detected_translators.add(translator)
+
+    # 更新authorLinks，添加新检测到的作者/译者
+    updated_links = existing_links.copy()
+    new_authors = 0
+    new_translators = 0
+
+    for author in detected_authors:
+        if author not in updated_links:
+            updated_links[author] = ""  # 空字符串表示需要手动添加链接
+            new_authors += 1
+            print(f"检测到新作者: {author}")
+
+    for translator in detected_translators:
+        # 过滤掉包含分隔符的条目（这些是多译者组合）
+        if not re.search(r"[,、&和]", translator) and translator not in updated_links:
+            updated_links[translator] = ""  # 空字符串表示需要手动添加链接
+            new_translators += 1
+            print(f"检测到新译者: {translator}")
+
+    return updated_links, new_authors, new_translators
+
+
+# --- SQLite 存储 ---
+# 启用后记录、标签、作者/译者与 authorLinks 存放在带索引的 SQLite 数据库中，
+# 编辑在事务内按行写入；data.js 由导出步骤生成（与普通保存走同一条导出流水线，输出逐字节一致）。
+
+DB_PATH = "collection.db"
+DB_SCHEMA_VERSION = 1
+DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS records (
+    uid INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    translator TEXT NOT NULL,
+    is_translated INTEGER NOT NULL,
+    is_domestic INTEGER NOT NULL,
+    original_url TEXT NOT NULL,
+    translated_url TEXT NOT NULL,
+    description TEXT NOT NULL,
+    thumbnail TEXT NOT NULL,
+    thumbnail_meta TEXT,
+    date_added TEXT NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_position ON records (position);
+CREATE INDEX IF NOT EXISTS records_date ON records (date_added);
+CREATE TABLE IF NOT EXISTS record_tags (
+    uid INTEGER NOT NULL REFERENCES records (uid) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS record_tags_uid ON record_tags (uid);
+CREATE INDEX IF NOT EXISTS record_tags_tag ON record_tags (tag);
+CREATE TABLE IF NOT EXISTS record_people (
+    uid INTEGER NOT NULL REFERENCES records (uid) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS record_people_uid ON record_people (uid);
+CREATE INDEX IF NOT EXISTS record_people_name ON record_people (name, role);
+CREATE TABLE IF NOT EXISTS author_links (
+    name TEXT PRIMARY KEY,
+    link TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+"""
+# trigram 分词支持中日文的任意子串匹配；外部内容表由触发器与 records 保持同步
+DB_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5 (
+    title, description, content='records', content_rowid='uid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS records_fts_insert AFTER INSERT ON records BEGIN
+    INSERT INTO records_fts (rowid, title, description)
+    VALUES (new.uid, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS records_fts_delete AFTER DELETE ON records BEGIN
+    INSERT INTO records_fts (records_fts, rowid, title, description)
+    VALUES ('delete', old.uid, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS records_fts_update
+AFTER UPDATE OF title, description ON records BEGIN
+    INSERT INTO records_fts (records_fts, rowid, title, description)
+    VALUES ('delete', old.uid, old.title, old.description);
+    INSERT INTO records_fts (rowid, title, description)
+    VALUES (new.uid, new.title, new.description);
+END;
+"""
+FTS_MIN_QUERY = 3  # trigram 分词要求查询至少 3 个字符，更短时退回 LIKE
+
+
+class CollectionStore:
+    """SQLite 存储后端。记录在内存中以 _uid 字段（IN_MEMORY_FIELDS）对应数据库行。"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        # 连接会在后台任务线程中使用；同一时刻只有一个任务访问（保存期间界面不可操作）
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        with self.conn:
+            self.conn.executescript(DB_SCHEMA)
+            try:
+                self.conn.executescript(DB_FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                # SQLite 未编译 FTS5 或版本过旧（trigram 需要 3.34+）
+                self.fts = False
+            self.conn.execute(
+                "INSERT OR IGNORE INTO meta VALUES ('schema_version', ?)",
+                (str(DB_SCHEMA_VERSION),),
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM records LIMIT 1").fetchone() is None
+
+    # 读取
+
+    def load_records(self):
+        """按顺序读出全部记录，字段顺序与 data.js 一致"""
+        tags = {}
+        for uid, tag in self.conn.execute(
+            "SELECT uid, tag FROM record_tags ORDER BY uid, position"
+        ):
+            tags.setdefault(uid, []).append(tag)
+        records = []
+        for row in self.conn.execute(
+            "SELECT uid, title, author, translator, is_translated, is_domestic,"
+            " original_url, translated_url, description, thumbnail, thumbnail_meta,"
+            " date_added FROM records ORDER BY position"
+        ):
+            item = {
+                "id": len(records) + 1,
+                "title": row[1],
+                "author": row[2],
+                "translator": row[3],
+                "tags": tags.get(row[0], []),
+                "isTranslated": bool(row[4]),
+                "isDomestic": bool(row[5]),
+                "originalUrl": row[6],
+                "translatedUrl": row[7],
+                "description": row[8],
+                "thumbnail": row[9],
+            }
+            if row[10] is not None:
+                item["thumbnailMeta"] = json.loads(row[10])
+            item["dateAdded"] = row[11]
+            item["_uid"] = row[0]
+            records.append(item)
+        return annotate_links(records)
+
+    def load_author_links(self):
+        return dict(
+            self.conn.execute("SELECT name, link FROM author_links ORDER BY position")
+        )
+
+    def suggestions(self):
+        """返回 (作者集合, 译者集合, 标签集合)，直接由索引表去重"""
+        people = {"author": set(), "translator": set()}
+        for role, name in self.conn.execute(
+            "SELECT DISTINCT role, name FROM record_people"
+        ):
+            people[role].add(name)
+        tags = {
+            tag for (tag,) in self.conn.execute("SELECT DISTINCT tag FROM record_tags")
+        }
+        return people["author"], people["translator"], tags
+
+    def search(self, text, limit=200):
+        """在标题与描述中全文搜索，返回按相关度排序的记录序号（从 1 开始，即记录 ID）"""
+        return self._search(self.conn, "position", text, limit)
+
+    def search_uids(self, text, limit=None):
+        """同 search，但返回记录的 _uid；limit 为 None 时不限条数。
+
+        界面在工作线程中搜索，可能与保存任务同时进行，因此每次使用独立的连接，
+        只读到已提交的内容（WAL 模式下读写互不阻塞）。
+        """
+        with closing(sqlite3.connect(self.path)) as conn:
+            return self._search(conn, "uid", text, limit)
+
+    def _search(self, conn, column, text, limit):
+        text = text.strip()
+        if not text:
+            return []
+        # SQLite 中 LIMIT -1 表示不限条数
+        limit = -1 if limit is None else limit
+        if self.fts and len(text) >= FTS_MIN_QUERY:
+            rows = conn.execute(
+                f"SELECT r.{column} FROM records_fts"
+                " JOIN records r ON r.uid = records_fts.rowid"
+                " WHERE records_fts MATCH ? ORDER BY rank LIMIT ?",
+                ('"' + text.replace('"', '""') + '"', limit),
+            )
+        else:
+            pattern = "%" + re.sub(r"([\\%_])", r"\\\1", text) + "%"
+            rows = conn.execute(
+                f"SELECT {column} FROM records WHERE title LIKE ? ESCAPE '\\'"
+                " OR description LIKE ? ESCAPE '\\' ORDER BY position LIMIT ?",
+                (pattern, pattern, limit),
+            )
+        return [value for (value,) in rows]
+
+    # 写入
+
+    def save_records(self, records, author_links=None):
+        """在一个事务内把记录列表写入数据库：只改写内容变化的行，其余行最多更新顺序。
+
+        给出 author_links 时在同一事务内替换 authorLinks。
+        """
+        with self.conn:
+            assigned = self._save_records(records, author_links)
+        # 事务提交后再回写 _uid，回滚时内存中的记录保持原样
+        for item, uid in assigned:
+            item["_uid"] = uid
+
+    def _save_records(self, records, author_links):
+        """save_records 的事务体，返回 [(新插入的记录, uid)]"""
+        stored = {
+            uid: (position, digest)
+            for uid, position, digest in self.conn.execute(
+                "SELECT uid, position, hash FROM records"
+            )
+        }
+        assigned = []
+        seen = set()
+        for position, item in enumerate(records, 1):
+            digest = record_hash(_content(item))
+            uid = item.get("_uid")
+            if uid in stored and uid not in seen:
+                seen.add(uid)
+                old_position, old_digest = stored[uid]
+                if old_digest != digest:
+                    self._write_record(item, position, digest, uid)
+                elif old_position != position:
+                    self.conn.execute(
+                        "UPDATE records SET position = ? WHERE uid = ?",
+                        (position, uid),
+                    )
+            else:
+                assigned.append((item, self._write_record(item, position, digest)))
+        self.conn.executemany(
+            "DELETE FROM records WHERE uid = ?",
+            [(uid,) for uid in stored if uid not in seen],
+        )
+        if author_links is not None:
+            self._write_author_links(author_links)
+        return assigned
+
+    def _write_record(self, item, position, digest, uid=None):
+        meta = item.get("thumbnailMeta")
+        values = (
+            position,
+            item["title"],
+            item["author"],
+            item["translator"],
+            int(item["isTranslated"]),
+            int(item.get("isDomestic", False)),
+            item["originalUrl"],
+            item["translatedUrl"],
+            item["description"],
+            item["thumbnail"],
+            json.dumps(meta, ensure_ascii=False) if meta else None,
+            item["dateAdded"],
+            digest,
+        )
+        if uid is None:
+            uid = self.conn.execute(
+                "INSERT INTO records (position, title, author, translator,"
+                " is_translated, is_domestic, original_url, translated_url, description,"
+                " thumbnail, thumbnail_meta, date_added, hash)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                values,
+            ).lastrowid
+        else:
+            self.conn.execute(
+                "UPDATE records SET position = ?, title = ?, author = ?, translator = ?,"
+                " is_translated = ?, is_domestic = ?, original_url = ?,"
+                " translated_url = ?, description = ?, thumbnail = ?,"
+                " thumbnail_meta = ?, date_added = ?, hash = ? WHERE uid = ?",
+                values + (uid,),
+            )
+            self.conn.execute("DELETE FROM record_tags WHERE uid = ?", (uid,))
+            self.conn.execute("DELETE FROM record_people WHERE uid = ?", (uid,))
+        self.conn.executemany(
+            "INSERT INTO record_tags VALUES (?, ?, ?)",
+            [(uid, i, tag) for i, tag in enumerate(item["tags"])],
+        )
+        people = [("author", item["author"])] if item["author"] else []
+        people += [("translator", t) for t in split_translators(item["translator"])]
+        self.conn.executemany(
+            "INSERT INTO record_people VALUES (?, ?, ?)",
+            [(uid, role, name) for role, name in people],
+        )
+        return uid
+
+    def save_author_links(self, links):
+        with self.conn:
+            self._write_author_links(links)
+
+    def _write_author_links(self, links):
+        self.conn.execute("DELETE FROM author_links")
+        self.conn.executemany(
+            "INSERT INTO author_links VALUES (?, ?, ?)",
+            [(name, link, i) for i, (name, link) in enumerate(links.items())],
+        )
+
+    # 与 data.js 互转
+
+    def import_data_js(self, path="data.js"):
+        """用 data.js 的内容替换数据库，返回导入的记录数"""
+        records = load_dramas(path)
+        links = read_author_links(path) if os.path.exists(path) else {}
+        # 清空与写入在同一事务内，中途失败时数据库保持导入前的内容
+        with self.conn:
+            self.conn.execute("DELETE FROM records")
+            self._save_records(records, links)
+        return len(records)
+
+    def save(self, records, path="data.js", allow_empty=False, author_links=None):
+        """校验后写入数据库并重新导出 data.js，返回值同 export_data_js"""
+        count = self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        check_collection(records, count, allow_empty)
+        self.save_records(records, author_links)
+        return self.export_data_js(path, allow_empty, records)
+
+    def export_data_js(self, path="data.js", allow_empty=False, records=None):
+        """由数据库生成 data.js（持有写锁），新出现的作者/译者同时补进数据库。
+
+        records 为刚由 save 校验并写入数据库的内存记录时直接使用，省去读取与重复校验。
+        返回 (新作者数, 新译者数, 新版本)。
+        """
+        checked = records is not None
+        if records is None:
+            records = self.load_records()
+        with DataFileLock(path):
+            if not checked:
+                # 由数据库导出时不会事先加载 data.js，此时读取一次现有条目数
+                try:
+                    existing = len(load_dramas(path))
+                except DataFileError:
+                    existing = None
+                check_collection(records, existing, allow_empty)
+            links, new_authors, new_translators = detect_new_people(
+                records, self.load_author_links()
+            )
+            if new_authors or new_translators:
+                self.save_author_links(links)
+            ExportPipeline(data_js_sinks(path)).run(records, links)
+            return new_authors, new_translators, file_version(path)
+
+
+# --- 合并与差异 ---
+# 按记录身份（规范化的原版/汉化链接，其次是规范化标题）而不是行号匹配记录，
+# 在字段级别做三路合并。可以注册为 git 的 merge driver，也可以输出两个版本间的变更摘要。
+
+MERGE_IGNORED_FIELDS = ("id",)  # 每次保存都会重新编号，不参与比较
+
+
+def read_collection(path):
+    """读取 data.js，返回 (记录列表, authorLinks, dataVersion)"""
+    records = load_dramas(path)
+    links = read_author_links(path) if os.path.exists(path) else {}
+    return records, links, read_data_version(path)
+
+
+def record_identity(item):
+    """记录身份：优先使用规范化的原版+汉化链接，都没有时使用规范化标题"""
+    links = record_links(item)
+    original = links["originalUrl"].canonical
+    translated = links["translatedUrl"].canonical
+    if original or translated:
+        return ("url", original, translated)
+    return ("title", normalize_title(item.get("title")))
+
+
+def _content(item):
+    return {
+        k: v
+        for k, v in item.items()
+        if k not in MERGE_IGNORED_FIELDS and k not in IN_MEMORY_FIELDS
+    }
+
+
+def same_content(a, b):
+    """忽略 ID 与内存字段比较两条记录"""
+    return _content(a) == _content(b)
+
+
+def match_records(old, new):
+    """按身份匹配两组记录，链接被修改的记录再按标题匹配。
+
+    返回 (匹配对列表, 只在 old 中的记录, 只在 new 中的记录)。
+    """
+    by_identity = {}
+    for item in old:
+        by_identity.setdefault(record_identity(item), []).append(item)
+    pairs, unmatched_new = [], []
+    for item in new:
+        candidates = by_identity.get(record_identity(item))
+        if candidates:
+            pairs.append((candidates.pop(0), item))
+        else:
+            unmatched_new.append(item)
+    unmatched_old = [item for items in by_identity.values() for item in items]
+
+    by_title = {}
+    for item in unmatched_old:
+        by_title.setdefault(normalize_title(item.get("title")), []).append(item)
+    added = []
+    for item in unmatched_new:
+        candidates = by_title.get(normalize_title(item.get("title")))
+        if candidates:
+            pairs.append((candidates.pop(0), item))
+        else:
+            added.append(item)
+    removed = [item for items in by_title.values() for item in items]
+    return pairs, removed, added
+
+
+def changed_fields(old, new):
+    old, new = public_record(old), public_record(new)
+    return [
+        key
+        for key in dict.fromkeys([*old, *new])
+        if key not in MERGE_IGNORED_FIELDS and old.get(key) != new.get(key)
+    ]
+
+
+def diff_collections(old, new):
+    """比较两组记录，返回 {"added": [...], "removed": [...], "changed": [(旧, 新, 字段)]}"""
+    pairs, removed, added = match_records(old, new)
+    changed = [(a, b, changed_fields(a, b)) for a, b in pairs if not same_content(a, b)]
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def diff_author_links(old, new):
+    return {
+        "added": sorted(k for k in new if k not in old),
+        "removed": sorted(k for k in old if k not in new),
+        "changed": sorted(k for k in new if k in old and old[k] != new[k]),
+    }
+
+
+def _merge_value(field, base, ours, theirs):
+    """合并单个字段，返回 (值, 是否冲突)"""
+    if ours == theirs:
+        return ours, False
+    if ours == base:
+        return theirs, False
+    if theirs == base:
+        return ours, False
+    if field == "tags" and all(isinstance(v, list) for v in (ours, theirs)):
+        # 标签按集合合并：保留双方都未删除的标签，加上双方各自新增的标签
+        base_set = set(base or [])
+        removed = (base_set - set(ours)) | (base_set - set(theirs))
+        merged = [t for t in dict.fromkeys([*ours, *theirs]) if t not in removed]
+        return merged, False
+    return ours, True
+
+
+def merge_record(base, ours, theirs):
+    """字段级三路合并，返回 (合并结果, 冲突字段列表)"""
+    base, ours, theirs = public_record(base), public_record(ours), public_record(theirs)
+    merged, conflicts = {}, []
+    for key in dict.fromkeys([*ours, *theirs]):
+        if key not in ours:
+            # 一方删除了可选字段（如 thumbnailMeta），另一方未修改时跟随删除
+            if theirs.get(key) == base.get(key):
+                continue
+            value, conflict = _merge_value(key, base.get(key), None, theirs[key])
+        elif key not in theirs:
+            if ours.get(key) == base.get(key):
+                continue
+            value, conflict = _merge_value(key, base.get(key), ours[key], None)
+        else:
+            value, conflict = _merge_value(key, base.get(key), ours[key], theirs[key])
+        if value is not None:
+            merged[key] = value
+        if conflict and key not in MERGE_IGNORED_FIELDS:
+            conflicts.append(key)
+    return merged, conflicts
+
+
+def merge_collections(base, ours, theirs):
+    """三路合并记录列表，返回 (合并后的记录, 冲突列表)。
+
+    顺序以我方为准，对方新增的记录插在它在对方列表中的前一条记录之后。
+    冲突字段保留我方的值，冲突信息为 {"title", "field", "reason"}。
+    """
+    base_ours, _, _ = match_records(base, ours)
+    base_theirs, _, _ = match_records(base, theirs)
+    ours_of = {id(b): o for b, o in base_ours}
+    theirs_of = {id(b): t for b, t in base_theirs}
+    base_of_ours = {id(o): b for b, o in base_ours}
+    base_of_theirs = {id(t): b for b, t in base_theirs}
+
+    # 双方都新增的记录按身份配对
+    ours_added = [o for o in ours if id(o) not in base_of_ours]
+    theirs_added = [t for t in theirs if id(t) not in base_of_theirs]
+    added_pairs, _, _ = match_records(ours_added, theirs_added)
+    theirs_for_ours_added = {id(o): t for o, t in added_pairs}
+    ours_for_theirs_added = {id(t): o for o, t in added_pairs}
+
+    conflicts = []
+    result = []
+    placed = {}  # id(我方或对方记录) -> 在 result 中的合并结果
+    for o in ours:
+        b = base_of_ours.get(id(o))
+        if b is None:
+            t = theirs_for_ours_added.get(id(o))
+            if t is None:
+                merged = public_record(o)
+            else:
+                merged, fields = merge_record({}, o, t)
+                conflicts += [
+                    {"title": o.get("title"), "field": f, "reason": "双方新增内容不同"}
+                    for f in fields
+                ]
+                placed[id(t)] = merged
+        else:
+            t = theirs_of.get(id(b))
+            if t is None:
+                # 对方删除：我方未修改则删除，否则保留并报告冲突
+                if same_content(o, b):
+                    continue
+                merged = public_record(o)
+                conflicts.append(
+                    {
+                        "title": o.get("title"),
+                        "field": None,
+                        "reason": "对方删除、我方修改",
+                    }
+                )
+            else:
+                merged, fields = merge_record(b, o, t)
+                conflicts += [
+                    {"title": o.get("title"), "field": f, "reason": "双方修改不同"}
+                    for f in fields
+                ]
+                placed[id(t)] = merged
+        placed[id(o)] = merged
+        result.append(merged)
+
+    # 我方删除、对方修改的记录
+    for b, t in base_theirs:
+        if id(b) not in ours_of and not same_content(t, b):
+            conflicts.append(
+                {"title": t.get("title"), "field": None, "reason": "我方删除、对方修改"}
+            )
+            placed[id(t)] = public_record(t)
+            result.append(placed[id(t)])
+
+    # 插入对方新增的记录
+    position = {id(item): i for i, item in enumerate(result)}
+    inserts = {}
+    previous = None
+    for t in theirs:
+        if id(t) in placed:
+            previous = placed[id(t)]
+            continue
+        if id(t) in base_of_theirs or id(t) in ours_for_theirs_added:
+            continue
+        anchor = position.get(id(previous), -1) if previous is not None else -1
+        inserts.setdefault(anchor, []).append(public_record(t))
+    merged_records = list(inserts.get(-1, []))
+    for i, item in enumerate(result):
+        merged_records.append(item)
+        merged_records.extend(inserts.get(i, []))
+
+    # 未变化的记录沿用我方的对象（可能正由界面的集合持有），ID 不符时换成副本
+    merged_records = [
+        item if item.get("id") == i + 1 else dict(item, id=i + 1)
+        for i, item in enumerate(merged_records)
+    ]
+    return merged_records, conflicts
+
+
+def merge_author_links(base, ours, theirs):
+    """三路合并 authorLinks，返回 (合并结果, 冲突的名字列表)"""
+    merged, conflicts = {}, []
+    for name in dict.fromkeys([*ours, *theirs]):
+        b, o, t = base.get(name), ours.get(name), theirs.get(name)
+        value, conflict = _merge_value("authorLinks", b, o, t)
+        if conflict:
+            conflicts.append(name)
+        if value is not None:
+            merged[name] = value
+    return merged, conflicts
+
+
+def merge_data_files(base_path, ours_path, theirs_path, output_path=None):
+    """git merge driver 入口：合并结果写入 output_path（默认覆盖我方文件），返回冲突列表"""
+    base, base_links, _ = read_collection(base_path)
+    ours, ours_links, ours_version = read_collection(ours_path)
+    theirs, theirs_links, theirs_version = read_collection(theirs_path)
+    records, conflicts = merge_collections(base, ours, theirs)
+    links, link_conflicts = merge_author_links(base_links, ours_links, theirs_links)
+    conflicts += [
+        {"title": name, "field": "authorLinks", "reason": "双方修改不同"}
+        for name in link_conflicts
+    ]
+    # 双方可能各自从 N 升到了 N+1，合并结果是新的内容，取高于双方的新版本号；
+    # deltas/ 保留我方的，下次保存（或 publish 命令）时从我方版本生成到这个版本的增量
+    version = max(ours_version, theirs_version)
+    ExportPipeline([DataJsSink(output_path or ours_path)]).run(
+        records, links, version=version + 1 if version else None
+    )
+    return conflicts
+
+
+def load_revision(spec):
+    """读取文件路径，或 git 的 <版本>:<路径>（如 HEAD~1:data.js），返回 (记录, authorLinks)"""
+    if os.path.exists(spec) or ":" not in spec:
+        records, links, _ = read_collection(spec)
+        return records, links
+    import subprocess
+    import tempfile
+
+    content = subprocess.run(
+        ["git", "show", spec], capture_output=True, check=True
+    ).stdout
+    with tempfile.NamedTemporaryFile("wb", suffix=".js", delete=False) as f:
+        f.write(content)
+    try:
+        records, links, _ = read_collection(f.name)
+    finally:
+        os.remove(f.name)
+    return records, links
+
+
+def format_change_report(diff, link_diff=None):
+    lines = []
+    for item in diff["added"]:
+        lines.append(f"+ [{item.get('id')}] {item.get('title')}")
+    for item in diff["removed"]:
+        lines.append(f"- [{item.get('id')}] {item.get('title')}")
+    for old, new, fields in diff["changed"]:
+        lines.append(f"~ [{new.get('id')}] {new.get('title')}: {', '.join(fields)}")
+    summary = (
+        f"新增 {len(diff['added'])}，修改 {len(diff['changed'])}，"
+        f"删除 {len(diff['removed'])}"
+    )
+    if link_diff and any(link_diff.values()):
+        for key, mark in (("added", "+"), ("removed", "-"), ("changed", "~")):
+            lines += [f"{mark} authorLinks: {name}" for name in link_diff[key]]
+        summary += (
+            f"；authorLinks 新增 {len(link_diff['added'])}，"
+            f"修改 {len(link_diff['changed'])}，删除 {len(link_diff['removed'])}"
+        )
+    lines.append(summary)
+    return "\n".join(lines)
+
+
+# --- 外部修改监视 ---
+# git pull、脚本或另一个窗口改写 data.js 后，GUI 只重新解析内容变化的记录块，
+# 并按行增量更新表格，保留滚动位置与选中项。
+
+WATCH_INTERVAL = 500  # 检查外部修改的间隔（毫秒）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+RECORD_BLOCK_PATTERN = re.compile(r"^[ \t]*\{.*?^[ \t]*\}", re.MULTILINE | re.DOTALL)
+BLOCK_ID_PATTERN = re.compile(r"^[ \t]*id:\s*(\d+),?[ \t]*\n?", re.MULTILINE)
+
+
+def _open_inotify(directory):
+    """打开监视目录的非阻塞 inotify 描述符；非 Linux 或调用失败时返回 None"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """检测单个文件是否被改写。
+
+    Linux 上用 inotify 监视所在目录（保存时文件会被 os.replace 整个替换，
+    监视文件本身会丢失后续事件）；其他平台或 inotify 不可用时比较 stat 结果。
+    poll() 不阻塞，由调用方定时调用。
+    """
+
+    def __init__(self, path="data.js"):
+        self.path = path
+        self.name = os.fsencode(os.path.basename(path))
+        self.fd = _open_inotify(os.path.dirname(os.path.abspath(path)))
+        self.stat = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def poll(self):
+        """返回上次调用以来文件是否可能已被改写"""
+        if self.fd is None:
+            stat = self._stat()
+            changed, self.stat = stat != self.stat, stat
+            return changed
+        changed = False
+        while True:
+            try:
+                buf = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(buf):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(buf, offset)
+                offset += INOTIFY_EVENT.size
+                if buf[offset : offset + length].rstrip(b"\0") == self.name:
+                    changed = True
+                offset += length
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class IncrementalLoader:
+    """按记录块解析 data.js。
+
+    每条记录的文本块去掉 id 行后计算哈希，哈希与上次加载相同的块直接复用上次的解析结果，
+    因此插入或删除一条记录导致的重新编号不会让其余记录重新解析。
+    文件不是工具保存的逐块格式时退回 load_dramas 整体解析。
+    """
+
+    def __init__(self, path="data.js"):
+        self.path = path
+        self.blocks = {}  # 块哈希 -> 解析结果
+        self.reparsed = 0  # 上次加载实际解析的记录数
+
+    def load(self):
+        if not os.path.exists(self.path):
+            self.blocks = {}
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            content = f.read()
+        records = self._load_blocks(content)
+        if records is None:
+            records = load_dramas(self.path)
+            self.blocks = {}
+            self.reparsed = len(records)
+            return records
+        return annotate_links(records)
+
+    def _load_blocks(self, content):
+        match = DRAMAS_PATTERN.search(content)
+        if not match:
+            return None
+        body = match.group(1)
+        records, blocks, reparsed, pos = [], {}, 0, 0
+        for block in RECORD_BLOCK_PATTERN.finditer(body):
+            if body[pos : block.start()].strip(" \t\r\n,"):
+                return None
+            pos = block.end()
+            text = block.group()
+            key = hashlib.sha1(BLOCK_ID_PATTERN.sub("", text).encode("utf-8")).digest()
+            parsed = blocks.get(key) or self.blocks.get(key)
+            if parsed is None:
+                try:
+                    parsed = parse_js_value(text)
+                except ValueError:
+                    return None
+                if not isinstance(parsed, dict):
+                    return None
+                reparsed += 1
+            blocks[key] = parsed
+            item = {k: v for k, v in parsed.items() if k != "id"}
+            if isinstance(item.get("tags"), list):
+                item["tags"] = list(item["tags"])
+            id_match = BLOCK_ID_PATTERN.search(text)
+            if id_match:
+                item["id"] = int(id_match.group(1))
+            records.append(item)
+        if body[pos:].strip(" \t\r\n,"):
+            return None
+        self.blocks = blocks
+        self.reparsed = reparsed
+        return records
+
+
+def reuse_unchanged(old, new):
+    """内容未变的记录沿用 old 中的对象，以便索引和表格行原样保留。
+
+    沿用的对象不做修改，其 ID 可能与新位置不符，由 RecordCollection.reset 重新编号。
+    返回 (结果列表, 新出现的记录, 不再存在的旧记录)。
+    """
+    by_content = {}
+    for item in old:
+        by_content.setdefault(record_hash(_content(item)), []).append(item)
+    result, added = [], []
+    for item in new:
+        candidates = by_content.get(record_hash(_content(item)))
+        if candidates:
+            result.append(candidates.pop(0))
+        else:
+            result.append(item)
+            added.append(item)
+    removed = [item for items in by_content.values() for item in items]
+    return result, added, removed
+
+
+def tree_row(item):
+    """表格中显示的内容（不含 ID），用于判断某一行是否需要重绘"""
+    return (
+        item["title"],
+        item["author"],
+        item["translator"],
+        status_text(item),
+        item["dateAdded"],
+    )
+
+
+# --- 查询索引与本地 HTTP API ---
+# CollectionIndex 在内存中为记录建立按状态、标签、作者、译者和日期的索引，筛选语义与 app.js 一致；
+# 本地 API 服务在它之上提供分页查询、单条记录、统计与建议，响应带强 ETag，
+# data.js 变化时自动重新加载。同时提供站点静态文件，便于本地开发。
+
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+# 静态文件只提供站点资源：按扩展名放行，以 "." 开头的路径（.git、各类缓存）
+# 与工具自身的产物一律 404，脚本、数据库、文档等不会被当作静态文件发出
+STATIC_SUFFIXES = set(
+    ".html .js .css .json .xml .txt .csv .ndjson .ico .png .jpg .jpeg .gif .webp"
+    " .avif .svg .woff .woff2 .webmanifest".split()
+)
+STATIC_EXCLUDED = {LINK_REPORT}
+# 与 app.js 的 statusFilter 取值一致
+STATUS_KEYS = ("translated", "untranslated", "domestic")
+STATUS_LABELS = {"translated": "已汉化", "untranslated": "未汉化", "domestic": "国产"}
+
+
+def status_key(item):
+    if item.get("isDomestic", False):
+        return "domestic"
+    return "translated" if item.get("isTranslated", False) else "untranslated"
+
+
+class CollectionIndex:
+    """记录列表的只读查询索引。位置（从 0 开始）即记录在列表中的下标。"""
+
+    def __init__(self, records, author_links=None, version=None):
+        self.records = records
+        self.author_links = author_links or {}
+        self.version = version
+        self.by_status = {key: [] for key in STATUS_KEYS}
+        self.by_tag, self.by_author, self.by_translator = {}, {}, {}
+        self.tag_names, self.author_names, self.translator_names = {}, {}, {}
+        for i, item in enumerate(records):
+            self.by_status[status_key(item)].append(i)
+            for tag in dict.fromkeys(item.get("tags", [])):
+                self._add(self.by_tag, self.tag_names, tag, i)
+            if item.get("author"):
+                self._add(self.by_author, self.author_names, item["author"], i)
+            for name in dict.fromkeys(split_translators(item.get("translator"))):
+                self._add(self.by_translator, self.translator_names, name, i)
+        dated = sorted(
+            (item.get("dateAdded") or "", i) for i, item in enumerate(records)
+        )
+        self.dates = [d for d, _ in dated]
+        self.date_positions = [i for _, i in dated]
+
+    @staticmethod
+    def _add(index, names, name, position):
+        # 与 app.js 一致按小写匹配，显示时使用第一次出现的写法
+        key = name.lower()
+        index.setdefault(key, []).append(position)
+        names.setdefault(key, name)
+
+    def query(
+        self,
+        status=None,
+        tags=(),
+        authors=(),
+        translators=(),
+        date_from=None,
+        date_to=None,
+        text=None,
+    ):
+        """返回满足全部条件的记录位置（升序）。
+
+        标签、作者、译者均为不区分大小写的精确匹配，多个值之间为“且”；
+        日期边界可以是年、年月或完整日期，包含边界；text 在标题、作者、译者、标签和描述中做子串匹配。
+        """
+        candidates = None
+
+        def narrow(positions):
+            nonlocal candidates
+            positions = set(positions)
+            candidates = positions if candidates is None else candidates & positions
+
+        if status:
+            narrow(self.by_status.get(status, ()))
+        for tag in tags:
+            narrow(self.by_tag.get(tag.lower(), ()))
+        for author in authors:
+            narrow(self.by_author.get(author.lower(), ()))
+        for translator in translators:
+            narrow(self.by_translator.get(translator.lower(), ()))
+        if date_from or date_to:
+            lo = bisect.bisect_left(self.dates, date_from) if date_from else 0
+            hi = (
+                bisect.bisect_right(self.dates, date_to + "\uffff")
+                if date_to
+                else len(self.dates)
+            )
+            narrow(self.date_positions[lo:hi])
+        positions = (
+            sorted(candidates) if candidates is not None else range(len(self.records))
+        )
+        if text:
+            text = text.lower()
+            positions = [
+                i for i in positions if self._matches_text(self.records[i], text)
+            ]
+        return list(positions)
+
+    @staticmethod
+    def _matches_text(item, text):
+        return (
+            text in item["title"].lower()
+            or text in item["author"].lower()
+            or any(text in t.lower() for t in split_translators(item["translator"]))
+            or any(text in tag.lower() for tag in item["tags"])
+            or text in item["description"].lower()
+        )
+
+    def stats(self):
+        years, months = {}, {}
+        for date in self.dates:
+            if date:
+                years[date[:4]] = years.get(date[:4], 0) + 1
+                months[date[:7]] = months.get(date[:7], 0) + 1
+        return {
+            "total": len(self.records),
+            "status": {key: len(self.by_status[key]) for key in STATUS_KEYS},
+            "years": dict(sorted(years.items())),
+            "months": dict(sorted(months.items())),
+            "withThumbnail": sum(1 for item in self.records if item.get("thumbnail")),
+        }
+
+    def suggestions(self):
+        """作者、译者和标签及其作品数，按数量降序（与站点侧边栏一致）"""
+
+        def counted(index, names):
+            rows = [{"name": names[k], "count": len(v)} for k, v in index.items()]
+            rows.sort(key=lambda row: (-row["count"], row["name"]))
+            return rows
+
+        return {
+            "authors": counted(self.by_author, self.author_names),
+            "translators": counted(self.by_translator, self.translator_names),
+            "tags": counted(self.by_tag, self.tag_names),
+        }
+
+
+class CollectionServer(ThreadingHTTPServer):
+    """提供 /api/* 与站点静态文件；每个请求前检查 data.js 是否变化，变化时增量重新加载"""
+
+    daemon_threads = True
+
+    def __init__(self, address, root=".", data_path="data.js"):
+        super().__init__(address, ApiRequestHandler)
+        self.root = os.path.realpath(root)
+        self.data_path = os.path.join(self.root, data_path)
+        self.loader = IncrementalLoader(self.data_path)
+        self.watcher = FileWatcher(self.data_path)
+        self.lock = threading.Lock()
+        self.static_tags = {}  # 路径 -> ((inode, 大小, 修改时间), ETag)，各请求线程共用
+        self.static_lock = threading.Lock()
+        self.index = None
+
+    def current_index(self):
+        with self.lock:
+            if self.index is None or self.watcher.poll():
+                version = file_version(self.data_path)
+                if self.index is None or version != self.index.version:
+                    records = self.loader.load()
+                    links = (
+                        read_author_links(self.data_path)
+                        if os.path.exists(self.data_path)
+                        else {}
+                    )
+                    self.index = CollectionIndex(records, links, version)
+            return self.index
+
+    def is_site_file(self, path):
+        """path（已 realpath）是否是可以作为静态文件提供的站点资源"""
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return False
+        relative = os.path.relpath(path, self.root)
+        parts = relative.split(os.sep)
+        return (
+            not any(part.startswith(".") for part in parts)
+            and os.path.splitext(path)[1].lower() in STATIC_SUFFIXES
+            and relative not in STATIC_EXCLUDED
+        )
+
+    def static_etag(self, path):
+        st = os.stat(path)
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self.static_lock:
+            cached = self.static_tags.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        # 计算哈希时不持有锁；两个线程同时计算同一个文件时结果相同，后写入的覆盖即可
+        etag = f'"{file_hash(path)[:32]}"'
+        with self.static_lock:
+            self.static_tags[path] = (key, etag)
+        return etag
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    server_version = "TouhouChabangekiAPI/1.0"
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def log_message(self, format, *args):
+        print(f"[{self.log_date_time_string()}] {format % args}")
+
+    def _handle(self, send_body):
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query)
+        path = parts.path
+        try:
+            if path.startswith("/api/"):
+                self._api(
+                    path[len("/api/") :].strip("/"), params, parts.query, send_body
+                )
+            else:
+                self._static(path, send_body)
+        except ValueError as e:
+            self._send_json({"error": str(e)}, send_body, status=400)
+
+    # API
+
+    def _api(self, route, params, query, send_body):
+        index = self.server.current_index()
+        # 先确认接口存在、参数有效（否则 404/400），再判断 304，最后才生成响应体
+        if route == "records":
+            filters, page, per_page = self._records_params(params)
+            build = lambda: self._records_page(index, filters, page, per_page)
+        elif route.startswith("records/"):
+            record_id = route[len("records/") :]
+            if not record_id.isdigit() or not 1 <= int(record_id) <= len(index.records):
+                self._send_json({"error": "记录不存在"}, send_body, status=404)
+                return
+            build = lambda: public_record(index.records[int(record_id) - 1])
+        elif route == "stats":
+            build = index.stats
+        elif route == "suggestions":
+            build = index.suggestions
+        elif route == "author-links":
+            build = lambda: index.author_links
+        else:
+            self._send_json({"error": "未知接口"}, send_body, status=404)
+            return
+        # 响应只取决于数据版本与请求，二者相同则字节相同，可以不生成响应体就判断 304
+        etag = (
+            '"'
+            + hashlib.sha1(
+                f"{index.version}|{route}|{query}".encode("utf-8")
+            ).hexdigest()
+            + '"'
+        )
+        if self._not_modified(etag):
+            return
+        self._send_json(build(), send_body, etag=etag)
+
+    def _records_params(self, params):
+        """校验 /api/records 的参数，返回 (筛选条件, 页码, 每页条数)；无效时抛出 ValueError"""
+
+        def one(name):
+            values = params.get(name)
+            return values[-1] if values else None
+
+        status = one("status")
+        if status and status not in STATUS_KEYS:
+            raise ValueError(f"status 应为 {', '.join(STATUS_KEYS)} 之一")
+        for name in ("from", "to"):
+            value = one(name)
+            if value and not re.match(r"^\d{4}(-\d{2}(-\d{2})?)?$", value):
+                raise ValueError(f"{name} 应为 YYYY、YYYY-MM 或 YYYY-MM-DD")
+        try:
+            page = int(one("page") or 1)
+            per_page = int(one("per_page") or API_PAGE_SIZE)
+        except ValueError:
+            raise ValueError("page 与 per_page 应为整数")
+        if page < 1 or not 1 <= per_page <= API_MAX_PAGE_SIZE:
+            raise ValueError(
+                f"page 应大于 0，per_page 应在 1 到 {API_MAX_PAGE_SIZE} 之间"
+            )
+        filters = dict(
+            status=status,
+            tags=params.get("tag", ()),
+            authors=params.get("author", ()),
+            translators=params.get("translator", ()),
+            date_from=one("from"),
+            date_to=one("to"),
+            text=one("q"),
+        )
+        return filters, page, per_page
+
+    def _records_page(self, index, filters, page, per_page):
+        positions = index.query(**filters)
+        start = (page - 1) * per_page
+        return {
+            "version": index.version,
+            "total": len(positions),
+            "page": page,
+            "perPage": per_page,
+            "pages": (len(positions) + per_page - 1) // per_page,
+            "items": [
+                public_record(index.records[i])
+                for i in positions[start : start + per_page]
+            ],
+        }
+
+    # 静态文件
+
+    def _static(self, path, send_body):
+        relative = unquote(path).lstrip("/")
+        target = os.path.realpath(
+            os.path.join(self.server.root, relative or "index.html")
+        )
+        if os.path.isdir(target):
+            target = os.path.join(target, "index.html")
+        if not self.server.is_site_file(target):
+            self.send_error(404)
+            return
+        if target == self.server.data_path:
+            self.server.current_index()
+        etag = self.server.static_etag(target)
+        if self._not_modified(etag):
+            return
+        with open(target, "rb") as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(target)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type.endswith("javascript"):
+            content_type += "; charset=utf-8"
+        self._send(body, content_type, send_body, etag=etag)
+
+    # 响应
+
+    def _not_modified(self, etag):
+        header = self.headers.get("If-None-Match")
+        if not header:
+            return False
+        tags = [t.strip() for t in header.split(",")]
+        if "*" not in tags and etag not in tags:
+            return False
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        return True
+
+    def _send_json(self, obj, send_body, status=200, etag=None):
+        body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+        self._send(body, "application/json; charset=utf-8", send_body, status, etag)
+
+    def _send(self, body, content_type, send_body, status=200, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            # 每次都向服务器确认，数据未变时只返回 304
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def serve_api(host=API_HOST, port=API_PORT, root="."):
+    server = CollectionServer((host, port), root)
+    print(f"本地 API 已启动: http://{host}:{server.server_port}/ （Ctrl+C 停止）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.watcher.close()
+
+
+# --- 批量修改 ---
+# 用与站点搜索框相同的语法选出记录，预览后一次性完成标签重命名/合并、作者译者重命名/合并
+# 或字段内容替换，整批只保存一次，并同步迁移 authorLinks 中的名字。
+
+QUERY_TOKEN = re.compile(r'(\w+)\s*[:=]\s*(?:"([^"]*)"|(\S+))')
+QUERY_KEYS = {
+    "tag": "tags",
+    "artist": "authors",  # app.js 中作者筛选写作 artist="..."
+    "author": "authors",
+    "translator": "translators",
+    "status": "status",
+    "from": "date_from",
+    "to": "date_to",
+    "date": "date",
+}
+STATUS_ALIASES = {
+    "translated": "translated",
+    "已汉化": "translated",
+    "untranslated": "untranslated",
+    "未汉化": "untranslated",
+    "domestic": "domestic",
+    "国产": "domestic",
+}
+DATE_BOUND = re.compile(r"^\d{4}(-\d{2}(-\d{2})?)?$")
+BULK_FIELDS = (
+    "title",
+    "author",
+    "translator",
+    "originalUrl",
+    "translatedUrl",
+    "description",
+    "thumbnail",
+)
+BULK_OPERATIONS = {
+    "rename-tag": "重命名/合并标签",
+    "rename-person": "重命名/合并作者或译者",
+    "rewrite": "替换字段内容",
+}
+TRANSLATOR_SEPARATOR = re.compile(r"([,、&和]\s*)")
+
+BulkEdit = namedtuple("BulkEdit", "matched changes author_links")
+
+
+def parse_query(text):
+    """解析查询字符串，返回 CollectionIndex.query 的参数。
+
+    语法与 app.js 的 parseSearchInput 一致（tag="..."、artist="..."、translator="..."），
+    另外支持 key:value 写法、author、status（translated/untranslated/domestic 或中文）、
+    from、to 以及 date:2024..2025-06 形式的日期范围；其余文字作为模糊匹配词。
+    """
+    query = {"tags": [], "authors": [], "translators": []}
+
+    def take(m):
+        key = QUERY_KEYS.get(m[1].lower())
+        if key is None:
+            return m[0]
+        value = (m[2] if m[2] is not None else m[3]).strip()
+        if key == "status":
+            if value.lower() not in STATUS_ALIASES:
+                raise ValueError(f"未知的状态: {value}")
+            query["status"] = STATUS_ALIASES[value.lower()]
+        elif key in ("date", "date_from", "date_to"):
+            low, _, high = value.partition("..")
+            bounds = {"date_from": low, "date_to": high if _ else low}
+            if key != "date":
+                bounds = {key: value}
+            for name, bound in bounds.items():
+                if bound and not DATE_BOUND.match(bound):
+                    raise ValueError(f"日期应为 YYYY、YYYY-MM 或 YYYY-MM-DD: {bound}")
+                query[name] = bound or None
+        else:
+            query[key].append(value)
+        return " "
+
+    rest = QUERY_TOKEN.sub(take, text)
+    query["text"] = " ".join(rest.split()) or None
+    return query
+
+
+def people_of(item):
+    names = set(split_translators(item.get("translator")))
+    if item.get("author"):
+        names.add(item["author"])
+    return names
+
+
+def rename_tag(item, old, new):
+    """把与 old（不区分大小写）相同的标签改为 new，已有 new 时合并"""
+    old = old.lower()
+    if not any(tag.lower() == old for tag in item["tags"]):
+        return False
+    tags = [new if tag.lower() == old else tag for tag in item["tags"]]
+    item["tags"] = list(dict.fromkeys(tags))
+    return True
+
+
+def rename_person(item, old, new):
+    """在作者和译者中把 old 改为 new，多译者时保留原有分隔符，重复的名字合并"""
+    changed = False
+    if item["author"] == old:
+        item["author"] = new
+        changed = True
+    # 奇数位置是分隔符，偶数位置是名字（可能带空白）
+    parts = TRANSLATOR_SEPARATOR.split(item["translator"] or "")
+    if any(part.strip() == old for part in parts[0::2]):
+        kept, seen = [], set()
+        for i in range(0, len(parts), 2):
+            name = parts[i].strip()
+            text = parts[i].replace(old, new) if name == old else parts[i]
+            name = new if name == old else name
+            if name in seen:
+                continue
+            seen.add(name)
+            if kept:
+                kept.append(parts[i - 1])
+            kept.append(text)
+        item["translator"] = "".join(kept).strip()
+        changed = True
+    return changed
+
+
+def rewrite_field(item, field, old, new, regex=False):
+    """在指定字段中把 old 替换为 new（regex 为真时 old 是正则表达式）"""
+    value = item.get(field) or ""
+    if regex:
+        replaced = re.sub(old, new, value)
+    else:
+        replaced = value.replace(old, new)
+    if replaced == value:
+        return False
+    item[field] = replaced
+    return True
+
+
+def migrate_author_links(author_links, records, old, new):
+    """old 已不再被任何记录引用时，把它在 authorLinks 中的链接移到 new（new 已有链接时保留 new 的）"""
+    if old not in author_links or any(old in people_of(item) for item in records):
+        return author_links
+    link = author_links[old]
+    migrated = {}
+    for name, value in author_links.items():
+        if name == old:
+            if new not in author_links:
+                migrated[new] = link
+        elif name == new:
+            migrated[new] = value or link
+        else:
+            migrated[name] = value
+    return migrated
+
+
+def plan_bulk_edit(records, author_links, query, operation, *args):
+    """计算批量修改而不改动 records，返回 BulkEdit(匹配数, [(位置, 新记录, 变化字段)], 新 authorLinks)。
+
+    operation 为 BULK_OPERATIONS 中的键：rename-tag 与 rename-person 的参数为 (旧名, 新名)，
+    rewrite 的参数为 (字段, 旧内容, 新内容[, 是否正则])。
+    """
+    if operation == "rename-tag":
+        edit = partial(rename_tag, old=args[0], new=args[1])
+    elif operation == "rename-person":
+        edit = partial(rename_person, old=args[0], new=args[1])
+    elif operation == "rewrite":
+        if args[0] not in BULK_FIELDS:
+            raise ValueError(f"不支持替换的字段: {args[0]}")
+        if len(args) > 3 and args[3]:
+            try:
+                re.compile(args[1])
+            except re.error as e:
+                raise ValueError(f"正则表达式无效: {e}")
+        edit = partial(
+            rewrite_field, **dict(zip(("field", "old", "new", "regex"), args))
+        )
+    else:
+        raise ValueError(f"未知的批量操作: {operation}")
+    if operation != "rewrite" and not (args[0].strip() and args[1].strip()):
+        raise ValueError("旧名称和新名称都不能为空")
+
+    positions = CollectionIndex(records).query(**parse_query(query))
+    changes = []
+    for i in positions:
+        item = dict(public_record(records[i]), tags=list(records[i]["tags"]))
+        if edit(item):
+            changes.append((i, item, changed_fields(records[i], item)))
+
+    links = author_links
+    if operation == "rename-person" and changes:
+        changed = {i: item for i, item, _ in changes}
+        after = [changed.get(i, item) for i, item in enumerate(records)]
+        links = migrate_author_links(author_links, after, *args)
+    return BulkEdit(len(positions), changes, links)
+
+
+def apply_bulk_edit(records, edit):
+    """把 plan_bulk_edit 的结果写回 records，返回被替换掉的旧记录"""
+    replaced = []
+    for i, item, _ in edit.changes:
+        replaced.append(records[i])
+        records[i] = item
+        record_links(item)
+    return replaced
+
+
+def format_bulk_preview(records, edit, limit=20):
+    lines = []
+    for i, item, fields in edit.changes[:limit]:
+        old = records[i]
+        diffs = ", ".join(f"{f}: {old.get(f)!r} → {item.get(f)!r}" for f in fields)
+        lines.append(f"  [{old['id']}] {old['title']}: {diffs}")
+    if len(edit.changes) > limit:
+        lines.append(f"  ……另有 {len(edit.changes) - limit} 条")
+    lines.append(f"匹配 {edit.matched} 条，将修改 {len(edit.changes)} 条")
+    return "\n".join(lines)
+
+
+# --- 可观察的记录集合 ---
+# 主界面的记录列表只通过 RecordCollection 的方法修改，每次修改发出类型化的变更事件；
+# 表格、重复索引、候选词统计与自动保存订阅这些事件，只处理变化的部分
+
+RecordInserted = namedtuple("RecordInserted", "position item")
+RecordUpdated = namedtuple("RecordUpdated", "position old item fields")
+RecordMoved = namedtuple("RecordMoved", "source target item")
+# 一次删除多条时按位置从后往前发出，位置即删除前列表中的下标
+RecordRemoved = namedtuple("RecordRemoved", "position item")
+CollectionReset = namedtuple("CollectionReset", "old records")
+BatchBegin = namedtuple("BatchBegin", "")
+# 批次结束时的重新编号：changes 为 [(位置, 旧记录, 只改了 ID 的新记录)]，
+# 派生数据只需把旧对象换成新对象，不必重新计算
+RecordsRenumbered = namedtuple("RecordsRenumbered", "changes")
+# renumbered_from：本批次从该位置起重新编号了 ID，没有时为 None
+BatchEnd = namedtuple("BatchEnd", "renumbered_from")
+
+
+class RecordCollection:
+    """有序的记录列表，修改后同步通知订阅者。
+
+    记录视为不可变，修改条目时用 update 换成新的字典。ID 始终等于位置加一：
+    插入、删除、移动后在批次结束时从受影响的位置起重新编号：ID 不符的记录换成副本，
+    整批只发出一个 RecordsRenumbered（逐条发出 RecordUpdated 在大集合上太慢）。
+    reset 之后同样从头检查一遍：沿用的旧记录位置变了时，随 CollectionReset 之后发出 RecordsRenumbered。
+    """
+
+    def __init__(self, records=()):
+        self._records = list(records)
+        self._listeners = []
+        self._depth = 0
+        self._renumber_from = None
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __getitem__(self, index):
+        return self._records[index]
+
+    def subscribe(self, listener):
+        """listener(event) 在每次修改之后同步调用"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    def _emit(self, event):
+        for listener in list(self._listeners):
+            listener(event)
+
+    @contextmanager
+    def batch(self):
+        """把多次修改合并为一个批次；可以嵌套，只在最外层发出 BatchBegin/BatchEnd"""
+        self._depth += 1
+        if self._depth == 1:
+            self._emit(BatchBegin())
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                start, self._renumber_from = self._renumber_from, None
+                if start is not None:
+                    self._renumber(start)
+                self._emit(BatchEnd(start))
+
+    def _renumber(self, start):
+        records = self._records
+        changes = []
+        for i in range(start, len(records)):
+            old = records[i]
+            if old.get("id") != i + 1:
+                records[i] = dict(old, id=i + 1)
+                changes.append((i, old, records[i]))
+        if changes:
+            self._emit(RecordsRenumbered(changes))
+
+    def _shifted(self, position):
+        if self._renumber_from is None or position < self._renumber_from:
+            self._renumber_from = position
+
+    def insert(self, position, item):
+        with self.batch():
+            self._records.insert(position, item)
+            self._shifted(position)
+            self._emit(RecordInserted(position, item))
+
+    def append(self, item):
+        self.insert(len(self._records), item)
+
+    def extend(self, items):
+        with self.batch():
+            for item in items:
+                self.append(item)
+
+    def update(self, position, item, fields=None):
+        """把 position 上的记录换成 item；fields 为变化的字段，省略时自动比较"""
+        old = self._records[position]
+        if fields is None:
+            fields = changed_fields(old, item)
+        with self.batch():
+            self._records[position] = item
+            self._emit(RecordUpdated(position, old, item, fields))
+
+    def move(self, source, target):
+        if source == target:
+            return
+        with self.batch():
+            item = self._records.pop(source)
+            self._records.insert(target, item)
+            self._shifted(min(source, target))
+            self._emit(RecordMoved(source, target, item))
+
+    def remove(self, positions):
+        """删除若干位置上的记录；列表只重建一次，再按从后往前的顺序发出事件"""
+        removed = sorted(set(positions), reverse=True)
+        if not removed:
+            return
+        with self.batch():
+            old = self._records
+            dropped = set(removed)
+            self._records = [item for i, item in enumerate(old) if i not in dropped]
+            self._shifted(removed[-1])
+            for position in removed:
+                self._emit(RecordRemoved(position, old[position]))
+
+    def reset(self, records):
+        """整体替换为 records；未变化的记录应沿用原对象，订阅者可据此只处理差异"""
+        with self.batch():
+            old, self._records = self._records, list(records)
+            self._shifted(0)
+            self._emit(CollectionReset(old, self._records))
+
+
+MONTH_PATTERN = re.compile(r"\d{4}-\d{2}")
+
+
+class CollectionStats:
+    """按状态、添加月份、作者、译者、标签与缩略图覆盖的计数，随集合的变更事件增量维护。
+    作者、译者与标签的计数同时用作输入框的候选词。"""
+
+    def __init__(self, records=()):
+        self.authors, self.translators, self.tags = Counter(), Counter(), Counter()
+        self.statuses, self.months = Counter(), Counter()
+        self.total = self.with_thumbnail = 0
+        self.counted = set()
+        for item in records:
+            self._count(item, 1)
+
+    def _count(self, item, step):
+        if step > 0:
+            self.counted.add(id(item))
+        else:
+            self.counted.discard(id(item))
+        self.total += step
+        if item.get("thumbnail"):
+            self.with_thumbnail += step
+        month = str(item.get("dateAdded") or "")[:7]
+        names = [
+            (self.statuses, status_text(item)),
+            (self.months, month if MONTH_PATTERN.fullmatch(month) else ""),
+        ]
+        if item.get("author"):
+            names.append((self.authors, item["author"]))
+        if item.get("translator"):
+            # 支持多种分隔符：, 、、&和
+            for translator in re.split(r"[,、&和]\s*", item["translator"]):
+                if translator.strip():
+                    names.append((self.translators, translator.strip()))
+        names.extend((self.tags, tag) for tag in item.get("tags", []))
+        for counter, name in names:
+            counter[name] += step
+            if counter[name] <= 0:
+                del counter[name]
+
+    def years(self):
+        """按年份汇总的新增数量；月份键的个数很少，汇总代价与记录数无关"""
+        years = Counter()
+        for month, count in self.months.items():
+            years[month[:4]] += count
+        return years
+
+    def apply(self, event):
+        if isinstance(event, RecordInserted):
+            self._count(event.item, 1)
+        elif isinstance(event, RecordRemoved):
+            self._count(event.item, -1)
+        elif isinstance(event, RecordUpdated):
+            self._count(event.old, -1)
+            self._count(event.item, 1)
+        elif isinstance(event, RecordsRenumbered):
+            self.counted.difference_update(id(old) for _, old, _ in event.changes)
+            self.counted.update(id(item) for _, _, item in event.changes)
+        elif isinstance(event, CollectionReset):
+            # 只处理增减的记录对象；已预先统计过的记录（如后台加载时）不会重复计数
+            keep = {id(item) for item in event.records}
+            for item in event.old:
+                if id(item) in self.counted and id(item) not in keep:
+                    self._count(item, -1)
+            for item in event.records:
+                if id(item) not in self.counted:
+                    self._count(item, 1)
+
+
+# --- 后台任务 ---
+# 耗时操作在工作线程中执行（CPU 密集的部分再由 run_jobs 分发到进程池），
+# 进度与结果经线程安全的队列交回 Tk 主线程，由 after 轮询处理
+
+TASK_POLL_INTERVAL = 50  # 轮询任务消息的间隔（毫秒）
+TASK_FRAME_BUDGET = 0.012  # 每次轮询处理消息的时间上限（秒），不超过一帧
+TASK_DIALOG_DELAY = 300  # 任务超过该时长（毫秒）才显示进度窗口，避免短任务闪烁
+
+
+class TaskCancelled(Exception):
+    """任务被用户取消"""
+
+
+class Task:
+    """传给后台任务函数的句柄：报告进度、检查是否已被取消。可在任意线程中调用。"""
+
+    def __init__(self, messages, on_cancel=None):
+        self.messages = messages
+        self.on_cancel = on_cancel
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """设置取消标志，并调用 on_cancel 通知不轮询该标志的部分（如 LinkChecker）"""
+        if self._cancel.is_set():
+            return
+        self._cancel.set()
+        if self.on_cancel:
+            self.on_cancel()
+
+    def check(self):
+        """已取消时抛出 TaskCancelled，在任务的循环中调用"""
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def progress(self, done, total=0, text=None):
+        """total 为 0 时进度条显示为不确定模式"""
+        self.messages.put(("progress", (done, total, text)))
+
+
+class TaskRunner:
+    """在工作线程中执行任务，并在 Tk 主线程中回调 on_done / on_error / on_finally。
+
+    modal 任务运行期间主窗口不响应鼠标与键盘（Tk busy），保证任务读取的数据不被修改；
+    任务超过 TASK_DIALOG_DELAY 后显示带取消按钮的进度窗口。
+    """
+
+    def __init__(self, root, busy_widget=None):
+        self.root = root
+        self.busy_widget = busy_widget or root
+        self.modal = 0
+
+    @property
+    def busy(self):
+        return self.modal > 0
+
+    def run(
+        self,
+        job,
+        on_done=None,
+        title=None,
+        on_error=None,
+        on_progress=None,
+        on_cancel=None,
+        modal=True,
+        cancellable=True,
+        on_finally=None,
+    ):
+        """job(task) 在工作线程中执行，返回值交给 on_done；返回 Task 句柄。
+
+        不检查取消标志的任务应传 cancellable=False，进度窗口不显示取消按钮。
+        on_cancel 在任务被取消时（取消按钮或 Task.cancel）由发起取消的线程调用一次。
+        任务被取消时 on_done 与 on_error 都不会调用；on_finally 无论结果如何都在主线程中
+        最后调用一次，调用方在这里恢复自己设置的忙碌状态。
+        """
+        messages = queue.Queue()
+        task = Task(messages, on_cancel)
+
+        def work():
+            try:
+                messages.put(("done", job(task)))
+            except TaskCancelled:
+                messages.put(("cancelled", None))
+            except Exception as e:
+                messages.put(("error", e))
+
+        state = {"dialog": None, "finished": False, "progress": None}
+
+        def show_dialog():
+            if state["finished"] or not title:
+                return
+            state["dialog"] = TaskProgressDialog(
+                self.root, title, task.cancel if cancellable else None
+            )
+            if state["progress"]:
+                state["dialog"].set_progress(*state["progress"])
+
+        def poll():
+            # 一次只处理一帧时间内的消息；进度只保留最新一条
+            deadline = time.monotonic() + TASK_FRAME_BUDGET
+            outcome = None
+            progress = None
+            while outcome is None and time.monotonic() < deadline:
+                try:
+                    kind, value = messages.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "progress":
+                    progress = value
+                else:
+                    outcome = kind, value
+            if progress:
+                state["progress"] = progress
+                if state["dialog"] is not None:
+                    state["dialog"].set_progress(*progress)
+                if on_progress:
+                    on_progress(*progress)
+            if outcome is None:
+                self.root.after(TASK_POLL_INTERVAL, poll)
+                return
+            state["finished"] = True
+            if state["dialog"] is not None:
+                state["dialog"].destroy()
+            if modal:
+                self._release()
+            kind, value = outcome
+            try:
+                if kind == "done":
+                    if on_done:
+                        on_done(value)
+                elif kind == "error":
+                    if on_error:
+                        on_error(value)
+                    else:
+                        messagebox.showerror("错误", f"任务失败: {value}")
+            finally:
+                if on_finally:
+                    on_finally()
+
+        if modal:
+            self._hold()
+        threading.Thread(target=work, daemon=True).start()
+        if title:
+            self.root.after(TASK_DIALOG_DELAY, show_dialog)
+        self.root.after(TASK_POLL_INTERVAL, poll)
+        return task
+
+    def _hold(self):
+        self.modal += 1
+        if self.modal > 1:
+            return
+        try:
+            self.root.tk.call("tk", "busy", "hold", str(self.busy_widget))
+        except tk.TclError:
+            # Tk 8.5 没有 busy 命令，退回为只把焦点移出主窗口的控件
+            pass
+        # 键盘事件不受 busy 拦截，把焦点移到顶层窗口上
+        self.root.focus_set()
+
+    def _release(self):
+        self.modal -= 1
+        if self.modal:
+            return
+        try:
+            self.root.tk.call("tk", "busy", "forget", str(self.busy_widget))
+        except tk.TclError:
+            pass
+
+
+# --- 缩略图预览 ---
+# 预览只读取本地缩略图目录或本机 HTTP 地址（如本地预览服务器），不访问外网；
+# 图片在工作线程中解码并缩小一次，主线程只创建 PhotoImage，按像素占用做 LRU 缓存。
+
+PREVIEW_SIZE = (240, 135)
+PREVIEW_CACHE_BYTES = 32 * 1024 * 1024  # 缓存的 PhotoImage 按 宽×高×4 计算占用
+PREVIEW_MAX_BYTES = 10 * 1024 * 1024  # 通过 HTTP 读取的图片大小上限
+PREVIEW_TIMEOUT = 5
+PREVIEW_WORKERS = 2
+PREVIEW_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+def thumbnail_source(url, image_dir=THUMBNAIL_OUTPUT_DIR):
+    """把缩略图 URL 对应到可预览的来源：("file", 路径) 或 ("http", 本机 URL)，没有时返回 None。
+
+    CDN 地址按文件名在本地缩略图目录中查找同名文件（同步缩略图时两者一致）。
+    """
+    url = (url or "").strip()
+    if not url:
+        return None
+    parts = urlsplit(url)
+    if parts.scheme in ("http", "https") and parts.hostname in PREVIEW_HOSTS:
+        return "http", url
+    if not parts.scheme and os.path.isfile(url):
+        return "file", url
+    name = os.path.basename(unquote(parts.path))
+    path = os.path.join(image_dir, name)
+    if name and os.path.isfile(path):
+        return "file", path
+    return None
+
+
+def decode_preview(source, size=PREVIEW_SIZE):
+    """在工作线程中执行：读取并缩小图片，返回可直接传给 tk.PhotoImage 的 PNG base64 数据"""
+    try:
+        from PIL import Image
+    except ImportError:
+        raise RuntimeError("预览缩略图需要 Pillow，请先运行: pip install Pillow")
+    kind, location = source
+    if kind == "http":
+        from urllib.request import urlopen
+
+        with urlopen(location, timeout=PREVIEW_TIMEOUT) as response:
+            data = response.read(PREVIEW_MAX_BYTES + 1)
+        if len(data) > PREVIEW_MAX_BYTES:
+            raise ValueError("图片过大")
+        location = io.BytesIO(data)
+    with Image.open(location) as img:
+        # JPEG 可以在解码时直接按 1/2、1/4、1/8 缩小
+        img.draft("RGB", size)
+        img = img.convert("RGB")
+        img.thumbnail(size)
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue())
+
+
+class ThumbnailPreviews:
+    """异步加载缩略图预览，结果按 LRU 缓存；回调总是在 Tk 主线程中执行"""
+
+    def __init__(self, root, max_bytes=PREVIEW_CACHE_BYTES, size=PREVIEW_SIZE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.size = size
+        # 键 -> (PhotoImage 或 None, 错误信息, 占用字节)
+        self.cache = OrderedDict()
+        self.used = 0
+        self.pending = {}
+        self.results = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=PREVIEW_WORKERS)
+        self.polling = False
+
+    @staticmethod
+    def _key(source):
+        # 本地文件带上修改时间，重新生成缩略图后不会显示旧图
+        kind, location = source
+        if kind == "file":
+            try:
+                return source, os.stat(location).st_mtime_ns
+            except OSError:
+                return source, None
+        return source, None
+
+    def request(self, source, callback):
+        """callback(image, error)；已缓存时立即调用，否则在解码完成后调用"""
+        key = self._key(source)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            image, error, _ = self.cache[key]
+            callback(image, error)
+            return
+        if key in self.pending:
+            self.pending[key].append(callback)
+            return
+        self.pending[key] = [callback]
+        future = self.executor.submit(decode_preview, source, self.size)
+        future.add_done_callback(lambda f: self.results.put((key, f)))
+        if not self.polling:
+            self.polling = True
+            self.root.after(TASK_POLL_INTERVAL, self._poll)
+
+    def _poll(self):
+        deadline = time.monotonic() + TASK_FRAME_BUDGET
+        while time.monotonic() < deadline:
+            try:
+                key, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                image = tk.PhotoImage(master=self.root, data=future.result())
+                error, cost = None, image.width() * image.height() * 4
+            except Exception as e:
+                # 失败也缓存（记一个很小的占用），悬停时不会反复读取同一张坏图
+                image, error, cost = None, str(e), 1024
+            self._store(key, image, error, cost)
+            for callback in self.pending.pop(key, ()):
+                callback(image, error)
+        if self.pending:
+            self.root.after(TASK_POLL_INTERVAL, self._poll)
+        else:
+            self.polling = False
+
+    def _store(self, key, image, error, cost):
+        self.cache[key] = (image, error, cost)
+        self.used += cost
+        while self.used > self.max_bytes and len(self.cache) > 1:
+            _, (_, _, freed) = self.cache.popitem(last=False)
+            self.used -= freed
+
+
+class PreviewTip(tk.Toplevel):
+    """鼠标悬停在表格行上时显示的缩略图浮窗"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.wm_overrideredirect(True)
+        self.label = tk.Label(
+            self,
+            background="lightyellow",
+            relief=tk.SOLID,
+            borderwidth=1,
+            font=("Microsoft YaHei", 9),
+        )
+        self.label.pack()
+        self.withdraw()
+
+    def show(self, x, y, image=None, text=""):
+        self.label.configure(image=image or "", text=text, compound=tk.TOP)
+        # 保留引用，否则 PhotoImage 被回收后图片会消失
+        self.label.image = image
+        self.wm_geometry(f"+{x + 16}+{y + 16}")
+        self.deiconify()
+        self.lift()
+
+    def hide(self):
+        self.withdraw()
+
+
+# --- 统计面板 ---
+# 计数由 CollectionStats 随每次修改增量维护；面板打开时每批修改后在空闲时重绘一次，
+# 重绘只遍历计数表的键（状态、月份、人名、标签），与记录总数无关
+
+STATS_TOP = 10  # 作者、译者、标签各显示前几名
+STATS_RECENT_MONTHS = 12  # 按月新增显示最近几个月
+
+
+def format_stats(stats, top=STATS_TOP, recent_months=STATS_RECENT_MONTHS):
+    """把 CollectionStats 排成面板中显示的文本"""
+    total = stats.total
+    share = f" ({stats.with_thumbnail / total:.0%})" if total else ""
+    lines = [f"共 {total} 条", f"有缩略图: {stats.with_thumbnail}{share}", "", "状态"]
+    lines += [f"  {label}\t{stats.statuses[label]}" for label in STATUS_LABELS.values()]
+    lines += ["", "按年份新增"]
+    years = stats.years()
+    lines += [
+        f"  {year or '未知'}\t{years[year]}" for year in sorted(years, reverse=True)
+    ]
+    lines += ["", f"最近 {recent_months} 个月新增"]
+    months = sorted((month for month in stats.months if month), reverse=True)
+    lines += [f"  {month}\t{stats.months[month]}" for month in months[:recent_months]]
+    for title, counter in (
+        ("作者", stats.authors),
+        ("译者", stats.translators),
+        ("标签", stats.tags),
+    ):
+        lines += ["", f"{title} 前 {top} 名（共 {len(counter)} 个）"]
+        lines += [f"  {name}\t{count}" for name, count in counter.most_common(top)]
+    return "\n".join(lines)
+
+
+class StatsPanel(ttk.Frame):
+    """主窗口右侧的统计面板，内容由 format_stats 生成"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.text = tk.Text(
+            self,
+            width=30,
+            wrap=tk.NONE,
+            font=("Microsoft YaHei", 9),
+            tabs=("16c",),
+            background="#fafafa",
+            relief=tk.FLAT,
+        )
+        vsb = ttk.Scrollbar(self, orient="vertical", command=self.text.yview)
+        self.text.configure(yscrollcommand=vsb.set, state=tk.DISABLED)
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    def refresh(self, stats):
+        top = self.text.yview()[0]
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", format_stats(stats))
+        self.text.configure(state=tk.DISABLED)
+        self.text.yview_moveto(top)
+
+
+SHIFT_MASK = 0x0001  # Tk 事件 state 中的修饰键位
+CONTROL_MASK = 0x0004
+SEARCH_DELAY = 150  # 停止输入后多久执行搜索（毫秒）
+SEARCH_LIMIT = 500  # 搜索结果最多显示多少行（按相关度）
+HOVER_DELAY = 400  # 鼠标在一行上停留多久显示缩略图预览（毫秒）
+ALL_STATUSES = "全部状态"
+ALL_YEARS = "全部年份"
+STATUS_FILTERS = {label: key for key, label in STATUS_LABELS.items()}
+
+
+def view_filter(item, status, year):
+    """表格的状态与年份筛选；status、year 为 None 时不限"""
+    return (not status or status_key(item) == status) and (
+        not year or (item.get("dateAdded") or "")[:4] == year
+    )
 
 
 class DataManagerGUI:
-    def __init__(self, root):
+    def __init__(self, root, store=None):
         self.root = root
+        # 启用 SQLite 存储时为 CollectionStore，data.js 只作为导出产物
+        self.store = store
         self.root.title("东方 Project 茶番剧管理系统")
         self.root.geometry("1000x700")
 
-        self.data = self.load_data()
+        self.loader = IncrementalLoader()
+        # 数据在界面建好后由后台任务载入；记录只通过 RecordCollection 的方法修改
+        self.data = RecordCollection()
+        self.data_version = None
+        self.base_records = []
+        self.data_unreadable = (
+            False  # data.js 无法解析时为 True，修复并重新载入前不保存
+        )
+        self.dup_index = DuplicateIndex()
+        self.stats = CollectionStats()
+        self.stats_panel = None
+        self._stats_job = None
+        self.search_index = SearchIndex()
+        self._saving = None  # 进行中的保存任务
+        self._pending_save = None
+        self._autosave_requested = False
+        # 表格中各行的 iid，与 self.data 按位置一一对应；搜索、筛选时表格只显示其中一部分
+        self._rows = []
+        self._removed_rows = []
+        # 表格当前是否显示搜索、筛选或排序后的视图（与保存顺序不同）
+        self._view_active = False
+        self._search_job = None
+        # 每次重新计算视图时递增；后台查询返回时据此丢弃过期的结果
+        self._view_generation = 0
+        self._searching = False
+        self._search_pending = False
+        self._deferred_search_events = []
+        self.sort_keys = SortKeys()
+        self._sort = None  # (列, 是否降序)；None 表示按保存顺序
+        self.previews = ThumbnailPreviews(self.root)
+        self.preview_tip = None
+        self._hover = None
+        self._hover_job = None
+        self.watcher = FileWatcher() if store is None else None
+        self._external_change = False
         self._drag_data = {"item": None, "index": None}
 
         # 主框架
         self.main_frame = ttk.Frame(self.root, padding="10")
         self.main_frame.pack(fill=tk.BOTH, expand=True)
+        self.tasks = TaskRunner(self.root, self.main_frame)
 
         # 顶部标题
         header = ttk.Frame(self.main_frame)
@@ -41,6 +5227,8 @@ class DataManagerGUI:
         ttk.Label(header, text=" [ 拖拽行排序 | ID 自动同步 ]", foreground="#666").pack(
             side=tk.LEFT, padx=15, pady=5
         )
+        self.status_label = ttk.Label(header, text="", foreground="#666")
+        self.status_label.pack(side=tk.RIGHT, pady=5)
 
         # 按钮区
         btn_bar = ttk.Frame(self.main_frame)
@@ -54,21 +5242,99 @@ class DataManagerGUI:
         ttk.Button(btn_bar, text="从 JSON 添加", command=self.add_from_json).pack(
             side=tk.LEFT, padx=2
         )
+        ttk.Button(btn_bar, text="从文件导入", command=self.import_from_file).pack(
+            side=tk.LEFT, padx=2
+        )
+        ttk.Button(btn_bar, text="从链接抓取", command=self.add_from_urls).pack(
+            side=tk.LEFT, padx=2
+        )
+        ttk.Button(btn_bar, text="批量修改", command=self.bulk_edit).pack(
+            side=tk.LEFT, padx=2
+        )
         ttk.Button(btn_bar, text="修改选中项", command=self.edit_item).pack(
             side=tk.LEFT, padx=2
         )
         ttk.Button(btn_bar, text="删除选中项", command=self.delete_item).pack(
             side=tk.LEFT, padx=2
         )
+        batch_button = ttk.Menubutton(btn_bar, text="选中项批量操作")
+        batch_button.pack(side=tk.LEFT, padx=2)
+        self.batch_menu = self._build_batch_menu(batch_button)
+        batch_button["menu"] = self.batch_menu
         ttk.Button(
             btn_bar, text="清除所有缩略图", command=self.clear_all_thumbnails
         ).pack(side=tk.LEFT, padx=2)
         ttk.Button(
             btn_bar, text="生成缩略图URL", command=self.generate_thumbnail_urls
         ).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_bar, text="处理本地缩略图", command=self.build_thumbnails).pack(
+            side=tk.LEFT, padx=2
+        )
+        ttk.Button(btn_bar, text="生成占位图", command=self.build_placeholders).pack(
+            side=tk.LEFT, padx=2
+        )
+        ttk.Button(btn_bar, text="同步缩略图", command=self.sync_thumbnails).pack(
+            side=tk.LEFT, padx=2
+        )
+        ttk.Button(btn_bar, text="检查链接", command=self.check_links).pack(
+            side=tk.LEFT, padx=2
+        )
         ttk.Button(btn_bar, text="强制保存", command=self.save_data_gui).pack(
             side=tk.RIGHT, padx=2
         )
+        ttk.Button(btn_bar, text="导出全部格式", command=self.export_all).pack(
+            side=tk.RIGHT, padx=2
+        )
+        ttk.Button(
+            btn_bar, text="生成静态页面", command=self.prerender_static_pages
+        ).pack(side=tk.RIGHT, padx=2)
+
+        # 搜索栏：输入时过滤表格，结果按相关度排列
+        search_bar = ttk.Frame(self.main_frame)
+        search_bar.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(search_bar, text="搜索:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self._schedule_search())
+        search_entry = ttk.Entry(search_bar, textvariable=self.search_var, width=40)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Escape>", lambda e: self.search_var.set(""))
+        ttk.Button(
+            search_bar, text="清除", command=lambda: self.search_var.set("")
+        ).pack(side=tk.LEFT)
+        ttk.Label(
+            search_bar,
+            text="匹配标题、作者、译者和描述，空格分隔多个词",
+            foreground="#666",
+        ).pack(side=tk.LEFT, padx=10)
+        self.root.bind("<Control-f>", lambda e: search_entry.focus_set())
+        ttk.Button(search_bar, text="重置视图", command=self.reset_view).pack(
+            side=tk.RIGHT
+        )
+        ttk.Button(search_bar, text="统计", command=self.toggle_stats).pack(
+            side=tk.RIGHT, padx=(0, 5)
+        )
+        self.year_filter = tk.StringVar(value=ALL_YEARS)
+        year_box = ttk.Combobox(
+            search_bar,
+            textvariable=self.year_filter,
+            state="readonly",
+            width=8,
+            postcommand=lambda: year_box.configure(values=self.year_choices()),
+        )
+        year_box.pack(side=tk.RIGHT, padx=(0, 10))
+        year_box.bind("<<ComboboxSelected>>", lambda e: self.apply_view())
+        ttk.Label(search_bar, text="年份:").pack(side=tk.RIGHT)
+        self.status_filter = tk.StringVar(value=ALL_STATUSES)
+        status_box = ttk.Combobox(
+            search_bar,
+            textvariable=self.status_filter,
+            values=[ALL_STATUSES, *STATUS_LABELS.values()],
+            state="readonly",
+            width=8,
+        )
+        status_box.pack(side=tk.RIGHT, padx=(0, 10))
+        status_box.bind("<<ComboboxSelected>>", lambda e: self.apply_view())
+        ttk.Label(search_bar, text="状态:").pack(side=tk.RIGHT)
 
         # 表格区
         self.list_frame = ttk.Frame(self.main_frame)
@@ -78,7 +5344,7 @@ class DataManagerGUI:
             self.list_frame,
             columns=("id", "title", "author", "translator", "status", "date"),
             show="headings",
-            selectmode="browse",
+            selectmode="extended",
         )
 
         cols = {
@@ -89,15 +5355,19 @@ class DataManagerGUI:
             "status": ("状态", 85),
             "date": ("添加日期", 110),
         }
+        self.column_names = {col_id: name for col_id, (name, _) in cols.items()}
         for col_id, (name, width) in cols.items():
-            self.tree.heading(col_id, text=name)
+            # 点击列头依次切换升序、降序、恢复保存顺序
+            self.tree.heading(col_id, text=name, command=partial(self.sort_by, col_id))
             self.tree.column(
                 col_id,
                 width=width,
                 anchor=tk.CENTER if col_id in ["id", "status", "date"] else tk.W,
             )
 
-        vsb = ttk.Scrollbar(self.list_frame, orient="vertical", command=self.tree.yview)
+        self.tree_scrollbar = vsb = ttk.Scrollbar(
+            self.list_frame, orient="vertical", command=self.tree.yview
+        )
         self.tree.configure(yscrollcommand=vsb.set)
         vsb.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -107,36 +5377,78 @@ class DataManagerGUI:
         self.tree.bind("<B1-Motion>", self.on_drag_motion)
         self.tree.bind("<ButtonRelease-1>", self.on_drag_drop)
         self.tree.tag_configure("dragging", background="#e8f0fe")
-
-        self.fill_treeview()
+        # 多选：Ctrl/Shift+单击、Ctrl+A 全选，右键打开批量操作菜单
+        self.tree.bind("<Button-3>", self.show_batch_menu)
+        self.tree.bind("<Control-a>", lambda e: self.select_all() or "break")
+        self.tree.bind("<Delete>", lambda e: self.delete_item())
+        # 悬停预览缩略图；按下鼠标（可能开始拖拽）或离开表格时隐藏
+        self.tree.bind("<Motion>", self._on_tree_hover)
+        self.tree.bind("<Leave>", self._hide_preview)
+        self.tree.bind("<ButtonPress-1>", self._hide_preview, add="+")
+
+        # 派生数据随集合的变更事件增量更新
+        self.data.subscribe(lambda event: self.dup_index.apply(event))
+        self.data.subscribe(lambda event: self.stats.apply(event))
+        self.data.subscribe(self._apply_search_event)
+        self.data.subscribe(lambda event: self.sort_keys.apply(event))
+        self.data.subscribe(self._sync_tree)
+        self.data.subscribe(self._schedule_save)
+        self.data.subscribe(self._schedule_stats_refresh)
+        self.load_data()
+        if self.watcher is not None:
+            self.root.after(WATCH_INTERVAL, self._poll_external_changes)
 
     # --- 核心逻辑 ---
 
-    def _update_ids_and_refresh(self, silent=True):
-        """统一处理：重新编号、刷新视图、保存文件"""
-        for i, item in enumerate(self.data):
-            item["id"] = i + 1
-        self.fill_treeview()
-        self.save_data_gui(silent=silent)
+    def _schedule_save(self, event):
+        """记录被修改后在空闲时自动保存一次；期间显式调用过 save_data_gui 则不再重复"""
+        if isinstance(
+            event, (RecordInserted, RecordUpdated, RecordMoved, RecordRemoved)
+        ):
+            if not self._autosave_requested:
+                self._autosave_requested = True
+                self.root.after_idle(self._autosave)
+
+    def _autosave(self):
+        if self._autosave_requested:
+            self.save_data_gui(silent=True)
 
-    def get_suggestions(self):
-        authors = sorted(list(set(i["author"] for i in self.data if i.get("author"))))
-
-        # 处理多译者
-        translators_set = set()
-        for i in self.data:
-            if i.get("translator"):
-                # 支持多种分隔符：, 、、&和
-                drama_translators = re.split(r"[,、&和]\s*", i["translator"])
-                for translator in drama_translators:
-                    translator = translator.strip()
-                    if translator:
-                        translators_set.add(translator)
+    def toggle_stats(self):
+        """显示或隐藏统计面板；隐藏期间计数照常维护，只是不重绘"""
+        if self.stats_panel is not None and self.stats_panel.winfo_manager():
+            self.stats_panel.pack_forget()
+            return
+        if self.stats_panel is None:
+            self.stats_panel = StatsPanel(self.list_frame)
+        self.stats_panel.pack(
+            side=tk.RIGHT, fill=tk.Y, padx=(5, 0), before=self.tree_scrollbar
+        )
+        self._refresh_stats()
+
+    def _schedule_stats_refresh(self, event):
+        """每批修改结束后在空闲时重绘一次统计面板，连续的修改只重绘一次"""
+        if (
+            isinstance(event, BatchEnd)
+            and self._stats_job is None
+            and self.stats_panel is not None
+            and self.stats_panel.winfo_manager()
+        ):
+            self._stats_job = self.root.after_idle(self._refresh_stats)
+
+    def _refresh_stats(self):
+        self._stats_job = None
+        if self.stats_panel is not None and self.stats_panel.winfo_manager():
+            self.stats_panel.refresh(self.stats)
 
+    def get_suggestions(self):
+        if self.store is not None:
+            authors_set, translators_set, tags = self.store.suggestions()
+        else:
+            authors_set = set(self.stats.authors)
+            translators_set = set(self.stats.translators)
+            tags = set(self.stats.tags)
+        authors = sorted(list(authors_set))
         translators = sorted(list(translators_set))
-        tags = set()
-        for i in self.data:
-            tags.update(i.get("tags", []))
 
         # 按首字母拼音排序
         def get_pinyin_first_char(text):
@@ -328,35 +5640,294 @@ class DataManagerGUI:
         }
 
     def get_status_text(self, item):
-        if item.get("isDomestic", False):
-            return "国产"
-        elif item.get("isTranslated", False):
-            return "已汉化"
+        return status_text(item)
+
+    def _sync_tree(self, event):
+        """按集合的变更事件更新表格，未变化的行保持原有 iid"""
+        if isinstance(event, RecordRemoved):
+            # 同一轮的删除事件位置递减，攒到一起一次性删除
+            if self._removed_rows and event.position >= self._removed_rows[-1]:
+                self._flush_removed_rows()
+            self._removed_rows.append(event.position)
+            return
+        self._flush_removed_rows()
+        if isinstance(event, RecordInserted):
+            item, position = event.item, event.position
+            iid = self.tree.insert(
+                "",
+                position if position < len(self._rows) else tk.END,
+                values=(item["id"], *tree_row(item)),
+            )
+            self._rows.insert(position, iid)
+        elif isinstance(event, RecordUpdated):
+            self.tree.item(
+                self._rows[event.position],
+                values=(event.item["id"], *tree_row(event.item)),
+            )
+        elif isinstance(event, RecordsRenumbered):
+            for position, _, item in event.changes:
+                self.tree.set(self._rows[position], "id", item["id"])
+        elif isinstance(event, RecordMoved):
+            iid = self._rows.pop(event.source)
+            self._rows.insert(event.target, iid)
+            self.tree.move(iid, "", event.target)
+        elif isinstance(event, CollectionReset):
+            self.refresh_treeview(event.old)
+        elif isinstance(event, BatchEnd):
+            # 视图随修改重新计算（新插入的行可能不匹配筛选条件）
+            if self._view_active:
+                self.apply_view()
+
+    def _flush_removed_rows(self):
+        if not self._removed_rows:
+            return
+        removed = set(self._removed_rows)
+        self._removed_rows = []
+        self.tree.delete(*(self._rows[i] for i in removed))
+        self._rows = [iid for i, iid in enumerate(self._rows) if i not in removed]
+
+    def refresh_treeview(self, old_records):
+        """对比 old_records 与 self.data，只插入、删除或重绘有变化的行。
+
+        未变化的行保持原有 iid，因此选中项和滚动位置不受影响；ID 不同的只更新 ID 列。
+        """
+        rows = self._rows
+        new_rows = []
+        matcher = difflib.SequenceMatcher(
+            None,
+            [tree_row(item) for item in old_records],
+            [tree_row(item) for item in self.data],
+            autojunk=False,
+        )
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                for iid, old, item in zip(
+                    rows[i1:i2], old_records[i1:i2], self.data[j1:j2]
+                ):
+                    if old["id"] != item["id"]:
+                        self.tree.set(iid, "id", item["id"])
+                new_rows.extend(rows[i1:i2])
+                continue
+            reused = min(i2 - i1, j2 - j1)
+            for k in range(j2 - j1):
+                item = self.data[j1 + k]
+                values = (item["id"], *tree_row(item))
+                if k < reused:
+                    self.tree.item(rows[i1 + k], values=values)
+                    new_rows.append(rows[i1 + k])
+                else:
+                    new_rows.append(self.tree.insert("", j1 + k, values=values))
+            if i2 - i1 > reused:
+                self.tree.delete(*rows[i1 + reused : i2])
+        self._rows = new_rows
+
+    # --- 搜索与视图 ---
+    def _schedule_search(self):
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(SEARCH_DELAY, self.apply_view)
+
+    def _apply_search_event(self, event):
+        """查询在工作线程中读取搜索索引，期间的变更事件攒到查询结束后再应用"""
+        if self._searching:
+            self._deferred_search_events.append(event)
+        else:
+            self.search_index.apply(event)
+
+    def apply_view(self):
+        """按搜索词、筛选条件和排序列决定表格显示哪些行、以什么顺序显示；记录本身的顺序不变。
+
+        有搜索词时查询在工作线程中执行，只取最相关的 SEARCH_LIMIT 条，结果回到主线程后再排序显示。
+        """
+        self._search_job = None
+        self._view_generation += 1
+        text = self.search_var.get().strip()
+        status = STATUS_FILTERS.get(self.status_filter.get())
+        year = self.year_filter.get()
+        year = None if year == ALL_YEARS else year
+        if not text:
+            if status or year:
+                order = [
+                    i
+                    for i, item in enumerate(self.data)
+                    if view_filter(item, status, year)
+                ]
+            else:
+                order = range(len(self.data))
+            self._show_view(order, bool(status or year))
+        elif self._searching:
+            # 同一时刻只执行一个查询，结束后按最新的搜索词与筛选条件再查一次
+            self._search_pending = True
         else:
-            return "未汉化"
+            self._start_search(text, status, year)
+
+    def _start_search(self, text, status, year):
+        generation = self._view_generation
+        # 记录不可变，列表快照在工作线程中可以安全读取
+        records = list(self.data)
+        store, index = self.store, self.search_index
+
+        def job(task):
+            if store is not None:
+                # 启用 SQLite 存储时由数据库全文搜索，尚未保存的新记录在自动保存后才能搜到
+                rows = {item.get("_uid"): i for i, item in enumerate(records)}
+                hits = [rows[uid] for uid in store.search_uids(text) if uid in rows]
+            else:
+                positions = {id(item): i for i, item in enumerate(records)}
+                scored = [
+                    (-score, positions[id(item)]) for score, item in index.search(text)
+                ]
+                hits = [i for _, i in sorted(scored)]
+            if status or year:
+                hits = [i for i in hits if view_filter(records[i], status, year)]
+            return hits[:SEARCH_LIMIT], len(hits)
+
+        outcome = {}
+
+        def finished():
+            # 查询成功、失败或被取消都会走到这里，_searching 总会被清除
+            self._searching = False
+            changed = bool(self._deferred_search_events)
+            for event in self._deferred_search_events:
+                self.search_index.apply(event)
+            self._deferred_search_events = []
+            # 查询期间记录有变化时位置已失效，重新查询
+            if self._search_pending or changed:
+                self._search_pending = False
+                self.apply_view()
+            elif generation != self._view_generation:
+                return
+            elif "result" in outcome:
+                order, total = outcome["result"]
+                self._show_view(order, True, total)
+            elif "error" in outcome:
+                self.status_label.config(text=f"搜索失败: {outcome['error']}")
+
+        self._searching = True
+        self.tasks.run(
+            job,
+            lambda result: outcome.update(result=result),
+            on_error=lambda e: outcome.update(error=e),
+            on_finally=finished,
+            modal=False,
+            cancellable=False,
+        )
 
-    def fill_treeview(self):
-        self.tree.delete(*self.tree.get_children())
-        for item in self.data:
-            self.tree.insert(
-                "",
-                tk.END,
-                values=(
-                    item["id"],
-                    item["title"],
-                    item["author"],
-                    item["translator"],
-                    self.get_status_text(item),
-                    item["dateAdded"],
-                ),
+    def _show_view(self, order, filtered, total=None):
+        """显示 order 中的行（self.data 的位置）；total 为搜索命中的总数"""
+        if not (filtered or self._sort):
+            if self._view_active:
+                self._view_active = False
+                self.tree.set_children("", *self._rows)
+                self.status_label.config(text="")
+            return
+        if self._sort:
+            # 排序稳定：键相同时保持搜索相关度或保存顺序
+            column, descending = self._sort
+            key = self.sort_keys.key
+            order = sorted(
+                order, key=lambda i: key(column, self.data[i]), reverse=descending
+            )
+        self._view_active = True
+        self.tree.set_children("", *(self._rows[i] for i in order))
+        note = "视图中不能拖拽排序"
+        if total is not None and total > len(order):
+            note = f"共 {total} 个匹配，只列出最相关的 {len(order)} 个；" + note
+        self.status_label.config(
+            text=f"显示 {len(order)} / {len(self.data)} 个条目（{note}）"
+        )
+
+    def sort_by(self, column):
+        """点击列头：未排序 → 升序 → 降序 → 恢复保存顺序"""
+        if not self._sort or self._sort[0] != column:
+            self._sort = (column, False)
+        elif not self._sort[1]:
+            self._sort = (column, True)
+        else:
+            self._sort = None
+        self._update_headings()
+        self.apply_view()
+
+    def _update_headings(self):
+        for col_id, name in self.column_names.items():
+            arrow = ""
+            if self._sort and self._sort[0] == col_id:
+                arrow = " ▼" if self._sort[1] else " ▲"
+            self.tree.heading(col_id, text=name + arrow)
+
+    def year_choices(self):
+        years = {(item.get("dateAdded") or "")[:4] for item in self.data}
+        return [ALL_YEARS, *sorted((y for y in years if y), reverse=True)]
+
+    def clear_filters(self):
+        """清除搜索词和筛选条件，保留排序"""
+        self.search_var.set("")
+        self.status_filter.set(ALL_STATUSES)
+        self.year_filter.set(ALL_YEARS)
+        self.apply_view()
+
+    def reset_view(self):
+        """清除搜索、筛选和排序，恢复为可拖拽的保存顺序"""
+        self._sort = None
+        self._update_headings()
+        self.clear_filters()
+
+    # --- 缩略图预览 ---
+    def _on_tree_hover(self, event):
+        iid = self.tree.identify_row(event.y)
+        if iid == self._hover:
+            return
+        self._hide_preview()
+        self._hover = iid
+        if iid:
+            self._hover_job = self.root.after(
+                HOVER_DELAY,
+                partial(self._show_preview, iid, event.x_root, event.y_root),
             )
 
+    def _hide_preview(self, event=None):
+        self._hover = None
+        if self._hover_job is not None:
+            self.root.after_cancel(self._hover_job)
+            self._hover_job = None
+        if self.preview_tip is not None:
+            self.preview_tip.hide()
+
+    def _show_preview(self, iid, x, y):
+        self._hover_job = None
+        try:
+            item = self.data[self._rows.index(iid)]
+        except ValueError:
+            return
+        if not item.get("thumbnail"):
+            return
+        if self.preview_tip is None:
+            self.preview_tip = PreviewTip(self.root)
+        source = thumbnail_source(item["thumbnail"])
+        if source is None:
+            self.preview_tip.show(x, y, text="本地没有该缩略图")
+            return
+
+        def shown(image, error):
+            # 解码完成时鼠标可能已经移到别的行
+            if self._hover == iid:
+                self.preview_tip.show(x, y, image=image, text=error or "")
+
+        self.previews.request(source, shown)
+
     # --- 拖拽逻辑 ---
     def on_drag_start(self, event):
         item = self.tree.identify_row(event.y)
-        if item:
+        # 按住 Shift/Ctrl 时是在多选，不开始拖拽；选中状态交给 Treeview 的默认绑定处理
+        # 搜索、筛选或排序后的行序不是保存顺序，不能拖拽
+        if (
+            item
+            and not self._view_active
+            and not event.state & (SHIFT_MASK | CONTROL_MASK)
+        ):
             self._drag_data = {"item": item, "index": self.tree.index(item)}
-            self.tree.selection_set(item)
+        else:
+            self._drag_data = {"item": None, "index": None}
 
     def on_drag_motion(self, event):
         target = self.tree.identify_row(event.y)
@@ -367,328 +5938,993 @@ class DataManagerGUI:
 
     def on_drag_drop(self, event):
         target = self.tree.identify_row(event.y)
-        if target and target != self._drag_data["item"]:
+        if self._drag_data["item"] and target and target != self._drag_data["item"]:
             new_idx = self.tree.index(target)
             old_idx = self._drag_data["index"]
-            self.data.insert(new_idx, self.data.pop(old_idx))
-            self._update_ids_and_refresh(silent=True)
+            self.data.move(old_idx, new_idx)
         for row in self.tree.get_children():
             self.tree.item(row, tags=())
 
     # --- 数据读写 ---
     def load_data(self):
-        if not os.path.exists("data.js"):
-            return []
-        try:
-            with open("data.js", "r", encoding="utf-8") as f:
-                content = f.read()
-            match = re.search(r"const\s+dramas\s*=\s*\[(.*?)\];", content, re.DOTALL)
-            if not match:
-                return []
-            js_str = "[" + match.group(1).strip() + "]"
-            # 简单处理 JS 对象的 trailing comma
-            js_str = re.sub(r",\s*\]", "]", js_str)
-            js_str = re.sub(r",\s*\}", "}", js_str)
-            # 补齐引号使之符合 JSON 格式
-            json_str = re.sub(r"(^|\s+)(\w+):", r'\1"\2":', js_str, flags=re.MULTILINE)
-            return json.loads(json_str)
-        except Exception as e:
-            print(f"数据加载提示: {e}")
-            return []
+        """在后台读取并校验数据，完成后填充表格"""
 
-    def save_data_gui(self, silent=False):
-        try:
-            # 先读取现有的data.js文件，保留authorLinks部分
-            author_links_content = ""
-            existing_links = {}
+        def job(task):
+            # 版本戳先于内容读取：两者之间文件若被改动，保存时会按过期处理
+            version = file_version()
             try:
-                with open("data.js", "r", encoding="utf-8") as f:
-                    existing_content = f.read()
-                    # 查找authorLinks部分
-                    match = re.search(
-                        r"const authorLinks = ({.*?});", existing_content, re.DOTALL
-                    )
-                    if match:
-                        links_str = match.group(1)
-                        print(f"原始authorLinks字符串: {repr(links_str[:200])}")
-
-                        # 最简单的方法：按行处理
-                        lines = links_str.split("\n")
-                        existing_links = {}
-
-                        for line in lines:
-                            line = line.strip()
-                            # 跳过空行和注释行
-                            if (
-                                not line
-                                or line.startswith("//")
-                                or not line.startswith('"')
-                            ):
-                                continue
-
-                            # 处理键值对
-                            if ":" in line and line.endswith(","):
-                                line = line.rstrip(",")  # 移除末尾逗号
-
-                            if ":" in line:
-                                try:
-                                    # 直接用JSON解析这一行
-                                    line_json = "{" + line + "}"
-                                    parsed = json.loads(line_json)
-                                    for key, value in parsed.items():
-                                        existing_links[key] = value
-                                except:
-                                    # 手动解析
-                                    parts = line.split(":", 1)
-                                    if len(parts) == 2:
-                                        key = parts[0].strip().strip('"')
-                                        value = parts[1].strip().strip('"')
-                                        if key:
-                                            existing_links[key] = value
-
-                        print(f"解析authorLinks成功，共有 {len(existing_links)} 个链接")
-                        author_links_content = f"const authorLinks = {match.group(1)};"
-            except Exception as e:
-                print(f"读取现有authorLinks时出错: {e}")
-
-            # 自动检测新的作者和译者
-            detected_authors = set()
-            detected_translators = set()
-
-            for item in self.data:
-                if item.get("author"):
-                    detected_authors.add(item["author"])
-                if item.get("translator"):
-                    # 处理多译者：使用正则表达式分割
-                    drama_translators = re.split(r"[,、&和]\s*", item["translator"])
-                    for translator in drama_translators:
-                        translator = translator.strip()
-                        if translator:
-                            detected_translators.add(translator)
-
-            # 更新authorLinks，添加新检测到的作者/译者
-            updated_links = existing_links.copy()
-            new_authors = 0
-            new_translators = 0
-
-            for author in detected_authors:
-                if author not in updated_links:
-                    updated_links[author] = ""  # 空字符串表示需要手动添加链接
-                    new_authors += 1
-                    print(f"检测到新作者: {author}")
-
-            for translator in detected_translators:
-                # 过滤掉包含分隔符的条目（这些是多译者组合）
-                if (
-                    not re.search(r"[,、&和]", translator)
-                    and translator not in updated_links
-                ):
-                    updated_links[translator] = ""  # 空字符串表示需要手动添加链接
-                    new_translators += 1
-                    print(f"检测到新译者: {translator}")
-
-            # 生成新的authorLinks内容
-            if updated_links:
-                author_links_content = (
-                    "const authorLinks = "
-                    + json.dumps(updated_links, ensure_ascii=False, indent=4)
-                    + ";"
+                data = self.store.load_records() if self.store else self.loader.load()
+            except DataFileError as e:
+                return version, e, None
+            errors = RECORD_VALIDATOR.validate(data)
+            # 派生数据在后台预先建好，载入集合时订阅者发现记录都已计入，不再重复计算
+            derived = (
+                DuplicateIndex(data),
+                CollectionStats(data),
+                SearchIndex(data),
+                SortKeys(data),
+            )
+            return version, None, (data, errors, derived, snapshot_records(data))
+
+        def done(result):
+            self.data_version, error, loaded = result
+            self.data_unreadable = error is not None
+            if error is not None:
+                messagebox.showerror(
+                    "错误", f"{error}\n\n请手动修复 data.js；修复前工具不会覆盖该文件。"
+                )
+                return
+            data, errors, derived, self.base_records = loaded
+            self.dup_index, self.stats, self.search_index, self.sort_keys = derived
+            self.data.reset(data)
+            if errors:
+                messagebox.showwarning(
+                    "数据校验",
+                    f"data.js 中有 {len(errors)} 处数据不合法，修正前无法保存:\n"
+                    + format_validation_errors(errors),
                 )
 
-            # 生成dramas数组内容
-            content = "const dramas = ["
-            for i, item in enumerate(self.data):
-                # 使用 json.dumps 确保所有字段中的特殊字符（引号、换行）被正确转义
-                content += f"""
-    {{
-        id: {item["id"]},
-        title: {json.dumps(item["title"], ensure_ascii=False)},
-        author: {json.dumps(item["author"], ensure_ascii=False)},
-        translator: {json.dumps(item["translator"], ensure_ascii=False)},
-        tags: {json.dumps(item["tags"], ensure_ascii=False)},
-        isTranslated: {str(item["isTranslated"]).lower()},
-        isDomestic: {str(item.get("isDomestic", False)).lower()},
-        originalUrl: {json.dumps(item["originalUrl"], ensure_ascii=False)},
-        translatedUrl: {json.dumps(item["translatedUrl"], ensure_ascii=False)},
-        description: {json.dumps(item["description"], ensure_ascii=False)},
-        thumbnail: {json.dumps(item["thumbnail"], ensure_ascii=False)},
-        dateAdded: {json.dumps(item["dateAdded"], ensure_ascii=False)}
-    }}{"," if i < len(self.data) - 1 else ""}"""
-            content += "\n];\n\n"
+        self.tasks.run(job, done, title="正在加载数据", cancellable=False)
+
+    def load_author_links(self):
+        if self.store is not None:
+            return self.store.load_author_links()
+        return read_author_links()
+
+    def _write_records(
+        self, records, allow_empty, author_links, expected_version, existing_count
+    ):
+        """在工作线程中执行：写入 data.js 或数据库，返回 (新作者数, 新译者数, 版本)"""
+        if self.store is not None:
+            # 数据库是唯一的数据源，data.js 每次都由数据库重新导出
+            return self.store.save(
+                records, allow_empty=allow_empty, author_links=author_links
+            )
+        return save_collection(
+            records,
+            allow_empty=allow_empty,
+            expected_version=expected_version,
+            author_links=author_links,
+            existing_count=existing_count,
+        )
 
-            # 添加authorLinks部分
-            if author_links_content:
-                content += author_links_content + "\n"
+    def rebase_onto_disk(self):
+        """把本地修改按记录三路合并到磁盘上的最新版本之上，返回是否继续保存"""
+        if not messagebox.askyesno(
+            "数据已被修改",
+            "data.js 在本次加载之后已被其他程序修改。\n\n"
+            "选择“是”将按条目合并对方的修改后再保存；"
+            "选择“否”取消保存（本地修改仍保留）。",
+        ):
+            return False
+        version = file_version()
+        theirs = self.loader.load()
+        merged = self.merge_local_changes(
+            theirs,
+            "合并冲突",
+            "{count} 处修改与对方冲突，将保留本地的内容:\n{conflicts}\n\n是否继续保存？",
+        )
+        if merged is None:
+            return False
+        self.data.reset(merged)
+        self.base_records = snapshot_records(theirs)
+        self.data_version = version
+        return True
+
+    def merge_local_changes(self, theirs, title, prompt):
+        """把本地修改按记录三路合并到 theirs 之上，返回合并结果。
+
+        有冲突时以 prompt（可用 {count} 与 {conflicts}）列出冲突并询问，用户拒绝时返回 None。
+        """
+        merged, conflicts = merge_collections(self.base_records, self.data, theirs)
+        if conflicts:
+            lines = [
+                f"- {c['title']}"
+                + (f" [{c['field']}]" if c["field"] else "")
+                + f"：{c['reason']}"
+                for c in conflicts[:10]
+            ]
+            if len(conflicts) > 10:
+                lines.append(f"- ……另有 {len(conflicts) - 10} 处")
+            if not messagebox.askyesno(
+                title, prompt.format(count=len(conflicts), conflicts="\n".join(lines))
+            ):
+                return None
+        return annotate_links(merged)
+
+    def has_local_changes(self):
+        """内存中的记录是否有尚未写入 data.js 的修改"""
+        return [public_record(item) for item in self.data] != self.base_records
+
+    def _dialog_open(self):
+        """是否有对话框或消息框打开（链接报告与预览浮窗除外）；对话框可能持有行号，期间不重新加载"""
+        reports = {
+            str(w)
+            for w in self.root.winfo_children()
+            if isinstance(w, (LinkReportDialog, PreviewTip))
+        }
+        call = self.root.tk.call
+        for name in self.root.tk.splitlist(call("winfo", "children", ".")):
+            name = str(name)
+            if (
+                name not in reports
+                and str(call("winfo", "toplevel", name)) == name
+                and call("winfo", "ismapped", name)
+            ):
+                return True
+        return False
+
+    def _poll_external_changes(self):
+        if self.watcher.poll():
+            self._external_change = True
+        # 其他程序仍在写入（持有锁）、后台任务进行中或有对话框打开时推迟到下一次检查
+        if (
+            self._external_change
+            and not os.path.exists("data.js.lock")
+            and not self.tasks.busy
+            and not self._dialog_open()
+        ):
+            self._external_change = False
+            self.reload_external_changes()
+        self.root.after(WATCH_INTERVAL, self._poll_external_changes)
+
+    def reload_external_changes(self):
+        """载入其他程序对 data.js 的修改；本地有未保存的修改时按记录三路合并"""
+        version = file_version()
+        if version is None or version == self.data_version:
+            # 文件被删除，或是本程序自己的保存
+            return
+        try:
+            theirs = self.loader.load()
+        except DataFileError as e:
+            self.status_label.config(text=f"data.js 已被修改但无法解析: {e}")
+            return
+        new_data = theirs
+        if self.has_local_changes():
+            merged = self.merge_local_changes(
+                theirs,
+                "外部修改冲突",
+                "data.js 已被其他程序修改，{count} 处与尚未保存的本地修改冲突:\n"
+                "{conflicts}\n\n选择“是”合并并保留本地的内容；选择“否”放弃本地修改。",
+            )
+            if merged is not None:
+                new_data = merged
+        self.base_records = snapshot_records(theirs)
+        self.data_unreadable = False
+        records, added, removed = reuse_unchanged(list(self.data), new_data)
+        self.data_version = version
+        self.data.reset(records)
+        self.status_label.config(
+            text=f"{time.strftime('%H:%M:%S')} 已载入外部修改："
+            f"{len(added)} 条新增或变化，{len(removed)} 条移除或被替换"
+        )
 
-            # 写入文件
-            with open("data.js", "w", encoding="utf-8") as f:
-                f.write(content)
+    def save_data_gui(
+        self, silent=False, author_links=None, allow_empty=False, on_saved=None
+    ):
+        """在后台保存；保存进行中再次调用时合并为其后的一次保存。
+
+        on_saved 在保存成功后于主线程中调用。
+        """
+        self._autosave_requested = False
+        if self._saving:
+            pending = self._pending_save or {
+                "silent": True,
+                "author_links": None,
+                "callbacks": [],
+            }
+            pending["silent"] = pending["silent"] and silent
+            if author_links is not None:
+                pending["author_links"] = author_links
+            if on_saved:
+                pending["callbacks"].append(on_saved)
+            self._pending_save = pending
+            return
+        # 保存期间主窗口不可操作，记录列表不会被修改
+        records = list(self.data)
+        version = self.data_version
+        # data.js 在 version 时的条目数；加载失败时为 None，保存会被拒绝
+        existing = None if self.data_unreadable else len(self.base_records)
+
+        def job(task):
+            result = self._write_records(
+                records, allow_empty, author_links, version, existing
+            )
+            return result, snapshot_records(records)
 
-            # 显示保存结果
+        def done(value):
+            (new_authors, new_translators, self.data_version), self.base_records = value
+            self._finish_save()
+            if on_saved:
+                on_saved()
             if not silent:
                 message = "数据已成功同步到 data.js"
                 if new_authors > 0 or new_translators > 0:
                     message += f"\n\n自动检测到:\n- {new_authors} 个新作者\n- {new_translators} 个新译者\n\n已添加到authorLinks中，链接为空，请手动补充"
                 messagebox.showinfo("成功", message)
-        except Exception as e:
-            messagebox.showerror("错误", f"保存失败: {e}")
+
+        def failed(e):
+            self._saving = None
+            retry = {}
+            if isinstance(e, StaleDataError) and self.store is None:
+                # 用户取消变基时放弃本次保存，本地修改仍保留
+                if not self.rebase_onto_disk():
+                    self._finish_save()
+                    return
+            elif (
+                isinstance(e, ValidationError)
+                and not self.data
+                and not allow_empty
+                and messagebox.askyesno("确认", f"{e}\n\n确定要清空 data.js 吗？")
+            ):
+                retry["allow_empty"] = True
+            else:
+                messagebox.showerror("错误", f"保存失败: {e}")
+                self._finish_save()
+                return
+            self.save_data_gui(silent, author_links, on_saved=on_saved, **retry)
+
+        def settled():
+            # 任务被取消时 done 与 failed 都不会调用，仍由本次保存占用时在这里结束
+            if self._saving is task:
+                self._finish_save()
+
+        task = self.tasks.run(
+            job,
+            done,
+            title="正在保存",
+            on_error=failed,
+            cancellable=False,
+            on_finally=settled,
+        )
+        self._saving = task
+
+    def _finish_save(self):
+        """保存结束：执行保存期间被合并的那次保存"""
+        self._saving = None
+        if self.store is not None and self.search_var.get().strip():
+            # 数据库内容已更新，重新执行搜索
+            self._schedule_search()
+        pending, self._pending_save = self._pending_save, None
+        if pending:
+            callbacks = pending["callbacks"]
+            self.save_data_gui(
+                pending["silent"],
+                pending["author_links"],
+                on_saved=lambda: [callback() for callback in callbacks],
+            )
+
+    def export_all(self):
+        """单次遍历导出 data.js、JSON、CSV、NDJSON、Atom 订阅和站点地图"""
+        directory = filedialog.askdirectory(
+            title="选择导出目录", initialdir=os.getcwd(), mustexist=False
+        )
+        if not directory:
+            return
+        # 导出到当前目录会覆盖工作中的 data.js，与普通保存一样加锁并检查版本
+        overwrite = os.path.abspath(
+            os.path.join(directory, "data.js")
+        ) == os.path.abspath("data.js")
+        records = list(self.data)
+        author_links = self.load_author_links()
+        version = self.data_version
+        existing = None if self.data_unreadable else len(self.base_records)
+
+        def job(task):
+            # 与保存一致，把新出现的作者/译者补进 authorLinks，否则内容未变也会升级版本
+            links = detect_new_people(records, author_links)[0]
+            if not overwrite:
+                pipeline = ExportPipeline(export_sinks(directory))
+                return pipeline.run(records, links, check=task.check), None
+            with DataFileLock():
+                check_version("data.js", version)
+                check_collection(records, existing)
+                pipeline = ExportPipeline(export_sinks(directory, change_feed=True))
+                context = pipeline.run(records, links, check=task.check)
+                return context, file_version()
+
+        def done(result):
+            context, new_version = result
+            if overwrite:
+                self.data_version = new_version
+                self.base_records = snapshot_records(records)
+            version_note = f"（版本 {context['version']}）" if overwrite else ""
+            messagebox.showinfo(
+                "成功", f"已导出 {len(records)} 个条目{version_note}到:\n{directory}"
+            )
+
+        def failed(e):
+            if isinstance(e, StaleDataError):
+                messagebox.showerror("错误", f"导出失败: {e}，请先保存以合并对方的修改")
+            else:
+                messagebox.showerror("错误", f"导出失败: {e}")
+
+        self.tasks.run(job, done, title="正在导出", on_error=failed)
+
+    def prerender_static_pages(self):
+        """生成每部作品的静态详情页，并把首屏卡片写入 index.html"""
+        records = list(self.data)
+        author_links = self.load_author_links()
+
+        def done(result):
+            rendered, skipped, index_updated = result
+            message = f"已重新生成 {rendered} 个详情页，{skipped} 个未变化已跳过"
+            if index_updated:
+                message += "\n\n首页卡片已更新"
+            messagebox.showinfo("成功", message)
+
+        self.tasks.run(
+            lambda task: prerender_pages(records, author_links, check=task.check),
+            done,
+            title="正在生成静态页面",
+            on_error=lambda e: messagebox.showerror("错误", f"生成静态页面失败: {e}"),
+        )
+
+    def build_thumbnails(self):
+        """从本地文件夹生成缩略图变体，并为有图片的条目填写缩略图URL"""
+        source_dir = filedialog.askdirectory(
+            title="选择源图片文件夹（文件名为条目ID）", initialdir=os.getcwd()
+        )
+        if not source_dir:
+            return
+
+        def done(result):
+            message = (
+                f"已生成 {len(result['processed'])} 张缩略图，"
+                f"{len(result['skipped'])} 张未变化已跳过"
+            )
+            if result["failed"]:
+                failed = "\n".join(
+                    f"ID {record_id}: {error}"
+                    for record_id, error in sorted(result["failed"].items())[:10]
+                )
+                message += f"\n\n{len(result['failed'])} 张处理失败:\n{failed}"
+            messagebox.showinfo("缩略图处理完成", message)
+
+            if result["available"]:
+                self.generate_thumbnail_urls(
+                    only_ids=result["available"], extension=THUMBNAIL_FORMAT
+                )
+
+        self.tasks.run(
+            lambda task: process_thumbnails(source_dir, check=task.check),
+            done,
+            title="正在处理缩略图",
+            on_error=lambda e: messagebox.showerror("错误", f"处理缩略图失败: {e}"),
+        )
+
+    def build_placeholders(self):
+        """为本地缩略图计算尺寸、主色调与模糊占位图"""
+        image_dir = filedialog.askdirectory(
+            title="选择缩略图文件夹（文件名为条目ID）",
+            initialdir=os.path.abspath(THUMBNAIL_OUTPUT_DIR),
+        )
+        if not image_dir:
+            return
+        # 任务期间主窗口不可操作，结果中的下标即集合中的位置
+        records = list(self.data)
+
+        def done(result):
+            updates, computed, failed = result
+            with self.data.batch():
+                for i, meta in updates.items():
+                    item = dict(self.data[i], thumbnailMeta=meta)
+                    self.data.update(i, item, ["thumbnailMeta"])
+            message = (
+                f"新计算了 {computed} 张图片，更新了 {len(updates)} 个条目的占位信息"
+            )
+            if failed:
+                errors = "\n".join(
+                    f"ID {record_id}: {error}"
+                    for record_id, error in sorted(failed.items())[:10]
+                )
+                message += f"\n\n{len(failed)} 张处理失败:\n{errors}"
+            if updates:
+                self.save_data_gui(
+                    silent=True, on_saved=lambda: messagebox.showinfo("成功", message)
+                )
+            else:
+                messagebox.showinfo("成功", message)
+
+        self.tasks.run(
+            lambda task: compute_thumbnail_meta(records, image_dir, check=task.check),
+            done,
+            title="正在生成占位图",
+            on_error=lambda e: messagebox.showerror("错误", f"生成占位图失败: {e}"),
+        )
+
+    def sync_thumbnails(self):
+        """把本地缩略图目录增量同步到目标目录（CDN 的本地镜像）"""
+        local_dir = filedialog.askdirectory(
+            title="选择本地缩略图文件夹",
+            initialdir=os.path.abspath(THUMBNAIL_OUTPUT_DIR),
+        )
+        if not local_dir:
+            return
+        target_dir = filedialog.askdirectory(title="选择同步目标文件夹")
+        if not target_dir:
+            return
+        target = LocalDirectoryTarget(target_dir)
+
+        def planned(plan):
+            _, uploads, deletes = plan
+            if not uploads and not deletes:
+                messagebox.showinfo("提示", "目标目录已是最新，无需同步")
+                return
+            if not messagebox.askyesno(
+                "确认同步",
+                f"将上传 {len(uploads)} 个文件，删除 {len(deletes)} 个文件，是否继续？",
+            ):
+                return
+            self.tasks.run(
+                lambda task: sync_thumbnails(
+                    local_dir, target, plan=plan, check=task.check
+                ),
+                synced,
+                title="正在同步缩略图",
+                on_error=lambda e: messagebox.showerror("错误", f"同步失败: {e}"),
+            )
+
+        def synced(result):
+            message = (
+                f"已上传 {len(result['uploaded'])} 个，删除 {len(result['deleted'])} 个"
+            )
+            if result["failed"]:
+                message += f"\n\n{len(result['failed'])} 个失败，下次同步时会重试"
+            messagebox.showinfo("同步完成", message)
+
+        self.tasks.run(
+            lambda task: plan_thumbnail_sync(local_dir, target, task.check),
+            planned,
+            title="正在比较缩略图",
+            on_error=lambda e: messagebox.showerror("错误", f"读取缩略图失败: {e}"),
+        )
+
+    def check_links(self):
+        """在后台线程中检查所有链接，进度与结果显示在报告窗口中"""
+        checker = LinkChecker()
+        # 关闭报告窗口即取消任务；任务的取消回调再停止 LinkChecker 中的请求
+        dialog = LinkReportDialog(self.root, on_close=lambda: task.cancel())
+        records = [dict(item) for item in self.data]
+        author_links = self.load_author_links()
+
+        def progress(done, total, text=None):
+            if dialog.winfo_exists():
+                dialog.set_progress(done, total)
+
+        def done(report):
+            if dialog.winfo_exists():
+                dialog.show_report(report)
+
+        def failed(e):
+            if dialog.winfo_exists():
+                messagebox.showerror("错误", f"检查链接失败: {e}")
+
+        # 报告窗口本身显示进度；检查期间仍可继续编辑
+        task = self.tasks.run(
+            lambda task: check_links(records, author_links, checker, task.progress),
+            done,
+            on_error=failed,
+            on_progress=progress,
+            on_cancel=checker.cancel,
+            modal=False,
+        )
 
     # --- 弹窗触发 ---
     def add_item(self):
-        d = AddEditDialog(self.root, "新增条目", {}, self.get_suggestions())
+        d = AddEditDialog(
+            self.root,
+            "新增条目",
+            {},
+            self.get_suggestions(),
+            find_duplicates=self.dup_index.find,
+            previews=self.previews,
+        )
         if d.result:
+            record_links(d.result)
             self.data.append(d.result)
-            self._update_ids_and_refresh(silent=True)
 
     def edit_item(self):
         sel = self.tree.selection()
         if not sel:
             messagebox.showwarning("提示", "请先选择一个条目")
             return
-        idx = self.tree.index(sel[0])
-        d = AddEditDialog(self.root, "修改条目", self.data[idx], self.get_suggestions())
+        if len(sel) > 1:
+            messagebox.showwarning(
+                "提示",
+                f"已选择 {len(sel)} 个条目，请使用“选中项批量操作”或只选择一个条目",
+            )
+            return
+        idx = self.selected_positions()[0]
+        d = AddEditDialog(
+            self.root,
+            "修改条目",
+            self.data[idx],
+            self.get_suggestions(),
+            find_duplicates=lambda item: self.dup_index.find(
+                item, exclude=self.data[idx]
+            ),
+            previews=self.previews,
+        )
         if d.result:
             d.result["id"] = self.data[idx]["id"]  # 保持原 ID 不变
-            self.data[idx] = d.result
-            self.fill_treeview()
-            self.save_data_gui(silent=True)
+            # 缩略图未改动时保留已计算的占位信息
+            old_meta = self.data[idx].get("thumbnailMeta")
+            if old_meta and d.result["thumbnail"] == self.data[idx].get("thumbnail"):
+                d.result["thumbnailMeta"] = old_meta
+            record_links(d.result)
+            self.data.update(idx, d.result)
 
     def delete_item(self):
-        sel = self.tree.selection()
-        if not sel:
+        positions = self.selected_positions()
+        if not positions:
+            return
+        if len(positions) == 1:
+            question = "确定要永久删除此条目吗？"
+        else:
+            question = f"确定要永久删除选中的 {len(positions)} 个条目吗？"
+        if messagebox.askyesno("确认", question):
+            self.data.remove(positions)
+
+    # --- 多选批量操作 ---
+    def _build_batch_menu(self, parent):
+        menu = tk.Menu(parent, tearoff=0)
+        for key in STATUS_KEYS:
+            menu.add_command(
+                label=f"设为{STATUS_LABELS[key]}",
+                command=partial(self.batch_set_status, key),
+            )
+        menu.add_separator()
+        menu.add_command(label="添加标签...", command=self.batch_add_tag)
+        menu.add_command(label="移除标签...", command=self.batch_remove_tag)
+        menu.add_command(label="设置翻译者...", command=self.batch_set_translator)
+        menu.add_separator()
+        menu.add_command(label="清除缩略图", command=self.batch_clear_thumbnails)
+        menu.add_command(
+            label="重新生成缩略图URL...", command=self.batch_thumbnail_urls
+        )
+        menu.add_separator()
+        menu.add_command(label="删除", command=self.delete_item)
+        menu.add_separator()
+        menu.add_command(label="按条件选择...", command=self.select_by_query)
+        menu.add_command(label="全选", command=self.select_all)
+        return menu
+
+    def show_batch_menu(self, event):
+        row = self.tree.identify_row(event.y)
+        if row and row not in self.tree.selection():
+            self.tree.selection_set(row)
+        self.batch_menu.tk_popup(event.x_root, event.y_root)
+
+    def selected_positions(self):
+        """选中行在 self.data 中的位置（升序）；一次建立 iid 映射，避免逐行查找"""
+        selection = self.tree.selection()
+        if not selection:
+            return []
+        if len(selection) == 1:
+            return [self._rows.index(selection[0])]
+        position = {iid: i for i, iid in enumerate(self._rows)}
+        return sorted(position[iid] for iid in selection)
+
+    def select_all(self):
+        self.tree.selection_set(self.tree.get_children())
+
+    def select_by_query(self):
+        """用与批量修改相同的查询语法选中条目"""
+        dialog = BatchValueDialog(
+            self.root,
+            "按条件选择",
+            '查询（如 tag="魔理沙" status:未汉化 date:2025）:',
+        )
+        if dialog.result is None:
+            return
+        try:
+            positions = CollectionIndex(self.data).query(**parse_query(dialog.result))
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        # 选中的条目可能被搜索或筛选隐藏，先清除
+        if self._view_active:
+            self.clear_filters()
+        rows = self._rows
+        self.tree.selection_set([rows[i] for i in positions])
+        if positions:
+            self.tree.see(rows[positions[0]])
+        self.status_label.config(text=f"已选中 {len(positions)} 个条目")
+
+    def apply_to_selection(self, change):
+        """对每个选中条目的副本执行 change(item)，整批只更新一次表格、保存一次"""
+        positions = self.selected_positions()
+        if not positions:
+            messagebox.showwarning("提示", "请先选择条目")
+            return 0
+        changed = 0
+        with self.data.batch():
+            for i in positions:
+                old = self.data[i]
+                item = dict(old, tags=list(old["tags"]))
+                change(item)
+                if same_content(item, old):
+                    continue
+                record_links(item)
+                self.data.update(i, item)
+                changed += 1
+        self.status_label.config(
+            text=f"选中 {len(positions)} 个条目，修改了 {changed} 个"
+        )
+        return changed
+
+    def batch_set_status(self, key):
+        def change(item):
+            item["isTranslated"] = key == "translated"
+            item["isDomestic"] = key == "domestic"
+
+        self.apply_to_selection(change)
+
+    def batch_add_tag(self):
+        dialog = BatchValueDialog(
+            self.root, "添加标签", "要添加的标签:", self.get_suggestions()["tags"]
+        )
+        tag = (dialog.result or "").strip()
+        if tag:
+
+            def change(item):
+                if tag not in item["tags"]:
+                    item["tags"].append(tag)
+
+            self.apply_to_selection(change)
+
+    def batch_remove_tag(self):
+        tags = {tag for i in self.selected_positions() for tag in self.data[i]["tags"]}
+        if not tags:
+            messagebox.showinfo("提示", "选中的条目没有标签")
+            return
+        dialog = BatchValueDialog(
+            self.root, "移除标签", "要移除的标签:", sorted(tags), readonly=True
+        )
+        tag = dialog.result
+        if tag:
+            self.apply_to_selection(
+                lambda item: item.update(tags=[t for t in item["tags"] if t != tag])
+            )
+
+    def batch_set_translator(self):
+        dialog = BatchValueDialog(
+            self.root,
+            "设置翻译者",
+            "翻译者（多人用“、”分隔，留空表示清除）:",
+            self.get_suggestions()["translators"],
+        )
+        if dialog.result is not None:
+            translator = dialog.result.strip()
+            self.apply_to_selection(lambda item: item.update(translator=translator))
+
+    def batch_clear_thumbnails(self):
+        positions = self.selected_positions()
+        if positions and messagebox.askyesno(
+            "确认清除", f"确定要清除选中的 {len(positions)} 个条目的缩略图吗？"
+        ):
+
+            def change(item):
+                item["thumbnail"] = ""
+                item.pop("thumbnailMeta", None)
+
+            self.apply_to_selection(change)
+
+    def batch_thumbnail_urls(self):
+        positions = self.selected_positions()
+        if not positions:
+            messagebox.showwarning("提示", "请先选择条目")
+            return
+        self.generate_thumbnail_urls(only_ids={self.data[i]["id"] for i in positions})
+
+    def bulk_edit(self):
+        """按查询批量重命名标签/作者译者或替换字段内容，整批只保存一次"""
+        author_links = self.load_author_links()
+        dialog = BulkEditDialog(self.root, self.data, author_links)
+        if not dialog.result:
             return
-        if messagebox.askyesno("确认", "确定要永久删除此条目吗？"):
-            self.data.pop(self.tree.index(sel[0]))
-            self._update_ids_and_refresh(silent=True)
+        edit = dialog.result
+        with self.data.batch():
+            for i, item, fields in edit.changes:
+                record_links(item)
+                self.data.update(i, item, fields)
+        migrated = edit.author_links is not author_links
+        self.save_data_gui(
+            silent=True, author_links=edit.author_links if migrated else None
+        )
+        messagebox.showinfo("成功", f"已修改 {len(edit.changes)} 个条目")
 
     def manage_author_links(self):
         """管理作者和译者链接"""
-        dialog = AuthorLinksDialog(self.root, self.data)
+        dialog = AuthorLinksDialog(
+            self.root, self.data, self.data_version, store=self.store
+        )
         self.root.wait_window(dialog)
         if dialog.result:
+            version, current = dialog.result
+            if current:
+                # 对话框只改了 authorLinks，记录仍与本地快照一致
+                self.data_version = version
             self.save_data_gui()
 
     def add_from_json(self):
         d = JsonImportDialog(self.root)
         if d.result:
-            # 清理JSON数据，去除首尾空白和可能的反引号
-            import json
+            # 支持单个对象、对象数组或多个连续对象
+            items, errors = import_records(io.StringIO(d.result.strip()), "json")
+            if errors:
+                messagebox.showerror(
+                    "错误",
+                    "JSON解析失败:\n"
+                    + "\n".join(
+                        f"第 {row} 项: {msg}" if row else msg for row, msg in errors
+                    ),
+                )
+                return
+            items = self._filter_duplicates(items)
+            if items:
+                self.data.extend(items)
+                messagebox.showinfo("成功", f"从JSON导入 {len(items)} 个条目成功")
+
+    def _filter_duplicates(self, items):
+        """检查一批待导入条目（含批内互相重复），询问是否跳过疑似重复项。
+
+        返回要导入的条目，取消时返回空列表。批内比较时临时加入重复索引，
+        返回前移除，之后由加入集合时的事件正式加入。
+        """
+        flagged = []
+        for item in items:
+            matches = self.dup_index.find(item)
+            if matches:
+                flagged.append((item, matches))
+            self.dup_index.add(item)
+        for item in items:
+            self.dup_index.remove(item)
+        if not flagged:
+            return items
+        details = "\n".join(
+            f"{item['title']}:\n{describe_duplicates(matches, limit=2)}"
+            for item, matches in flagged[:8]
+        )
+        if len(flagged) > 8:
+            details += f"\n……另有 {len(flagged) - 8} 个"
+        answer = messagebox.askyesnocancel(
+            "可能重复",
+            f"{len(flagged)} 个条目可能与已有条目重复:\n\n{details}\n\n"
+            "是否跳过这些条目？（是=跳过，否=全部导入）",
+        )
+        if answer is None:
+            skip = items
+        elif answer:
+            skip = [item for item, _ in flagged]
+        else:
+            skip = []
+        skip_ids = {id(item) for item in skip}
+        return [item for item in items if id(item) not in skip_ids]
+
+    def import_from_file(self):
+        """从 JSON 数组、NDJSON 或 CSV 文件批量导入，整批只保存一次"""
+        path = filedialog.askopenfilename(
+            title="选择导入文件",
+            filetypes=[
+                ("支持的格式", "*.json *.ndjson *.jsonl *.csv"),
+                ("JSON", "*.json"),
+                ("NDJSON", "*.ndjson *.jsonl"),
+                ("CSV", "*.csv"),
+            ],
+        )
+        if not path:
+            return
 
-            try:
-                # 去除首尾空白
-                json_str = d.result.strip()
-                # 去除URL中的反引号
-                json_str = json_str.replace("`https://", "https://").replace("`", "")
-                # 解析JSON
-                item = json.loads(json_str)
-                # 处理标签格式
-                if item.get("tags"):
-                    # 如果标签是单个字符串，按逗号分割
-                    if (
-                        isinstance(item["tags"], list)
-                        and len(item["tags"]) > 0
-                        and isinstance(item["tags"][0], str)
-                    ):
-                        # 处理每个标签字符串，按逗号分割
-                        all_tags = []
-                        for tag_str in item["tags"]:
-                            all_tags.extend(
-                                [t.strip() for t in tag_str.split("，") if t.strip()]
-                            )
-                        item["tags"] = all_tags
-                    elif isinstance(item["tags"], str):
-                        item["tags"] = [
-                            t.strip() for t in item["tags"].split("，") if t.strip()
-                        ]
-                # 添加到数据中
-                self.data.append(item)
-                self._update_ids_and_refresh(silent=True)
-                messagebox.showinfo("成功", "从JSON导入条目成功")
-            except Exception as e:
-                messagebox.showerror("错误", f"JSON解析失败: {e}")
+        def done(result):
+            items, errors = result
+            message = f"可导入 {len(items)} 个条目"
+            if errors:
+                message += f"\n{len(errors)} 行有错误，将被跳过:\n" + "\n".join(
+                    f"- 第 {row} 行: {msg}" if row else f"- {msg}"
+                    for row, msg in errors[:15]
+                )
+                if len(errors) > 15:
+                    message += f"\n……另有 {len(errors) - 15} 行"
+            if not items:
+                messagebox.showwarning("提示", message)
+                return
+            if not messagebox.askyesno("确认导入", message + "\n\n是否继续？"):
+                return
+            items = self._filter_duplicates(items)
+            if items:
+                self.data.extend(items)
+                messagebox.showinfo("成功", f"已导入 {len(items)} 个条目")
+
+        self.tasks.run(
+            lambda task: import_file(path, check=task.check),
+            done,
+            title="正在读取导入文件",
+            on_error=lambda e: messagebox.showerror("错误", f"读取失败: {e}"),
+        )
+
+    def add_from_urls(self):
+        """根据链接批量抓取元数据，生成的草稿条目一次性加入并保存"""
+        d = BulkUrlDialog(self.root)
+        if not d.result:
+            return
+        fetcher = MetadataFetcher()
+        existing = [dict(item) for item in self.data]
+        author_links = self.load_author_links()
+
+        def job(task):
+            result = build_drafts(
+                d.result,
+                fetcher,
+                existing,
+                author_links,
+                progress=lambda done, total: task.progress(done, total, "正在抓取"),
+            )
+            # 取消后已抓到的部分也一并丢弃
+            task.check()
+            return result
+
+        def done(result):
+            drafts, errors, skipped = result
+            message = f"生成 {len(drafts)} 个草稿条目"
+            if skipped:
+                message += f"\n跳过 {len(skipped)} 个已收录的链接"
+            if errors:
+                message += f"\n{len(errors)} 个链接抓取失败:\n" + "\n".join(
+                    f"- {url}: {error}" for url, error in list(errors.items())[:10]
+                )
+            if not drafts:
+                messagebox.showwarning("提示", message)
+                return
+            if not messagebox.askyesno(
+                "确认", message + "\n\n是否添加？标签等字段请之后手动补充。"
+            ):
+                return
+            drafts = self._filter_duplicates(drafts)
+            if drafts:
+                self.data.extend(drafts)
+
+        self.tasks.run(
+            job,
+            done,
+            title="正在抓取元数据",
+            on_error=lambda e: messagebox.showerror("错误", f"抓取失败: {e}"),
+            on_cancel=lambda: setattr(fetcher, "cancelled", True),
+        )
 
     def clear_all_thumbnails(self):
         """一键清除所有条目的thumbnail值"""
         if not self.data:
             messagebox.showinfo("提示", "当前没有数据条目")
             return
+        records = list(self.data)
+
+        def job(task):
+            # 统计有多少条目有缩略图（或残留的占位信息）
+            return [
+                i
+                for i, item in enumerate(records)
+                if item.get("thumbnail") or item.get("thumbnailMeta")
+            ]
 
-        # 统计有多少条目有缩略图
-        items_with_thumbnails = sum(1 for item in self.data if item.get("thumbnail"))
-
-        if items_with_thumbnails == 0:
-            messagebox.showinfo("提示", "所有条目都没有缩略图")
-            return
-
-        # 确认对话框
-        confirm_msg = f"确定要清除所有 {items_with_thumbnails} 个条目的缩略图吗？\n\n此操作不可撤销！"
-        if messagebox.askyesno("确认清除", confirm_msg, icon="warning"):
-            # 清除所有thumbnail值
-            cleared_count = 0
-            for item in self.data:
-                if item.get("thumbnail"):
-                    item["thumbnail"] = ""
-                    cleared_count += 1
-
-            # 刷新显示并保存
-            self.fill_treeview()
-            self.save_data_gui(silent=True)
+        def done(positions):
+            if not positions:
+                messagebox.showinfo("提示", "所有条目都没有缩略图")
+                return
 
-            # 显示成功消息
-            messagebox.showinfo(
-                "成功",
-                f"已成功清除 {cleared_count} 个条目的缩略图\n\n数据已自动保存到 data.js",
+            # 确认对话框
+            confirm_msg = f"确定要清除所有 {len(positions)} 个条目的缩略图吗？\n\n此操作不可撤销！"
+            if not messagebox.askyesno("确认清除", confirm_msg, icon="warning"):
+                return
+            # 占位信息描述的是原缩略图，一并清除
+            with self.data.batch():
+                for i in positions:
+                    item = dict(self.data[i], thumbnail="")
+                    item.pop("thumbnailMeta", None)
+                    self.data.update(i, item)
+            self.save_data_gui(
+                silent=True,
+                on_saved=lambda: messagebox.showinfo(
+                    "成功",
+                    f"已成功清除 {len(positions)} 个条目的缩略图\n\n数据已自动保存到 data.js",
+                ),
             )
 
-    def generate_thumbnail_urls(self):
-        """根据ID自动生成缩略图URL"""
+        self.tasks.run(job, done, title="正在统计缩略图")
+
+    def generate_thumbnail_urls(self, only_ids=None, extension=THUMBNAIL_FORMAT):
+        """根据ID自动生成缩略图URL；only_ids 不为空时只更新这些条目"""
         if not self.data:
             messagebox.showinfo("提示", "当前没有数据条目")
             return
 
         # 创建生成URL对话框
-        dialog = ThumbnailUrlDialog(self.root)
+        dialog = ThumbnailUrlDialog(self.root, extension=extension)
         self.root.wait_window(dialog)
+        if not dialog.result:
+            return
+        url_template, start_id, end_id, update_empty_only = dialog.result
+        records = list(self.data)
+
+        def job(task):
+            # 统计将要更新的条目并预先生成URL，主线程只负责确认与写回
+            updates = []
+            for i, item in enumerate(records):
+                if i % 1000 == 0:
+                    task.check()
+                    task.progress(i, len(records))
+                if only_ids is not None and item["id"] not in only_ids:
+                    continue
+                if not start_id <= item["id"] <= end_id:
+                    continue
+                if update_empty_only and item.get("thumbnail"):
+                    continue
+                updates.append((i, url_template.format(id=item["id"])))
+            # 根据上次同步的清单提示哪些条目的缩略图还没有上传；扩展名以最终的 URL 模板为准
+            url_extension = os.path.splitext(urlsplit(url_template).path)[1]
+            missing = missing_thumbnail_ids(
+                [records[i] for i, _ in updates],
+                extension=url_extension.lstrip(".") or extension,
+            )
+            return updates, missing
 
-        if dialog.result:
-            url_template, start_id, end_id, update_empty_only = dialog.result
-
-            # 统计将要更新的条目
-            items_to_update = []
-            for item in self.data:
-                if start_id <= item["id"] <= end_id:
-                    if update_empty_only:
-                        if not item.get("thumbnail"):
-                            items_to_update.append(item)
-                    else:
-                        items_to_update.append(item)
-
-            if not items_to_update:
+        def done(result):
+            updates, missing = result
+            if not updates:
                 messagebox.showinfo("提示", "没有找到需要更新的条目")
                 return
 
             # 确认对话框
-            confirm_msg = f"确定要更新 {len(items_to_update)} 个条目的缩略图URL吗？\n\n"
+            confirm_msg = f"确定要更新 {len(updates)} 个条目的缩略图URL吗？\n\n"
             confirm_msg += f"URL格式: {url_template.replace('{id}', 'ID')}\n"
             confirm_msg += f"ID范围: {start_id}-{end_id}"
+            if missing:
+                shown = ", ".join(str(i) for i in missing[:20])
+                if len(missing) > 20:
+                    shown += " ..."
+                confirm_msg += (
+                    f"\n\n注意：{len(missing)} 个条目的缩略图尚未上传:\n{shown}"
+                )
+            if not messagebox.askyesno("确认更新", confirm_msg):
+                return
 
-            if messagebox.askyesno("确认更新", confirm_msg):
-                # 执行更新
-                updated_count = 0
-                for item in items_to_update:
-                    new_url = url_template.format(id=item["id"])
-                    if item.get("thumbnail") != new_url:
-                        item["thumbnail"] = new_url
+            updated_count = 0
+            with self.data.batch():
+                for i, new_url in updates:
+                    if self.data[i].get("thumbnail") != new_url:
+                        item = dict(self.data[i], thumbnail=new_url)
+                        self.data.update(i, item, ["thumbnail"])
                         updated_count += 1
-
-                # 刷新显示并保存
-                self.fill_treeview()
-                self.save_data_gui(silent=True)
-
-                messagebox.showinfo(
+            self.save_data_gui(
+                silent=True,
+                on_saved=lambda: messagebox.showinfo(
                     "成功",
                     f"已成功更新 {updated_count} 个条目的缩略图URL\n\n数据已自动保存到 data.js",
-                )
+                ),
+            )
+
+        self.tasks.run(job, done, title="正在生成缩略图URL")
 
 
 class JsonImportDialog(tk.Toplevel):
@@ -704,7 +6940,9 @@ class JsonImportDialog(tk.Toplevel):
 
         # JSON输入区域
         ttk.Label(
-            main_frame, text="请粘贴JSON代码:", font=("Microsoft YaHei", 10, "bold")
+            main_frame,
+            text="请粘贴JSON代码（单个对象或对象数组）:",
+            font=("Microsoft YaHei", 10, "bold"),
         ).pack(anchor=tk.W, pady=(0, 10))
 
         text_frame = ttk.Frame(main_frame)
@@ -776,12 +7014,272 @@ class JsonImportDialog(tk.Toplevel):
         self.destroy()
 
 
+class BulkUrlDialog(tk.Toplevel):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("从链接批量抓取")
+        self.geometry("650x400")
+        self.result = None
+
+        main_frame = ttk.Frame(self, padding=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(
+            main_frame,
+            text="每行一个条目：原版链接 [汉化链接]",
+            font=("Microsoft YaHei", 10, "bold"),
+        ).pack(anchor=tk.W, pady=(0, 10))
+
+        text_frame = ttk.Frame(main_frame)
+        text_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.url_text = tk.Text(text_frame, height=12, wrap=tk.NONE, bg="#f8f9fa")
+        self.url_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        scrollbar = ttk.Scrollbar(
+            text_frame, orient=tk.VERTICAL, command=self.url_text.yview
+        )
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.url_text.configure(yscrollcommand=scrollbar.set)
+
+        ttk.Label(
+            main_frame,
+            text="支持 YouTube、哔哩哔哩、ニコニコ動画，其他网站读取 Open Graph 信息",
+            foreground="#666",
+        ).pack(anchor=tk.W, pady=(10, 0))
+
+        bottom_bar = ttk.Frame(self, padding=10)
+        bottom_bar.pack(fill=tk.X, side=tk.BOTTOM)
+        ttk.Button(bottom_bar, text="抓取", command=self.on_fetch, width=10).pack(
+            side=tk.RIGHT, padx=5
+        )
+        ttk.Button(bottom_bar, text="取消", command=self.destroy, width=10).pack(
+            side=tk.RIGHT
+        )
+
+        self.wait_window()
+
+    def on_fetch(self):
+        pairs = parse_url_lines(self.url_text.get(1.0, tk.END))
+        if not pairs:
+            messagebox.showwarning("提示", "请至少输入一个链接")
+            return
+        self.result = pairs
+        self.destroy()
+
+
+class BatchValueDialog(tk.Toplevel):
+    """输入单个值（可从建议中选择）的小对话框；取消时 result 为 None"""
+
+    def __init__(self, parent, title, label, values=(), readonly=False):
+        super().__init__(parent)
+        self.title(title)
+        self.resizable(False, False)
+        self.result = None
+
+        main_frame = ttk.Frame(self, padding=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(main_frame, text=label).pack(anchor=tk.W, pady=(0, 5))
+        self.value_var = tk.StringVar(value=values[0] if readonly and values else "")
+        if values:
+            entry = ttk.Combobox(
+                main_frame,
+                textvariable=self.value_var,
+                values=list(values),
+                state="readonly" if readonly else "normal",
+                width=40,
+            )
+        else:
+            entry = ttk.Entry(main_frame, textvariable=self.value_var, width=43)
+        entry.pack(fill=tk.X)
+        entry.focus_set()
+        entry.bind("<Return>", lambda e: self.ok())
+
+        btn_frame = ttk.Frame(main_frame)
+        btn_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(btn_frame, text="确定", command=self.ok, width=10).pack(
+            side=tk.RIGHT, padx=(5, 0)
+        )
+        ttk.Button(btn_frame, text="取消", command=self.destroy, width=10).pack(
+            side=tk.RIGHT
+        )
+
+        self.wait_window()
+
+    def ok(self):
+        self.result = self.value_var.get()
+        self.destroy()
+
+
+class BulkEditDialog(tk.Toplevel):
+    """按查询选出条目，预览并应用批量重命名或字段替换"""
+
+    def __init__(self, parent, records, author_links):
+        super().__init__(parent)
+        self.title("批量修改")
+        self.geometry("800x560")
+        self.records = records
+        self.author_links = author_links
+        self.result = None
+
+        main_frame = ttk.Frame(self, padding=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        main_frame.columnconfigure(1, weight=1)
+
+        ttk.Label(main_frame, text="查询:").grid(row=0, column=0, sticky=tk.W)
+        self.query_var = tk.StringVar()
+        ttk.Entry(main_frame, textvariable=self.query_var).grid(
+            row=0, column=1, columnspan=3, sticky=tk.EW, pady=2
+        )
+        ttk.Label(
+            main_frame,
+            text='如 tag="魔理沙" author:某作者 status:已汉化 date:2024..2025-06 关键词（留空为全部）',
+            foreground="#666",
+        ).grid(row=1, column=1, columnspan=3, sticky=tk.W, pady=(0, 8))
+
+        ttk.Label(main_frame, text="操作:").grid(row=2, column=0, sticky=tk.W)
+        self.operation_var = tk.StringVar(value=BULK_OPERATIONS["rename-tag"])
+        operation_box = ttk.Combobox(
+            main_frame,
+            textvariable=self.operation_var,
+            values=list(BULK_OPERATIONS.values()),
+            state="readonly",
+            width=22,
+        )
+        operation_box.grid(row=2, column=1, sticky=tk.W, pady=2)
+        operation_box.bind("<<ComboboxSelected>>", lambda e: self._update_fields())
+        self.field_var = tk.StringVar(value=BULK_FIELDS[0])
+        self.field_box = ttk.Combobox(
+            main_frame,
+            textvariable=self.field_var,
+            values=BULK_FIELDS,
+            state="disabled",
+            width=14,
+        )
+        self.field_box.grid(row=2, column=2, sticky=tk.W, padx=5)
+        self.regex_var = tk.BooleanVar(value=False)
+        self.regex_check = ttk.Checkbutton(
+            main_frame, text="正则表达式", variable=self.regex_var, state="disabled"
+        )
+        self.regex_check.grid(row=2, column=3, sticky=tk.W)
+
+        ttk.Label(main_frame, text="旧值:").grid(row=3, column=0, sticky=tk.W)
+        self.old_var = tk.StringVar()
+        ttk.Entry(main_frame, textvariable=self.old_var).grid(
+            row=3, column=1, columnspan=3, sticky=tk.EW, pady=2
+        )
+        ttk.Label(main_frame, text="新值:").grid(row=4, column=0, sticky=tk.W)
+        self.new_var = tk.StringVar()
+        ttk.Entry(main_frame, textvariable=self.new_var).grid(
+            row=4, column=1, columnspan=3, sticky=tk.EW, pady=2
+        )
+
+        table_frame = ttk.Frame(main_frame)
+        table_frame.grid(row=5, column=0, columnspan=4, sticky=tk.NSEW, pady=(10, 0))
+        main_frame.rowconfigure(5, weight=1)
+        scrollbar = ttk.Scrollbar(table_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree = ttk.Treeview(
+            table_frame,
+            columns=("id", "title", "change"),
+            show="headings",
+            yscrollcommand=scrollbar.set,
+        )
+        for col_id, (name, width) in {
+            "id": ("ID", 50),
+            "title": ("标题", 220),
+            "change": ("变更", 450),
+        }.items():
+            self.tree.heading(col_id, text=name)
+            self.tree.column(col_id, width=width)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.tree.yview)
+
+        bottom_bar = ttk.Frame(self, padding=10)
+        bottom_bar.pack(fill=tk.X, side=tk.BOTTOM)
+        self.summary_label = ttk.Label(bottom_bar, text="", foreground="#666")
+        self.summary_label.pack(side=tk.LEFT)
+        ttk.Button(bottom_bar, text="应用", command=self.on_apply, width=10).pack(
+            side=tk.RIGHT, padx=5
+        )
+        ttk.Button(bottom_bar, text="预览", command=self.on_preview, width=10).pack(
+            side=tk.RIGHT
+        )
+        ttk.Button(bottom_bar, text="取消", command=self.destroy, width=10).pack(
+            side=tk.RIGHT, padx=5
+        )
+
+        self.wait_window()
+
+    def _operation(self):
+        label = self.operation_var.get()
+        return next(key for key, name in BULK_OPERATIONS.items() if name == label)
+
+    def _update_fields(self):
+        rewrite = self._operation() == "rewrite"
+        self.field_box.configure(state="readonly" if rewrite else "disabled")
+        self.regex_check.configure(state="normal" if rewrite else "disabled")
+
+    def _plan(self):
+        operation = self._operation()
+        args = (self.old_var.get().strip(), self.new_var.get().strip())
+        if operation == "rewrite":
+            # 替换内容可能有意包含首尾空白，不做 strip
+            args = (
+                self.field_var.get(),
+                self.old_var.get(),
+                self.new_var.get(),
+                self.regex_var.get(),
+            )
+            if not args[1]:
+                raise ValueError("请填写要替换的内容")
+        return plan_bulk_edit(
+            self.records, self.author_links, self.query_var.get(), operation, *args
+        )
+
+    def on_preview(self):
+        try:
+            edit = self._plan()
+        except ValueError as e:
+            messagebox.showerror("错误", str(e), parent=self)
+            return
+        self.tree.delete(*self.tree.get_children())
+        for i, item, fields in edit.changes:
+            old = self.records[i]
+            change = "；".join(f"{f}: {old.get(f)!r} → {item.get(f)!r}" for f in fields)
+            self.tree.insert("", tk.END, values=(old["id"], old["title"], change))
+        summary = f"匹配 {edit.matched} 条，将修改 {len(edit.changes)} 条"
+        if edit.author_links is not self.author_links:
+            summary += "，并迁移作者链接"
+        self.summary_label.config(text=summary)
+        return edit
+
+    def on_apply(self):
+        edit = self.on_preview()
+        if edit is None:
+            return
+        if not edit.changes:
+            messagebox.showinfo("提示", "没有需要修改的条目", parent=self)
+            return
+        if messagebox.askyesno(
+            "确认", f"确定要修改 {len(edit.changes)} 个条目吗？", parent=self
+        ):
+            self.result = edit
+            self.destroy()
+
+
 class AddEditDialog(tk.Toplevel):
-    def __init__(self, parent, title, item, suggestions):
+    def __init__(
+        self, parent, title, item, suggestions, find_duplicates=None, previews=None
+    ):
         super().__init__(parent)
         self.title(title)
         self.item = item
         self.suggestions = suggestions
+        self.find_duplicates = find_duplicates
+        # ThumbnailPreviews；为 None 时不显示封面预览
+        self.previews = previews
+        self._preview_job = None
         self.result = None
         self.geometry("650x700")
         # self.grab_set()  # 模态锁定
@@ -937,6 +7435,9 @@ class AddEditDialog(tk.Toplevel):
                 row=i, column=0, sticky=tk.W, pady=5, padx=(0, 10)
             )
             self.vars[key] = tk.StringVar(value=self.item.get(key, ""))
+            if key == "thumbnail" and self.previews is not None:
+                self._thumbnail_field(f, i)
+                continue
             ttk.Entry(f, textvariable=self.vars[key]).grid(
                 row=i, column=1, sticky=tk.EW, pady=5
             )
@@ -973,6 +7474,43 @@ class AddEditDialog(tk.Toplevel):
             row=14, column=1, sticky=tk.W, pady=5
         )
 
+    def _thumbnail_field(self, parent, row):
+        """封面图 URL 输入框及其下方的预览，URL 停止修改后在后台加载"""
+        frame = ttk.Frame(parent)
+        frame.grid(row=row, column=1, sticky=tk.EW, pady=5)
+        ttk.Entry(frame, textvariable=self.vars["thumbnail"]).pack(fill=tk.X)
+        self.preview_label = ttk.Label(frame, foreground="#777", compound=tk.TOP)
+        self.preview_label.pack(anchor=tk.W, pady=(5, 0))
+        self.vars["thumbnail"].trace_add(
+            "write", lambda *args: self._schedule_preview()
+        )
+        self._update_preview()
+
+    def _schedule_preview(self):
+        if self._preview_job is not None:
+            self.after_cancel(self._preview_job)
+        self._preview_job = self.after(HOVER_DELAY, self._update_preview)
+
+    def _update_preview(self):
+        self._preview_job = None
+        url = self.vars["thumbnail"].get().strip()
+        source = thumbnail_source(url)
+        if source is None:
+            text = "本地没有该缩略图，无法预览" if url else ""
+            self.preview_label.configure(image="", text=text)
+            self.preview_label.image = None
+            return
+        self.preview_label.configure(image="", text="正在加载预览...")
+
+        def shown(image, error):
+            # 加载期间对话框可能已关闭或 URL 已再次修改
+            if not self.winfo_exists() or self.vars["thumbnail"].get().strip() != url:
+                return
+            self.preview_label.configure(image=image or "", text=error or "")
+            self.preview_label.image = image
+
+        self.previews.request(source, shown)
+
     def _fill_tag_pool(self):
         self.tag_pool.configure(state="normal")
         for tag in self.suggestions.get("tags", []):
@@ -1229,14 +7767,33 @@ class AddEditDialog(tk.Toplevel):
             "thumbnail": self.vars["thumbnail"].get().strip(),
             "dateAdded": self.vars["dateAdded"].get().strip(),
         }
+        errors = RECORD_VALIDATOR.validate_one(self.result)
+        if errors:
+            self.result = None
+            return messagebox.showwarning(
+                "校验失败",
+                "\n".join(f"- {field}: {message}" for field, message in errors),
+                parent=self,
+            )
+        if self.find_duplicates:
+            matches = self.find_duplicates(self.result)
+            if matches and not messagebox.askyesno(
+                "可能重复",
+                f"以下条目可能与此条目重复:\n{describe_duplicates(matches)}\n\n仍然保存？",
+                parent=self,
+            ):
+                self.result = None
+                return
         self.destroy()
 
 
 class AuthorLinksDialog(tk.Toplevel):
-    def __init__(self, parent, data):
+    def __init__(self, parent, data, expected_version=None, store=None):
         super().__init__(parent)
         self.title("管理作者/译者链接")
         self.data = data
+        self.expected_version = expected_version
+        self.store = store
         self.result = None
         self.geometry("600x500")
 
@@ -1298,6 +7855,11 @@ class AuthorLinksDialog(tk.Toplevel):
 
     def load_existing_links(self):
         """加载现有的作者链接"""
+        if self.store is not None:
+            self.author_links = self.store.load_author_links()
+            for name, link in self.author_links.items():
+                self.tree.insert("", tk.END, values=(name, link))
+            return
         # 从data.js中提取authorLinks
         try:
             with open("data.js", "r", encoding="utf-8") as f:
@@ -1393,38 +7955,32 @@ class AuthorLinksDialog(tk.Toplevel):
             if name and link:
                 links[name] = link
 
-        # 读取data.js文件
+        # 只替换 data.js 中的 authorLinks 部分（持有写锁）
         try:
-            with open("data.js", "r", encoding="utf-8") as f:
-                content = f.read()
-        except:
-            messagebox.showerror("错误", "无法读取data.js文件")
+            if self.store is not None:
+                # data.js 由之后的保存重新导出
+                self.store.save_author_links(links)
+                self.result = (None, False)
+                conflicts = []
+            else:
+                version, current, conflicts = update_author_links(
+                    links,
+                    expected_version=self.expected_version,
+                    base_links=self.author_links,
+                )
+                self.result = (version, current)
+        except Exception as e:
+            messagebox.showerror("错误", f"保存失败: {str(e)}")
             return
-
-        # 替换authorLinks部分
-        new_links_str = (
-            "const authorLinks = "
-            + json.dumps(links, ensure_ascii=False, indent=4)
-            + ";"
-        )
-
-        # 查找并替换
-        pattern = r"const authorLinks = {.*?};"
-        if re.search(pattern, content, re.DOTALL):
-            new_content = re.sub(pattern, new_links_str, content, flags=re.DOTALL)
+        if conflicts:
+            messagebox.showinfo(
+                "成功",
+                "作者链接已保存，并已合并其他程序在此期间的修改；"
+                "以下名字双方都改过，保留了这里的链接:\n" + "\n".join(conflicts[:20]),
+            )
         else:
-            # 如果没有找到，在文件开头添加
-            new_content = new_links_str + "\n\n" + content
-
-        # 保存文件
-        try:
-            with open("data.js", "w", encoding="utf-8") as f:
-                f.write(new_content)
-            self.result = True
             messagebox.showinfo("成功", "作者链接已保存")
-            self.destroy()
-        except Exception as e:
-            messagebox.showerror("错误", f"保存失败: {str(e)}")
+        self.destroy()
 
 
 class LinkEditDialog(tk.Toplevel):
@@ -1485,12 +8041,164 @@ class LinkEditDialog(tk.Toplevel):
         self.destroy()
 
 
+class TaskProgressDialog(tk.Toplevel):
+    """后台任务的进度条与取消按钮；关闭窗口等同于取消"""
+
+    def __init__(self, parent, title, on_cancel):
+        super().__init__(parent)
+        self.title(title)
+        self.resizable(False, False)
+        self.transient(parent)
+        self.on_cancel = on_cancel
+
+        main_frame = ttk.Frame(self, padding=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        self.label = ttk.Label(main_frame, text=f"{title}...")
+        self.label.pack(anchor=tk.W, pady=(0, 5))
+        self.progress = ttk.Progressbar(main_frame, length=300, mode="indeterminate")
+        self.progress.pack(fill=tk.X)
+        self.progress.start(15)
+        # 不可取消的任务（如保存）没有取消按钮，关闭窗口也不起作用
+        self.protocol("WM_DELETE_WINDOW", self.cancel if on_cancel else lambda: None)
+        if on_cancel:
+            self.cancel_button = ttk.Button(
+                main_frame, text="取消", command=self.cancel
+            )
+            self.cancel_button.pack(anchor=tk.E, pady=(10, 0))
+
+    def set_progress(self, done, total, text=None):
+        if total:
+            if str(self.progress["mode"]) != "determinate":
+                self.progress.stop()
+                self.progress.configure(mode="determinate")
+            self.progress.configure(maximum=total, value=done)
+        if text or total:
+            suffix = f" {done}/{total}" if total else ""
+            self.label.config(text=f"{text or self.title()}{suffix}")
+
+    def cancel(self):
+        self.cancel_button.config(state=tk.DISABLED)
+        self.label.config(text="正在取消...")
+        self.on_cancel()
+
+
+class LinkReportDialog(tk.Toplevel):
+    """链接检查进度与报告，可按状态和字段筛选"""
+
+    FILTERS = ["全部", "仅失效", "仅正常"]
+
+    def __init__(self, parent, on_close=None):
+        super().__init__(parent)
+        self.title("链接检查报告")
+        self.geometry("900x550")
+        self.report = []
+        self.on_close = on_close
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        main_frame = ttk.Frame(self, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # 进度与筛选
+        top_bar = ttk.Frame(main_frame)
+        top_bar.pack(fill=tk.X, pady=(0, 10))
+        self.progress = ttk.Progressbar(top_bar, length=200, mode="determinate")
+        self.progress.pack(side=tk.LEFT)
+        self.progress_label = ttk.Label(top_bar, text="正在检查...", foreground="#666")
+        self.progress_label.pack(side=tk.LEFT, padx=10)
+
+        self.field_var = tk.StringVar(value="全部字段")
+        field_box = ttk.Combobox(
+            top_bar,
+            textvariable=self.field_var,
+            values=["全部字段", *LINK_FIELDS, "authorLinks"],
+            state="readonly",
+            width=14,
+        )
+        field_box.pack(side=tk.RIGHT)
+        field_box.bind("<<ComboboxSelected>>", lambda e: self.apply_filter())
+        self.filter_var = tk.StringVar(value="仅失效")
+        filter_box = ttk.Combobox(
+            top_bar,
+            textvariable=self.filter_var,
+            values=self.FILTERS,
+            state="readonly",
+            width=8,
+        )
+        filter_box.pack(side=tk.RIGHT, padx=5)
+        filter_box.bind("<<ComboboxSelected>>", lambda e: self.apply_filter())
+
+        table_frame = ttk.Frame(main_frame)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        scrollbar = ttk.Scrollbar(table_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree = ttk.Treeview(
+            table_frame,
+            columns=("id", "label", "field", "status", "url", "error"),
+            show="headings",
+            yscrollcommand=scrollbar.set,
+        )
+        cols = {
+            "id": ("ID", 50),
+            "label": ("标题/名称", 180),
+            "field": ("字段", 100),
+            "status": ("状态码", 60),
+            "url": ("链接", 300),
+            "error": ("错误", 180),
+        }
+        for col_id, (name, width) in cols.items():
+            self.tree.heading(col_id, text=name)
+            self.tree.column(col_id, width=width)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.tree.yview)
+
+    def set_progress(self, done, total):
+        self.progress.configure(maximum=max(total, 1), value=done)
+        self.progress_label.config(text=f"正在检查... {done}/{total}")
+
+    def show_report(self, report):
+        self.report = report
+        broken = sum(1 for row in report if not row["ok"])
+        self.progress.configure(maximum=1, value=1)
+        self.progress_label.config(
+            text=f"共 {len(report)} 个链接，{broken} 个失效（报告已写入 {LINK_REPORT}）"
+        )
+        self.apply_filter()
+
+    def apply_filter(self):
+        self.tree.delete(*self.tree.get_children())
+        mode = self.filter_var.get()
+        field = self.field_var.get()
+        for row in self.report:
+            if mode == "仅失效" and row["ok"] or mode == "仅正常" and not row["ok"]:
+                continue
+            if field != "全部字段" and row["field"] != field:
+                continue
+            self.tree.insert(
+                "",
+                tk.END,
+                values=(
+                    row["id"] if row["id"] is not None else "",
+                    row["label"],
+                    row["field"],
+                    row["status"] or "",
+                    row["url"],
+                    row["error"] or "",
+                ),
+            )
+
+    def close(self):
+        if self.on_close:
+            self.on_close()
+        self.destroy()
+
+
 class ThumbnailUrlDialog(tk.Toplevel):
-    def __init__(self, parent):
+    def __init__(self, parent, extension=THUMBNAIL_FORMAT):
         super().__init__(parent)
         self.title("生成缩略图URL")
         self.geometry("600x500")  # 增加高度以适应滚动条
         self.result = None
+        self.extension = extension
 
         # 主框架 - 使用Canvas和滚动条
         canvas = tk.Canvas(self)
@@ -1677,16 +8385,16 @@ class ThumbnailUrlDialog(tk.Toplevel):
 
         if format_type == "cloudinary":
             self.cloud_frame.pack(fill=tk.X, pady=(5, 0))
-            url = f"https://res.cloudinary.com/{self.cloud_name.get()}/image/upload/{self.cloud_version.get()}/{self.cloud_folder.get()}/{{id}}.jpg"
+            url = f"https://res.cloudinary.com/{self.cloud_name.get()}/image/upload/{self.cloud_version.get()}/{self.cloud_folder.get()}/{{id}}.{self.extension}"
         elif format_type == "github":
             self.github_frame.pack(fill=tk.X, pady=(5, 0))
-            url = f"https://cdn.jsdelivr.net/gh/{self.github_user.get()}/{self.github_repo.get()}/main/{self.github_folder.get()}/{{id}}.jpg"
+            url = f"https://cdn.jsdelivr.net/gh/{self.github_user.get()}/{self.github_repo.get()}/main/{self.github_folder.get()}/{{id}}.{self.extension}"
         else:  # custom
             self.custom_frame.pack(fill=tk.X, pady=(5, 0))
             base = self.custom_base.get()
             if not base.endswith("/"):
                 base += "/"
-            url = f"{base}{{id}}.jpg"
+            url = f"{base}{{id}}.{self.extension}"
 
         example_url = url.format(id=1)
         self.preview_label.config(text=f"示例URL: {example_url}")
@@ -1696,14 +8404,14 @@ class ThumbnailUrlDialog(tk.Toplevel):
         format_type = self.url_format.get()
 
         if format_type == "cloudinary":
-            return f"https://res.cloudinary.com/{self.cloud_name.get()}/image/upload/{self.cloud_version.get()}/{self.cloud_folder.get()}/{{id}}.jpg"
+            return f"https://res.cloudinary.com/{self.cloud_name.get()}/image/upload/{self.cloud_version.get()}/{self.cloud_folder.get()}/{{id}}.{self.extension}"
         elif format_type == "github":
-            return f"https://cdn.jsdelivr.net/gh/{self.github_user.get()}/{self.github_repo.get()}/main/{self.github_folder.get()}/{{id}}.jpg"
+            return f"https://cdn.jsdelivr.net/gh/{self.github_user.get()}/{self.github_repo.get()}/main/{self.github_folder.get()}/{{id}}.{self.extension}"
         else:  # custom
             base = self.custom_base.get()
             if not base.endswith("/"):
                 base += "/"
-            return f"{base}{{id}}.jpg"
+            return f"{base}{{id}}.{self.extension}"
 
     def ok(self):
         """确定按钮"""
@@ -1726,11 +8434,347 @@ class ThumbnailUrlDialog(tk.Toplevel):
         self.destroy()
 
 
-if __name__ == "__main__":
+def open_store(path, source="data.js"):
+    """打开 SQLite 存储；数据库为空而 data.js 已存在时先从 data.js 导入"""
+    store = CollectionStore(path)
+    if store.is_empty() and os.path.exists(source):
+        store.import_data_js(source)
+    return store
+
+
+def run_gui(db=None):
     root = tk.Tk()
     try:
         ttk.Style().theme_use("clam")
     except Exception:
         pass
-    app = DataManagerGUI(root)
+    app = DataManagerGUI(root, store=open_store(db) if db else None)
     root.mainloop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="东方 Project 茶番剧收藏数据管理工具")
+    subparsers = parser.add_subparsers(dest="command")
+    gui = subparsers.add_parser("gui", help="启动图形界面（默认）")
+    gui.add_argument("--db", help=f"使用 SQLite 存储（如 {DB_PATH}），data.js 由其导出")
+    subparsers.add_parser("prerender", help="生成静态详情页与首屏卡片")
+    thumbs = subparsers.add_parser("thumbnails", help="从本地源图生成缩略图变体")
+    thumbs.add_argument("--source", required=True, help="源图片文件夹，文件名为条目ID")
+    thumbs.add_argument("--output", default=THUMBNAIL_OUTPUT_DIR, help="输出文件夹")
+    thumbs.add_argument(
+        "--template", help="缩略图URL模板，如 https://example.com/images/{id}.webp"
+    )
+    placeholders = subparsers.add_parser(
+        "placeholders", help="计算缩略图尺寸、主色调与模糊占位图"
+    )
+    placeholders.add_argument(
+        "--images", default=THUMBNAIL_OUTPUT_DIR, help="缩略图文件夹，文件名为条目ID"
+    )
+    sync = subparsers.add_parser("sync-thumbnails", help="增量同步缩略图到目标目录")
+    sync.add_argument("--source", default=THUMBNAIL_OUTPUT_DIR, help="本地缩略图文件夹")
+    sync.add_argument("--target", required=True, help="目标文件夹（CDN 的本地镜像）")
+    sync.add_argument("--workers", type=int, default=SYNC_WORKERS, help="并发数")
+    sync.add_argument("--dry-run", action="store_true", help="只显示需要执行的操作")
+    links = subparsers.add_parser("check-links", help="检查所有链接的可用性")
+    links.add_argument("--per-host", type=int, default=4, help="每个主机的最大并发数")
+    links.add_argument(
+        "--interval", type=float, default=0.2, help="同一主机的请求间隔（秒）"
+    )
+    links.add_argument("--timeout", type=float, default=10, help="单次请求超时（秒）")
+    links.add_argument(
+        "--ttl", type=float, default=LINK_CACHE_TTL, help="结果缓存有效期（秒）"
+    )
+    enrich = subparsers.add_parser(
+        "enrich", help="根据链接批量抓取元数据并添加草稿条目"
+    )
+    enrich.add_argument("input", help="链接列表文件，每行：原版链接 [汉化链接]")
+    enrich.add_argument("--workers", type=int, default=METADATA_WORKERS, help="并发数")
+    enrich.add_argument("--output", help="只把草稿写入该 JSON 文件，不修改 data.js")
+    importer = subparsers.add_parser(
+        "import", help="从 JSON 数组、NDJSON 或 CSV 批量导入"
+    )
+    importer.add_argument("file", help="导入文件（.json/.ndjson/.jsonl/.csv）")
+    importer.add_argument(
+        "--format", choices=sorted(set(IMPORT_FORMATS.values())), help="指定文件格式"
+    )
+    importer.add_argument("--dry-run", action="store_true", help="只校验，不写入")
+    importer.add_argument(
+        "--skip-duplicates", action="store_true", help="跳过疑似重复的条目"
+    )
+    subparsers.add_parser("validate", help="校验 data.js 中的所有记录")
+    diff = subparsers.add_parser("diff", help="按记录比较两个版本的 data.js")
+    diff.add_argument(
+        "old", help="旧版本：文件路径或 git 的 <版本>:<路径>，如 HEAD:data.js"
+    )
+    diff.add_argument("new", nargs="?", default="data.js", help="新版本，默认 data.js")
+    merge = subparsers.add_parser(
+        "merge-driver", help="git merge driver：按记录三路合并 data.js"
+    )
+    merge.add_argument("base", help="共同祖先 (%%O)")
+    merge.add_argument("ours", help="我方版本，合并结果写回此文件 (%%A)")
+    merge.add_argument("theirs", help="对方版本 (%%B)")
+    subparsers.add_parser(
+        "publish", help="按当前 data.js 重新生成增量文件（合并分支后使用）"
+    )
+    dupes = subparsers.add_parser("duplicates", help="列出集合中疑似重复的条目")
+    dupes.add_argument(
+        "--threshold", type=float, default=TITLE_SIMILARITY, help="标题相似度阈值"
+    )
+    bulk = subparsers.add_parser("bulk", help="按查询批量重命名或替换字段内容")
+    bulk.add_argument(
+        "query", help="查询，如 'tag=\"魔理沙\" status:已汉化'，空字符串表示全部"
+    )
+    bulk_ops = bulk.add_subparsers(dest="operation", required=True)
+    apply_flag = argparse.ArgumentParser(add_help=False)
+    apply_flag.add_argument(
+        "--apply", action="store_true", help="写入 data.js（默认只预览）"
+    )
+    for name in ("rename-tag", "rename-person"):
+        op = bulk_ops.add_parser(name, help=BULK_OPERATIONS[name], parents=[apply_flag])
+        op.add_argument("old", help="旧名称")
+        op.add_argument("new", help="新名称（已存在时合并）")
+    rewrite = bulk_ops.add_parser(
+        "rewrite", help=BULK_OPERATIONS["rewrite"], parents=[apply_flag]
+    )
+    rewrite.add_argument("field", choices=BULK_FIELDS, help="字段")
+    rewrite.add_argument("old", help="要替换的内容")
+    rewrite.add_argument("new", help="替换为")
+    rewrite.add_argument("--regex", action="store_true", help="old 为正则表达式")
+    serve = subparsers.add_parser("serve", help="启动本地 HTTP API 与站点预览")
+    serve.add_argument("--host", default=API_HOST, help="监听地址")
+    serve.add_argument("--port", type=int, default=API_PORT, help="端口")
+    db = subparsers.add_parser("db", help="SQLite 存储：导入、导出 data.js 与全文搜索")
+    db.add_argument("--path", default=DB_PATH, help="数据库文件")
+    db_actions = db.add_subparsers(dest="action", required=True)
+    db_actions.add_parser("import", help="用 data.js 的内容替换数据库")
+    db_actions.add_parser("export", help="由数据库生成 data.js")
+    db_search = db_actions.add_parser("search", help="在标题与描述中搜索")
+    db_search.add_argument("query", help="关键词")
+    db_search.add_argument("--limit", type=int, default=50, help="最多显示条数")
+    args = parser.parse_args(argv)
+
+    try:
+        run_command(args)
+    except RuntimeError as e:
+        parser.exit(1, f"错误: {e}\n")
+
+
+def run_command(args):
+    if args.command in (None, "gui"):
+        run_gui(getattr(args, "db", None))
+    elif args.command == "prerender":
+        rendered, skipped, index_updated = prerender_pages(
+            load_dramas(), read_author_links()
+        )
+        print(f"重新生成 {rendered} 页，跳过 {skipped} 页，首页更新: {index_updated}")
+    elif args.command == "thumbnails":
+        result = process_thumbnails(args.source, args.output)
+        print(
+            f"生成 {len(result['processed'])} 张，跳过 {len(result['skipped'])} 张，"
+            f"失败 {len(result['failed'])} 张"
+        )
+        for record_id, error in sorted(result["failed"].items()):
+            print(f"  ID {record_id}: {error}")
+        if args.template:
+            version = file_version()
+            records = load_dramas()
+            updated = 0
+            for item in records:
+                if item["id"] in result["available"]:
+                    new_url = args.template.format(id=item["id"])
+                    if item.get("thumbnail") != new_url:
+                        item["thumbnail"] = new_url
+                        updated += 1
+            if updated:
+                save_collection(
+                    records, expected_version=version, existing_count=len(records)
+                )
+            print(f"更新了 {updated} 个条目的缩略图URL")
+    elif args.command == "placeholders":
+        version = file_version()
+        records = load_dramas()
+        updates, computed, failed = compute_thumbnail_meta(records, args.images)
+        for i, meta in updates.items():
+            records[i]["thumbnailMeta"] = meta
+        if updates:
+            save_collection(
+                records, expected_version=version, existing_count=len(records)
+            )
+        print(
+            f"新计算 {computed} 张图片，更新 {len(updates)} 个条目，失败 {len(failed)} 张"
+        )
+        for record_id, error in sorted(failed.items()):
+            print(f"  ID {record_id}: {error}")
+    elif args.command == "sync-thumbnails":
+        result = sync_thumbnails(
+            args.source,
+            LocalDirectoryTarget(args.target),
+            workers=args.workers,
+            dry_run=args.dry_run,
+        )
+        prefix = "需要" if args.dry_run else "已"
+        print(
+            f"{prefix}上传 {len(result['uploaded'])} 个，{prefix}删除 {len(result['deleted'])} 个"
+        )
+        for name, error in sorted(result["failed"].items()):
+            print(f"  {name}: {error}")
+    elif args.command == "check-links":
+        checker = LinkChecker(
+            per_host=args.per_host,
+            interval=args.interval,
+            timeout=args.timeout,
+            ttl=args.ttl,
+        )
+        report = check_links(load_dramas(), read_author_links(), checker)
+        broken = [row for row in report if not row["ok"]]
+        for row in broken:
+            print(
+                f"  [{row['field']}] {row['label']}: {row['url']} "
+                f"({row['status'] or row['error']})"
+            )
+        print(
+            f"共 {len(report)} 个链接，{len(broken)} 个失效，报告已写入 {LINK_REPORT}"
+        )
+
+    elif args.command == "enrich":
+        with open(args.input, "r", encoding="utf-8") as f:
+            pairs = parse_url_lines(f.read())
+        version = file_version()
+        records = load_dramas()
+        drafts, errors, skipped = build_drafts(
+            pairs,
+            MetadataFetcher(workers=args.workers),
+            records,
+            read_author_links(),
+        )
+        for url, error in errors.items():
+            print(f"  {url}: {error}")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(drafts, f, ensure_ascii=False, indent=2)
+        elif drafts:
+            existing = len(records)
+            records.extend(drafts)
+            for i, item in enumerate(records):
+                item["id"] = i + 1
+            save_collection(records, expected_version=version, existing_count=existing)
+        print(
+            f"生成 {len(drafts)} 个草稿，跳过 {len(skipped)} 个已收录链接，"
+            f"{len(errors)} 个链接失败"
+        )
+
+    elif args.command == "import":
+        try:
+            items, errors = import_file(args.file, args.format)
+        except ValueError as e:
+            raise RuntimeError(str(e))
+        for row, msg in errors:
+            print(f"  第 {row} 行: {msg}" if row else f"  {msg}")
+        version = file_version()
+        records = load_dramas()
+        index = DuplicateIndex(records)
+        kept = []
+        for item in items:
+            matches = index.find(item)
+            if matches:
+                print(f"  疑似重复: {item['title']}")
+                print(describe_duplicates(matches))
+            if not (matches and args.skip_duplicates):
+                index.add(item)
+                kept.append(item)
+        items = kept
+        if items and not args.dry_run:
+            existing = len(records)
+            records.extend(items)
+            for i, item in enumerate(records):
+                item["id"] = i + 1
+            save_collection(records, expected_version=version, existing_count=existing)
+        prefix = "可导入" if args.dry_run else "已导入"
+        print(f"{prefix} {len(items)} 个条目，{len(errors)} 行有错误")
+
+    elif args.command == "diff":
+        old_records, old_links = load_revision(args.old)
+        new_records, new_links = load_revision(args.new)
+        print(
+            format_change_report(
+                diff_collections(old_records, new_records),
+                diff_author_links(old_links, new_links),
+            )
+        )
+    elif args.command == "merge-driver":
+        conflicts = merge_data_files(args.base, args.ours, args.theirs)
+        for conflict in conflicts:
+            field = f" {conflict['field']}" if conflict["field"] else ""
+            print(
+                f"冲突: {conflict['title']}{field}（{conflict['reason']}）",
+                file=sys.stderr,
+            )
+        if conflicts:
+            # 冲突字段已保留我方的值，返回非零让 git 标记为冲突待人工确认
+            sys.exit(1)
+    elif args.command == "publish":
+        version = file_version()
+        records = load_dramas()
+        save_collection(records, expected_version=version, existing_count=len(records))
+        print(f"当前数据版本: {read_data_version('data.js')}")
+    elif args.command == "validate":
+        records = load_dramas()
+        errors = RECORD_VALIDATOR.validate(records)
+        if errors:
+            raise ValidationError(
+                f"{len(errors)} 处数据不合法:\n"
+                + format_validation_errors(errors, limit=len(errors))
+            )
+        print(f"全部 {len(records)} 个条目校验通过")
+    elif args.command == "bulk":
+        if args.operation == "rewrite":
+            op_args = (args.field, args.old, args.new, args.regex)
+        else:
+            op_args = (args.old, args.new)
+        version = file_version()
+        records = load_dramas()
+        links = read_author_links()
+        try:
+            edit = plan_bulk_edit(records, links, args.query, args.operation, *op_args)
+        except ValueError as e:
+            raise RuntimeError(str(e))
+        print(format_bulk_preview(records, edit))
+        if args.apply and edit.changes:
+            apply_bulk_edit(records, edit)
+            save_collection(
+                records,
+                expected_version=version,
+                author_links=edit.author_links,
+                existing_count=len(records),
+            )
+            print("已保存")
+    elif args.command == "serve":
+        serve_api(args.host, args.port)
+    elif args.command == "db":
+        store = CollectionStore(args.path)
+        try:
+            if args.action == "import":
+                print(f"已导入 {store.import_data_js()} 个条目到 {args.path}")
+            elif args.action == "export":
+                store.export_data_js()
+                print("已由数据库生成 data.js")
+            elif args.action == "search":
+                records = store.load_records()
+                positions = store.search(args.query, args.limit)
+                for position in positions:
+                    print(f"  [{position}] {records[position - 1]['title']}")
+                print(f"共 {len(positions)} 个结果")
+        finally:
+            store.close()
+    elif args.command == "duplicates":
+        pairs = find_duplicate_pairs(load_dramas(), args.threshold)
+        for first, second, reason, score in pairs:
+            print(
+                f"  [{first['id']}] {first['title']} ↔ [{second['id']}] {second['title']}"
+                f"（{reason} {score:.0%}）"
+            )
+        print(f"共 {len(pairs)} 对疑似重复")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubServer:
+    """本地 HTTP 桩服务器。routes 为 {路径: (状态码, 响应头, 正文[, 延迟秒数])}，
+    路径可带查询串；值也可以是接收请求处理器、返回同样元组的函数。
+    请求依次记录在 requests 中。"""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self):
+                stub.requests.append((self.command, self.path, dict(self.headers)))
+                # 先按完整路径（含查询串）匹配，再按不含查询串的路径匹配
+                route = stub.routes.get(self.path) or stub.routes.get(
+                    self.path.split("?")[0], (404, {}, b"not found")
+                )
+                if callable(route):
+                    route = route(self)
+                status, headers, body, *delay = route
+                if delay:
+                    time.sleep(delay[0])
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            do_GET = do_HEAD = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(routes):
+        server = StubServer(routes)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
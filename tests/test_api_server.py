@@ -0,0 +1,83 @@
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from data_manage_gui import LINK_REPORT, CollectionServer
+
+
+@pytest.fixture
+def site(tmp_path):
+    files = {
+        "index.html": "<h1>站点</h1>",
+        "app.js": "init();",
+        "data.js": "const dramas = [];\nconst authorLinks = {};\n",
+        "deltas/manifest.json": "{}",
+        "data_manage_gui.py": "print()",
+        "collection.db": "",
+        "DEVELOPMENT.md": "",
+        ".git/config": "[core]",
+        ".link-cache.json": "{}",
+        "images/.hidden/a.png": "",
+        LINK_REPORT: "[]",
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    server = CollectionServer(("127.0.0.1", 0), root=str(tmp_path))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def status(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+@pytest.mark.parametrize(
+    "path", ["/", "/index.html", "/app.js", "/data.js", "/deltas/manifest.json"]
+)
+def test_site_assets_are_served(site, path):
+    assert status(site + path) == 200
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/.git/config",
+        "/%2egit/config",
+        "/data_manage_gui.py",
+        "/collection.db",
+        "/DEVELOPMENT.md",
+        "/.link-cache.json",
+        "/images/.hidden/a.png",
+        "/" + LINK_REPORT,
+        "/../etc/passwd",
+    ],
+)
+def test_tool_files_are_not_served(site, path):
+    assert status(site + path) == 404
+
+
+def status_if_none_match(url):
+    request = urllib.request.Request(url, headers={"If-None-Match": "*"})
+    return status(request)
+
+
+@pytest.mark.parametrize(
+    "path", ["/missing.html", "/api/unknown", "/api/records/99", "/data_manage_gui.py"]
+)
+def test_missing_routes_are_not_reported_unmodified(site, path):
+    assert status_if_none_match(site + path) == 404
+
+
+def test_invalid_parameters_are_checked_before_etags(site):
+    assert status_if_none_match(site + "/api/records?page=0") == 400
+    assert status_if_none_match(site + "/api/stats") == 304
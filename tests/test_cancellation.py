@@ -0,0 +1,129 @@
+import json
+import os
+import queue
+import time
+
+import pytest
+
+from data_manage_gui import (
+    ExportPipeline,
+    JsonSink,
+    LocalDirectoryTarget,
+    SYNC_MANIFEST,
+    Task,
+    TaskCancelled,
+    TaskRunner,
+    import_records,
+    plan_thumbnail_sync,
+    run_jobs,
+    sync_thumbnails,
+)
+
+
+def cancel_after(n):
+    """返回一个 Task：第 n 次 check 之前取消"""
+    task = Task(queue.Queue())
+    calls = [0]
+    check = task.check
+
+    def counted():
+        calls[0] += 1
+        if calls[0] > n:
+            task.cancel()
+        check()
+
+    task.check = counted
+    return task
+
+
+def test_cancel_runs_callback_once():
+    calls = []
+    task = Task(queue.Queue(), on_cancel=lambda: calls.append(1))
+    task.cancel()
+    task.cancel()
+    assert calls == [1]
+    with pytest.raises(TaskCancelled):
+        task.check()
+
+
+class FakeRoot:
+    """只实现 TaskRunner 用到的 after，由测试驱动事件循环"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+
+    def run_until(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            callbacks, self.pending = self.pending, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.01)
+
+
+@pytest.mark.parametrize(
+    "job, expected",
+    [
+        (lambda task: 1, ["done", "finally"]),
+        (lambda task: 1 / 0, ["error", "finally"]),
+        (lambda task: (task.cancel(), task.check()), ["finally"]),
+    ],
+)
+def test_on_finally_runs_after_every_outcome(job, expected):
+    root = FakeRoot()
+    calls = []
+    TaskRunner(root).run(
+        job,
+        lambda value: calls.append("done"),
+        on_error=lambda e: calls.append("error"),
+        on_finally=lambda: calls.append("finally"),
+        modal=False,
+    )
+    root.run_until(lambda: "finally" in calls)
+    assert calls == expected
+
+
+def test_run_jobs_stops_at_cancel():
+    done = []
+    task = cancel_after(3)
+    with pytest.raises(TaskCancelled):
+        run_jobs(done.append, list(range(10)), check=task.check)
+    assert done == [0, 1, 2]
+
+
+def test_cancelled_export_leaves_no_files(tmp_path):
+    path = tmp_path / "dramas.json"
+    records = [{"id": i, "title": str(i)} for i in range(1, 6)]
+    with pytest.raises(TaskCancelled):
+        ExportPipeline([JsonSink(str(path))]).run(records, check=cancel_after(2).check)
+    assert os.listdir(tmp_path) == []
+
+
+def test_cancelled_import_stops_reading():
+    rows = "\n".join(json.dumps({"title": str(i)}) for i in range(10))
+    with pytest.raises(TaskCancelled):
+        import_records(iter(rows.splitlines(True)), "ndjson", cancel_after(4).check)
+
+
+def test_cancelled_sync_records_finished_uploads(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    local = tmp_path / "images"
+    local.mkdir()
+    for i in range(6):
+        (local / f"{i}.webp").write_bytes(bytes([i]))
+    target = LocalDirectoryTarget(str(tmp_path / "cdn"))
+    plan = plan_thumbnail_sync(str(local), target)
+    with pytest.raises(TaskCancelled):
+        sync_thumbnails(
+            str(local), target, workers=1, plan=plan, check=cancel_after(2).check
+        )
+    with open(tmp_path / "cdn" / SYNC_MANIFEST, encoding="utf-8") as f:
+        manifest = json.load(f)
+    # 清单只包含确认完成的上传，其余的下次同步时补上
+    assert 2 <= len(manifest) < 6
+    assert all((tmp_path / "cdn" / name).exists() for name in manifest)
+    result = sync_thumbnails(str(local), target)
+    assert len(result["uploaded"]) == 6 - len(manifest)
@@ -0,0 +1,71 @@
+import json
+
+from data_manage_gui import (
+    DELTA_STATE,
+    ChangeFeed,
+    ExportPipeline,
+    data_js_sinks,
+    delta_dir,
+    merge_data_files,
+    read_data_version,
+)
+
+
+def test_state_is_kept_outside_the_published_deltas(tmp_path):
+    feed = ChangeFeed(delta_dir(str(tmp_path)))
+    assert feed.publish([{"id": 1, "title": "甲"}]) == 1
+    assert sorted(p.name for p in (tmp_path / "deltas").iterdir()) == [
+        "delta-1.json",
+        "manifest.json",
+        "snapshot-1.json",
+    ]
+    with open(tmp_path / DELTA_STATE, encoding="utf-8") as f:
+        assert json.load(f)["version"] == 1
+    # 内容未变时不升级版本
+    assert ChangeFeed(delta_dir(str(tmp_path))).publish([{"id": 1, "title": "甲"}]) == 1
+
+
+def record(i, title):
+    return {
+        "id": i,
+        "title": title,
+        "author": "作者",
+        "translator": "",
+        "tags": [],
+        "isTranslated": False,
+        "isDomestic": False,
+        "originalUrl": f"https://www.youtube.com/watch?v={title}",
+        "translatedUrl": "",
+        "description": "",
+        "thumbnail": "",
+        "dateAdded": "2024-01-01",
+    }
+
+
+def save(path, titles):
+    records = [record(i, title) for i, title in enumerate(titles, 1)]
+    ExportPipeline(data_js_sinks(path)).run(records)
+
+
+def test_merged_file_gets_a_fresh_version(tmp_path):
+    ours, theirs = str(tmp_path / "ours" / "data.js"), str(
+        tmp_path / "theirs" / "data.js"
+    )
+    for path in (ours, theirs):
+        save(path, ["a"])
+    save(ours, ["a", "b"])
+    save(theirs, ["a", "c"])
+    assert read_data_version(ours) == read_data_version(theirs) == 2
+
+    base = str(tmp_path / "base.js")
+    save(base, ["a"])
+    assert merge_data_files(base, ours, theirs) == []
+    assert read_data_version(ours) == 3
+
+    # deltas/ 保留我方的；重新发布时生成从我方版本直达合并版本的增量
+    save(ours, ["a", "b", "c"])
+    assert read_data_version(ours) == 3
+    with open(tmp_path / "ours" / "deltas" / "manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["version"] == 3
+    assert manifest["deltas"][-1] == {"from": 2, "to": 3, "file": "delta-3.json"}
@@ -0,0 +1,108 @@
+import json
+import os
+import socket
+
+import pytest
+
+import data_manage_gui
+from data_manage_gui import (
+    DataFileError,
+    DataFileLock,
+    ValidationError,
+    file_version,
+    format_author_links_js,
+    read_author_links,
+    save_collection,
+    update_author_links,
+)
+
+
+def write_dead_lock(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"pid": 2**22 + 1, "host": socket.gethostname(), "token": "dead"}, f)
+
+
+def read_token(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("token")
+
+
+def test_stale_lock_is_taken_over(tmp_path):
+    data = str(tmp_path / "data.js")
+    write_dead_lock(data + ".lock")
+    with DataFileLock(data, timeout=1) as lock:
+        assert read_token(data + ".lock") == lock.token
+    assert os.listdir(tmp_path) == []
+
+
+def test_racing_takeover_keeps_the_fresh_lock(tmp_path):
+    """两个等待者都判定遗留锁可接管，先接管的一方建好新锁后另一方才动手"""
+    data = str(tmp_path / "data.js")
+    write_dead_lock(data + ".lock")
+    late = DataFileLock(data, timeout=1)
+    stale_holder = late._read_holder()
+    assert late._is_stale(stale_holder)
+
+    first = DataFileLock(data, timeout=1)
+    first.acquire()
+    late._break_stale(stale_holder)
+
+    assert read_token(data + ".lock") == first.token
+    assert sorted(os.listdir(tmp_path)) == ["data.js.lock"]
+    first.release()
+    assert os.listdir(tmp_path) == []
+
+
+def test_release_only_removes_own_lock(tmp_path):
+    data = str(tmp_path / "data.js")
+    first = DataFileLock(data, timeout=1)
+    first.acquire()
+    # 同一进程中的另一个锁对象（如另一个线程）不能释放别人的锁
+    other = DataFileLock(data, timeout=0)
+    other.release()
+    assert read_token(data + ".lock") == first.token
+    first.release()
+    assert not os.path.exists(data + ".lock")
+
+
+def test_author_links_update_merges_concurrent_edits(tmp_path):
+    data = str(tmp_path / "data.js")
+    base = {"甲": "https://a.example", "乙": "https://b.example"}
+    with open(data, "w", encoding="utf-8") as f:
+        f.write("const dramas = [];\n\n" + format_author_links_js(base) + "\n")
+    loaded = file_version(data)
+    # 另一个进程在此期间改了乙、加了丙
+    update_author_links(
+        {
+            "甲": "https://a.example",
+            "乙": "https://b2.example",
+            "丙": "https://c.example",
+        },
+        data,
+    )
+    ours = {"甲": "https://a2.example", "乙": "https://b3.example"}
+    _, current, conflicts = update_author_links(ours, data, loaded, base_links=base)
+    assert not current and conflicts == ["乙"]
+    assert read_author_links(data) == {
+        "甲": "https://a2.example",
+        "乙": "https://b3.example",
+        "丙": "https://c.example",
+    }
+
+
+def test_save_uses_the_loaded_count_instead_of_reparsing(tmp_path, monkeypatch):
+    data = str(tmp_path / "data.js")
+    with open(data, "w", encoding="utf-8") as f:
+        f.write("const dramas = [];\n")
+
+    def reparse(path="data.js"):
+        raise AssertionError("保存时不应重新解析 data.js")
+
+    monkeypatch.setattr(data_manage_gui, "load_dramas", reparse)
+    version = file_version(data)
+    with pytest.raises(ValidationError, match="3 个条目"):
+        save_collection([], data, expected_version=version, existing_count=3)
+    # 加载失败（条目数未知）时拒绝覆盖
+    with pytest.raises(DataFileError):
+        save_collection([], data, expected_version=version, existing_count=None)
+    save_collection([], data, expected_version=version, existing_count=0)
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from data_manage_gui import (
+    BilibiliAdapter,
+    MetadataFetcher,
+    NiconicoAdapter,
+    OpenGraphAdapter,
+    YouTubeAdapter,
+    build_drafts,
+)
+
+YOUTUBE_VIDEO = "https://www.youtube.com/watch?v=abcdefghijk"
+BILIBILI_VIDEO = "https://www.bilibili.com/video/BV1xx411c7mD"
+BILIBILI_MISSING = "https://www.bilibili.com/video/BV1zz411c7mD"
+BILIBILI_LISTS = "https://space.bilibili.com/12345/lists/678"
+NICONICO_VIDEO = "https://www.nicovideo.jp/watch/sm9"
+
+NICONICO_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<nicovideo_thumb_response status="ok"><thumb>
+<title>原版标题</title><user_nickname>原作者</user_nickname>
+<description>原版简介</description>
+<thumbnail_url>https://nicovideo.cdn.example/sm9.jpg</thumbnail_url>
+<first_retrieve>2007-03-06T00:33:00+09:00</first_retrieve>
+</thumb></nicovideo_thumb_response>"""
+
+
+def oembed(handler):
+    url = parse_qs(urlsplit(handler.path).query)["url"][0]
+    body = {
+        "title": f"YouTube {url[-11:]}",
+        "author_name": "YouTube 作者",
+        "thumbnail_url": "https://i.ytimg.example/hq.jpg",
+    }
+    return 200, {"Content-Type": "application/json"}, json.dumps(body)
+
+
+def bilibili_view(handler):
+    query = parse_qs(urlsplit(handler.path).query)
+    if query.get("bvid") != ["BV1xx411c7mD"]:
+        return 200, {}, json.dumps({"code": -404, "message": "啥都木有"})
+    data = {
+        "title": "汉化标题",
+        "owner": {"name": "汉化者"},
+        "desc": "汉化简介 ",
+        "pic": "https://i0.hdslb.example/cover.jpg",
+        "pubdate": 1262304000,
+    }
+    return 200, {}, json.dumps({"code": 0, "data": data})
+
+
+def bilibili_lists(handler):
+    data = {
+        "meta": {"name": "合集标题", "description": "合集简介", "cover": "c.jpg"},
+        "archives": [{"pubdate": 1262304000}],
+    }
+    return 200, {}, json.dumps({"code": 0, "data": data})
+
+
+@pytest.fixture
+def api(stub_server):
+    return stub_server(
+        {
+            "/oembed": oembed,
+            "/x/web-interface/view": bilibili_view,
+            "/x/polymer/web-space/seasons_archives_list": bilibili_lists,
+            "/api/getthumbinfo/sm9": (200, {}, NICONICO_XML),
+            "/page": (
+                200,
+                {"Content-Type": "text/html; charset=utf-8"},
+                '<meta property="og:title" content="页面 &amp; 标题">'
+                '<meta name="author" content="页面作者">',
+            ),
+            "/broken": (500, {}, b"error"),
+        }
+    )
+
+
+def make_fetcher(tmp_path, api, **kwargs):
+    base = api.url("")
+    adapters = [
+        YouTubeAdapter(base),
+        BilibiliAdapter(base),
+        NiconicoAdapter(base),
+        OpenGraphAdapter(),
+    ]
+    return MetadataFetcher(
+        adapters, cache_path=str(tmp_path / "metadata.json"), timeout=5, **kwargs
+    )
+
+
+def test_adapters_build_drafts(tmp_path, api):
+    pairs = [
+        (NICONICO_VIDEO, BILIBILI_VIDEO),
+        (YOUTUBE_VIDEO, ""),
+        (BILIBILI_LISTS, ""),
+        (api.url("/page"), ""),
+    ]
+    drafts, errors, skipped = build_drafts(
+        pairs, make_fetcher(tmp_path, api), author_links={"UP主": BILIBILI_LISTS}
+    )
+    assert errors == {} and skipped == []
+    by_url = {draft["originalUrl"]: draft for draft in drafts}
+
+    translated = by_url[NICONICO_VIDEO]
+    assert translated["title"] == "汉化标题"
+    assert translated["author"] == "原作者"
+    assert translated["translator"] == "汉化者"
+    assert translated["description"] == "汉化简介"
+    assert translated["isTranslated"] and not translated["isDomestic"]
+
+    assert by_url[YOUTUBE_VIDEO]["title"] == "YouTube abcdefghijk"
+    assert by_url[YOUTUBE_VIDEO]["author"] == "YouTube 作者"
+    # 合集接口不返回 UP 主，按 authorLinks 反查
+    assert by_url[BILIBILI_LISTS]["author"] == "UP主"
+    assert by_url[BILIBILI_LISTS]["isDomestic"]
+    assert by_url[api.url("/page")]["title"] == "页面 & 标题"
+
+
+def test_date_added_is_today_not_publish_date(tmp_path, api):
+    drafts, _, _ = build_drafts(
+        [(NICONICO_VIDEO, BILIBILI_VIDEO)], make_fetcher(tmp_path, api)
+    )
+    assert drafts[0]["dateAdded"] == datetime.now().strftime("%Y-%m-%d")
+
+
+def test_failed_translated_url_keeps_draft(tmp_path, api):
+    drafts, errors, _ = build_drafts(
+        [(NICONICO_VIDEO, BILIBILI_MISSING)], make_fetcher(tmp_path, api)
+    )
+    assert [draft["title"] for draft in drafts] == ["原版标题"]
+    assert drafts[0]["translatedUrl"] == BILIBILI_MISSING
+    assert drafts[0]["translator"] == ""
+    assert "啥都木有" in errors[BILIBILI_MISSING]
+
+
+def test_failed_original_url_is_reported(tmp_path, api):
+    drafts, errors, _ = build_drafts(
+        [(api.url("/broken"), BILIBILI_VIDEO)], make_fetcher(tmp_path, api)
+    )
+    assert drafts == []
+    assert "500" in errors[api.url("/broken")]
+
+
+def test_existing_links_are_skipped(tmp_path, api):
+    existing = [{"originalUrl": YOUTUBE_VIDEO, "translatedUrl": ""}]
+    drafts, _, skipped = build_drafts(
+        [(YOUTUBE_VIDEO, "")], make_fetcher(tmp_path, api), existing
+    )
+    assert drafts == [] and skipped == [YOUTUBE_VIDEO]
+    assert api.requests == []
+
+
+def test_responses_are_cached_on_disk(tmp_path, api):
+    build_drafts([(YOUTUBE_VIDEO, "")], make_fetcher(tmp_path, api))
+    drafts, _, _ = build_drafts([(YOUTUBE_VIDEO, "")], make_fetcher(tmp_path, api))
+    assert len(api.requests) == 1
+    assert drafts[0]["title"] == "YouTube abcdefghijk"
+    build_drafts([(YOUTUBE_VIDEO, "")], make_fetcher(tmp_path, api, ttl=0))
+    assert len(api.requests) == 2
+
+
+def test_worker_pool_is_bounded(tmp_path, stub_server):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def page(handler):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+        return 200, {}, '<meta property="og:title" content="t">'
+
+    server = stub_server({f"/{i}": page for i in range(8)})
+    fetcher = make_fetcher(tmp_path, server, workers=2)
+    results, errors = fetcher.fetch_all([server.url(f"/{i}") for i in range(8)])
+    assert len(results) == 8 and errors == {}
+    assert peak[0] <= 2
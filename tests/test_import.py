@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+import data_manage_gui
+from data_manage_gui import iter_import_rows
+
+
+def values(text):
+    return [value for _, value in iter_import_rows(io.StringIO(text), "json")]
+
+
+@pytest.fixture(params=[1, 7, 64 * 1024])
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(data_manage_gui, "IMPORT_CHUNK_SIZE", request.param)
+
+
+@pytest.mark.usefixtures("chunk_size")
+def test_json_layouts():
+    assert values('[{"a": 1}, {"b": [2]}]') == [{"a": 1}, {"b": [2]}]
+    assert values('﻿{"a": 1}\n{"b": 2}') == [{"a": 1}, {"b": 2}]
+    assert values('{"dramas": [{"a": 1}], "authorLinks": {}}') == [{"a": 1}]
+    assert values("[1, 23, 456]") == [1, 23, 456]
+    assert values("[]") == values("") == []
+
+
+@pytest.mark.parametrize(
+    "text",
+    ['{"a": 1}]{"b": 2}', '{"a": 1} [{"b": 2}', '[{"a": 1}] {"b": 2}', '[{"a": 1}'],
+)
+def test_stray_brackets_are_rejected(text):
+    with pytest.raises(ValueError):
+        values(text)
+
+
+def test_malformed_record_fails_without_reading_the_rest(monkeypatch):
+    monkeypatch.setattr(data_manage_gui, "IMPORT_MAX_RECORD", 1000)
+    f = io.StringIO('[{"title": x' + " " * (10 * 1024 * 1024) + "}]")
+    with pytest.raises(ValueError, match="第 1 项"):
+        list(iter_import_rows(f, "json"))
+    assert f.tell() <= 2 * 64 * 1024
@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+
+import pytest
+
+from data_manage_gui import (
+    LINK_REPORT,
+    LinkChecker,
+    TaskCancelled,
+    check_links,
+)
+
+
+def make_checker(tmp_path, **kwargs):
+    kwargs.setdefault("interval", 0)
+    kwargs.setdefault("timeout", 2)
+    return LinkChecker(cache_path=str(tmp_path / "cache.json"), **kwargs)
+
+
+@pytest.fixture
+def site(stub_server):
+    server = stub_server(
+        {
+            "/ok": (200, {}, b""),
+            "/moved": (301, {"Location": "/ok"}, b""),
+            "/temporary": (302, {"Location": "/moved"}, b""),
+            "/gone": (302, {"Location": "/missing"}, b""),
+            "/loop": (302, {"Location": "/loop"}, b""),
+            "/slow": (200, {}, b"", 1.5),
+            "/no-head": lambda h: (
+                (405, {}, b"") if h.command == "HEAD" else (200, {}, b"")
+            ),
+        }
+    )
+    return server
+
+
+def test_statuses_and_redirects(tmp_path, site):
+    checker = make_checker(tmp_path, timeout=0.5)
+    urls = {
+        name: site.url(f"/{name}")
+        for name in ("ok", "missing", "temporary", "gone", "slow")
+    }
+    results = checker.run(list(urls.values()))
+
+    assert results[urls["ok"]]["ok"] and results[urls["ok"]]["status"] == 200
+    assert results[urls["missing"]]["status"] == 404
+    assert not results[urls["missing"]]["ok"]
+    # 多跳重定向最终落到 /ok
+    assert results[urls["temporary"]]["ok"]
+    assert results[urls["temporary"]]["finalUrl"] == site.url("/ok")
+    # 重定向到 404 算作失效，finalUrl 指向最终地址
+    assert results[urls["gone"]]["status"] == 404
+    assert results[urls["gone"]]["finalUrl"] == site.url("/missing")
+    # 慢速主机超时
+    assert not results[urls["slow"]]["ok"]
+    assert "TimeoutError" in results[urls["slow"]]["error"]
+
+
+def test_redirect_loop_and_head_fallback(tmp_path, site):
+    checker = make_checker(tmp_path, max_redirects=3)
+    loop, no_head = site.url("/loop"), site.url("/no-head")
+    results = checker.run([loop, no_head])
+    assert results[loop]["error"] == "重定向次数过多"
+    assert results[no_head]["ok"]
+    assert [method for method, path, _ in site.requests if path == "/no-head"] == [
+        "HEAD",
+        "GET",
+    ]
+
+
+def test_host_header_keeps_port(tmp_path, site):
+    make_checker(tmp_path).run([site.url("/ok")])
+    assert site.requests[0][2]["Host"] == f"127.0.0.1:{site.port}"
+
+
+def test_results_are_cached_until_ttl(tmp_path, site):
+    url = site.url("/ok")
+    make_checker(tmp_path).run([url])
+    make_checker(tmp_path).run([url])
+    assert len(site.requests) == 1
+    make_checker(tmp_path, ttl=0).run([url])
+    assert len(site.requests) == 2
+
+
+def test_per_host_concurrency_limit(tmp_path, stub_server):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def slow(handler):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+        return 200, {}, b""
+
+    server = stub_server({f"/{i}": slow for i in range(8)})
+    make_checker(tmp_path, per_host=2).run([server.url(f"/{i}") for i in range(8)])
+    assert peak[0] <= 2
+
+
+def test_cancel_stops_pending_and_running_checks(tmp_path, stub_server):
+    server = stub_server({f"/{i}": (200, {}, b"", 1) for i in range(20)})
+    checker = make_checker(tmp_path, per_host=2, timeout=5)
+    urls = [server.url(f"/{i}") for i in range(20)]
+    threading.Timer(0.3, checker.cancel).start()
+    started = time.monotonic()
+    results = checker.run(urls)
+    assert time.monotonic() - started < 1
+    assert results == {}
+    assert len(server.requests) <= 2
+
+
+def test_check_links_report(tmp_path, site, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records = [
+        {"id": 1, "title": "a", "originalUrl": site.url("/ok"), "thumbnail": ""},
+        {"id": 2, "title": "b", "originalUrl": site.url("/missing")},
+    ]
+    report = check_links(records, {"作者": site.url("/moved")}, make_checker(tmp_path))
+    by_url = {row["url"]: row for row in report}
+    assert by_url[site.url("/ok")]["ok"]
+    assert by_url[site.url("/missing")]["status"] == 404
+    assert by_url[site.url("/moved")]["field"] == "authorLinks"
+    with open(tmp_path / LINK_REPORT, encoding="utf-8") as f:
+        assert json.load(f) == report
+
+
+def test_cancelled_check_writes_no_report(tmp_path, site, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    checker = make_checker(tmp_path)
+    checker.cancel()
+    with pytest.raises(TaskCancelled):
+        check_links(
+            [{"id": 1, "title": "a", "originalUrl": site.url("/ok")}], {}, checker
+        )
+    assert not (tmp_path / LINK_REPORT).exists()
+    assert site.requests == []
+
+
+def test_report_is_written_beside_the_data_file(tmp_path, site, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "site").mkdir()
+    records = [{"id": 1, "title": "a", "originalUrl": site.url("/ok")}]
+    check_links(
+        records,
+        {},
+        make_checker(tmp_path),
+        data_path=str(tmp_path / "site" / "data.js"),
+    )
+    assert (tmp_path / "site" / LINK_REPORT).exists()
+    assert not (tmp_path / LINK_REPORT).exists()
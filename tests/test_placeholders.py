@@ -0,0 +1,39 @@
+import pytest
+
+import data_manage_gui
+from data_manage_gui import compute_thumbnail_meta
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    for record_id, color in ((1, "red"), (2, "blue")):
+        Image.new("RGB", (32, 24), color).save(tmp_path / f"{record_id}.png")
+    return tmp_path
+
+
+def test_unchanged_images_are_not_read_again(image_dir, monkeypatch):
+    records = [{"id": 1}, {"id": 2}]
+    updates, computed, failed = compute_thumbnail_meta(records, str(image_dir))
+    assert sorted(updates) == [0, 1] and computed == 2 and not failed
+
+    def fail(path):
+        raise AssertionError(f"不应重新读取 {path}")
+
+    monkeypatch.setattr(data_manage_gui, "file_hash", fail)
+    for i, meta in updates.items():
+        records[i]["thumbnailMeta"] = meta
+    assert compute_thumbnail_meta(records, str(image_dir)) == ({}, 0, {})
+
+
+def test_changed_image_is_recomputed(image_dir):
+    records = [{"id": 1}, {"id": 2}]
+    updates, _, _ = compute_thumbnail_meta(records, str(image_dir))
+    for i, meta in updates.items():
+        records[i]["thumbnailMeta"] = meta
+    Image.new("RGB", (24, 32), "green").save(image_dir / "1.png")
+    updates, computed, _ = compute_thumbnail_meta(records, str(image_dir))
+    assert computed == 1
+    assert list(updates) == [0] and updates[0]["width"] == 24
@@ -0,0 +1,116 @@
+from data_manage_gui import (
+    CollectionReset,
+    CollectionStats,
+    DuplicateIndex,
+    RecordCollection,
+    RecordsRenumbered,
+    SearchIndex,
+    SortKeys,
+    reuse_unchanged,
+)
+
+
+def record(i, title):
+    return {
+        "id": i,
+        "title": title,
+        "author": "作者",
+        "translator": "",
+        "tags": [],
+        "isTranslated": False,
+        "isDomestic": False,
+        "originalUrl": f"https://www.youtube.com/watch?v=video{i:06d}",
+        "translatedUrl": "",
+        "description": "",
+        "thumbnail": "",
+        "dateAdded": "2024-01-01",
+    }
+
+
+def make_collection(titles):
+    records = [record(i, title) for i, title in enumerate(titles, 1)]
+    data = RecordCollection(records)
+    derived = DuplicateIndex(records), SearchIndex(records), SortKeys(records)
+    stats = CollectionStats(records)
+    events = []
+    for index in (*derived, stats):
+        data.subscribe(index.apply)
+    data.subscribe(events.append)
+    return data, records, derived, stats, events
+
+
+def test_renumbering_replaces_records_instead_of_mutating():
+    data, records, _, _, events = make_collection(["甲", "乙", "丙"])
+    data.move(0, 2)
+    assert [item["id"] for item in data] == [1, 2, 3]
+    assert [item["title"] for item in data] == ["乙", "丙", "甲"]
+    # 原来的字典保持不变，换成的副本整批以一个 RecordsRenumbered 事件发出
+    assert [item["id"] for item in records] == [1, 2, 3]
+    (renumbered,) = [e for e in events if isinstance(e, RecordsRenumbered)]
+    assert [(position, old["title"]) for position, old, _ in renumbered.changes] == [
+        (0, "乙"),
+        (1, "丙"),
+        (2, "甲"),
+    ]
+    assert [item for _, _, item in renumbered.changes] == list(data)
+
+
+def test_indexes_follow_renumbered_records():
+    data, _, (dups, search, sort_keys), stats, _ = make_collection(
+        ["东方红魔乡", "东方妖妖梦", "东方永夜抄"]
+    )
+    data.remove([0])
+    data.insert(0, record(0, "东方风神录"))
+    current = list(data)
+    assert [item for _, item in search.search("永夜")] == [current[2]]
+    assert {id(item) for _, item in search.search("东方")} == set(map(id, current))
+    duplicate = dict(current[1], id=None)
+    assert dups.find(duplicate)[0][0] is current[1]
+    assert dups.find(current[1], exclude=current[1]) == []
+    assert stats.total == 3 and stats.counted == set(map(id, current))
+    assert sort_keys.key("title", current[2]) == SortKeys.compute("title", current[2])
+    assert all(id(item) in sort_keys.cache for item in current[1:])
+
+
+def reload_from_disk(data, items):
+    """模拟载入外部修改：磁盘上读出的是全新的字典，ID 与位置一致"""
+    disk = [dict(item, id=i) for i, item in enumerate(items, 1)]
+    records, added, removed = reuse_unchanged(list(data), disk)
+    data.reset(records)
+    return added, removed
+
+
+def shown_ids(events):
+    """按表格的做法回放事件：CollectionReset 时取记录的 ID，之后按 RecordsRenumbered 改 ID 列"""
+    (reset,) = [e for e in events if isinstance(e, CollectionReset)]
+    ids = [item["id"] for item in reset.records]
+    for e in events[events.index(reset) :]:
+        if isinstance(e, RecordsRenumbered):
+            for position, _, item in e.changes:
+                ids[position] = item["id"]
+    return ids
+
+
+def test_external_insert_renumbers_reused_records():
+    data, records, (_, search, _), _, events = make_collection(["甲", "乙", "丙"])
+    added, removed = reload_from_disk(data, [record(0, "丁"), *records])
+    assert [item["title"] for item in added] == ["丁"] and removed == []
+    assert [item["id"] for item in data] == [1, 2, 3, 4]
+    assert shown_ids(events) == [1, 2, 3, 4]
+    # 沿用的旧记录没有被就地修改
+    assert [item["id"] for item in records] == [1, 2, 3]
+    assert [item for _, item in search.search("乙")] == [data[2]]
+
+
+def test_external_delete_renumbers_reused_records():
+    data, records, (_, search, _), stats, events = make_collection(
+        ["甲", "乙", "丙", "丁"]
+    )
+    added, removed = reload_from_disk(data, [records[0], *records[2:]])
+    assert added == [] and [item["title"] for item in removed] == ["乙"]
+    assert [item["id"] for item in data] == [1, 2, 3]
+    assert shown_ids(events) == [1, 2, 3]
+    assert [item["id"] for item in records] == [1, 2, 3, 4]
+    assert data[0] is records[0]
+    assert [item for _, item in search.search("丁")] == [data[2]]
+    assert stats.total == 3 and stats.counted == set(map(id, data))
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from data_manage_gui import CollectionStore
+
+
+def write_data_js(path, titles):
+    records = [
+        {
+            "id": i,
+            "title": title,
+            "author": "作者",
+            "translator": "",
+            "tags": [],
+            "isTranslated": False,
+            "isDomestic": False,
+            "originalUrl": f"https://example.com/{i}",
+            "translatedUrl": "",
+            "description": "",
+            "thumbnail": "",
+            "dateAdded": "2024-01-01",
+        }
+        for i, title in enumerate(titles, 1)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("const dramas = " + json.dumps(records, ensure_ascii=False) + ";\n")
+        f.write('const authorLinks = {"作者": ""};\n')
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CollectionStore(str(tmp_path / "collection.db"))
+    yield store
+    store.close()
+
+
+def count(store):
+    return store.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+
+def test_failed_import_keeps_database(tmp_path, store, monkeypatch):
+    data = str(tmp_path / "data.js")
+    write_data_js(data, ["旧的一", "旧的二"])
+    assert store.import_data_js(data) == 2
+
+    write_data_js(data, ["新的"])
+
+    def fail(links):
+        raise RuntimeError("写入失败")
+
+    monkeypatch.setattr(store, "_write_author_links", fail)
+    with pytest.raises(RuntimeError):
+        store.import_data_js(data)
+    assert count(store) == 2
+    assert [item["title"] for item in store.load_records()] == ["旧的一", "旧的二"]
+
+
+def test_search_uids_match_loaded_records(tmp_path, store):
+    data = str(tmp_path / "data.js")
+    write_data_js(data, ["幻想乡的日常", "红魔馆", "幻想乡的夏天"])
+    store.import_data_js(data)
+    uids = {item["_uid"]: item["title"] for item in store.load_records()}
+    expected = ["幻想乡的日常", "幻想乡的夏天"]
+    # 短于 FTS_MIN_QUERY 的关键词按保存顺序返回，更长的按相关度返回
+    assert [uids[uid] for uid in store.search_uids("幻想")] == expected
+    assert sorted(uids[uid] for uid in store.search_uids("幻想乡的")) == sorted(
+        expected
+    )
+    assert store.search("红魔馆") == [2]
+
+
+def test_search_uids_reads_committed_rows_only(tmp_path, store):
+    data = str(tmp_path / "data.js")
+    write_data_js(data, ["幻想乡的日常"])
+    store.import_data_js(data)
+    # 保存任务的事务尚未提交时，界面搜索（独立连接）看到的仍是提交前的内容
+    store.conn.execute("BEGIN")
+    store.conn.execute("UPDATE records SET title = '红魔馆'")
+    assert len(store.search_uids("幻想")) == 1
+    store.conn.rollback()
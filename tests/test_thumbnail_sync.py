@@ -0,0 +1,22 @@
+from data_manage_gui import (
+    SYNCED_STATE,
+    LocalDirectoryTarget,
+    missing_thumbnail_ids,
+    sync_thumbnails,
+)
+
+
+def test_synced_state_follows_the_data_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source, site = tmp_path / "images", tmp_path / "site"
+    source.mkdir(), site.mkdir()
+    (source / "1.webp").write_bytes(b"one")
+    data_path = str(site / "data.js")
+    target = LocalDirectoryTarget(str(tmp_path / "cdn"))
+    result = sync_thumbnails(str(source), target, data_path=data_path)
+    assert result["uploaded"] == ["1.webp"]
+    assert (site / SYNCED_STATE).exists()
+    assert not (tmp_path / SYNCED_STATE).exists()
+    records = [{"id": 1}, {"id": 2}]
+    assert missing_thumbnail_ids(records, data_path=data_path) == [2]
+    assert missing_thumbnail_ids(records) is None